@@ -0,0 +1,180 @@
+import os
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+################################################################################
+# Constants
+################################################################################
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("FLOW_EXECUTOR_CONCURRENCY", "4"))
+DEFAULT_MAX_QUEUE = int(os.getenv("FLOW_EXECUTOR_QUEUE_DEPTH", "16"))
+DEFAULT_RETRY_AFTER = int(os.getenv("FLOW_EXECUTOR_RETRY_AFTER", "2"))
+# Seconds a single execution may take, 0 for no limit
+DEFAULT_TIMEOUT = float(os.getenv("FLOW_EXECUTION_TIMEOUT", "0"))
+DISCONNECT_POLL_INTERVAL = 0.5
+
+_DONE = object()
+
+
+################################################################################
+# Errors
+################################################################################
+
+
+class ExecutorRejected(Exception):
+    status_code = 503
+    message = "Flow executor is not available"
+
+    def __init__(self, retry_after: int = DEFAULT_RETRY_AFTER):
+        super().__init__(self.message)
+        self.retry_after = retry_after
+
+
+class ExecutorBusy(ExecutorRejected):
+    status_code = 429
+    message = "Too many flow executions in progress, retry later"
+
+
+def rejected_response(error: ExecutorRejected) -> JSONResponse:
+    return JSONResponse(
+        {"status": "error", "message": error.message},
+        status_code=error.status_code,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+################################################################################
+# Executor
+################################################################################
+
+
+class FlowExecutor:
+    """
+    Runs flow executions on a dedicated thread pool so the event loop stays
+    free for cheap requests. At most `max_concurrency` flows run at once and
+    `max_queue` more may wait; anything beyond that is rejected with 429.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        retry_after: int = DEFAULT_RETRY_AFTER,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._pool = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="flow-exec"
+            )
+
+    def shutdown(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+    def _admit(self):
+        with self._lock:
+            if self._pool is None:
+                raise ExecutorRejected(self.retry_after)
+            if self._in_flight >= self.max_concurrency + self.max_queue:
+                raise ExecutorBusy(self.retry_after)
+            self._in_flight += 1
+        return _Slot(self)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable, *args):
+        """Runs `fn(*args)` on the pool and waits for it without blocking the loop."""
+        slot = self._admit()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, fn, *args)
+        finally:
+            slot.release()
+
+    def stream(self, make_iterator: Callable[[], Iterator], on_abort: Callable = None) -> AsyncIterator:
+        """
+        Async view of a sync generator whose items are produced on the pool.
+        Admission happens here, before the response starts, so a rejected
+        request can still get a proper status code. `on_abort` is called if
+        the consumer goes away before the generator is exhausted.
+        """
+        slot = self._admit()
+        stream = self._iterate(make_iterator, slot, on_abort)
+        # A response that never starts iterating must still give its slot back
+        weakref.finalize(stream, slot.release)
+        return stream
+
+    async def _iterate(self, make_iterator: Callable[[], Iterator], slot: "_Slot", on_abort: Callable = None):
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        iterator = None
+        exhausted = False
+        try:
+            iterator = await loop.run_in_executor(pool, make_iterator)
+            while True:
+                item = await loop.run_in_executor(pool, next, iterator, _DONE)
+                if item is _DONE:
+                    exhausted = True
+                    break
+                yield item
+        finally:
+            if not exhausted and on_abort is not None:
+                # Before any await: a cancelled task may not get to run more
+                on_abort()
+            try:
+                if iterator is not None and hasattr(iterator, "close"):
+                    # Let the generator's cleanup run off the event loop too
+                    await loop.run_in_executor(pool, iterator.close)
+            finally:
+                slot.release()
+
+
+class _Slot:
+    def __init__(self, executor: FlowExecutor):
+        self._executor = executor
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._executor._release()
+
+
+async def watch_disconnect(request: Request, on_disconnect: Callable):
+    """Polls the client connection and calls `on_disconnect` once it drops."""
+    while True:
+        if await request.is_disconnected():
+            on_disconnect()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+def get_flow_executor(request: Request) -> FlowExecutor:
+    return request.app.state.flow_executor
@@ -1,14 +1,40 @@
 import json
+import asyncio
+import time
+from functools import partial
+from typing import List
 
-from fastapi import APIRouter, Depends, Request, Query, HTTPException
+from fastapi import APIRouter, Depends, Request, Query, HTTPException, Response
 from fastapi.responses import JSONResponse, StreamingResponse
 
 from pymongo.database import Database
 
 from api.tags import APITags
 from api.db import get_db
+from api.executor import (
+    DEFAULT_TIMEOUT,
+    ExecutorRejected,
+    FlowExecutor,
+    get_flow_executor,
+    rejected_response,
+    watch_disconnect,
+)
 
-from flow_graph.runner import Runner
+from flow_graph.runner import Runner, func_map
+from flow_graph.result import preview_limit
+from flow_graph.optimizer import optimize as optimize_flow
+from flow_graph.metrics import bytes_serialized
+from flow_graph.export import Export
+from flow_graph.arrow_io import (
+    ARROW_AVAILABLE,
+    ARROW_STREAM_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+    iter_ipc_streams,
+    parquet_bytes,
+)
+from flow_graph.incremental import flow_sessions
+from flow_graph.plan_cache import flow_plans
+from flow_graph.cancellation import CancelToken, DeadlineExceeded, ExecutionCancelled
 
 from api.utils import generate_uid
 
@@ -78,6 +104,7 @@ async def update_flow(request: Request, flow_uid: str, db: Database = Depends(ge
         result = db[COLLECTION_NAME].update_one(
             {"flow_uid": flow_uid}, {"$set": payload}
         )
+        flow_plans.invalidate(flow_uid)
         if result.matched_count == 0:
             return JSONResponse(
                 {"status": "error", "message": "Flow not found"}, status_code=200
@@ -95,6 +122,8 @@ async def update_flow(request: Request, flow_uid: str, db: Database = Depends(ge
 async def delete_flow(flow_uid: str, db: Database = Depends(get_db)):
     try:
         result = db[COLLECTION_NAME].delete_many({"flow_uid": flow_uid})
+        flow_sessions.discard(flow_uid)
+        flow_plans.invalidate(flow_uid)
         if result.deleted_count == 0:
             return JSONResponse(
                 {"status": "error", "message": "Flow not found"}, status_code=200
@@ -112,12 +141,258 @@ async def delete_flow(flow_uid: str, db: Database = Depends(get_db)):
 ################################################################################
 
 
+def encode_results(results, outputs=None, preview_rows=None):
+    # Each node output is encoded exactly once, straight from its DataFrame.
+    # Like Runner.execute, stop at the first output that can't be encoded.
+    for result in results:
+        try:
+            start = time.perf_counter()
+            encoded = result.to_json(preview_limit(result, outputs, preview_rows))
+        except Exception as e:
+            print("Error encoding node output :", e)
+            return
+        profile = result.metadata.get("profile")
+        if profile is not None:
+            profile.serialize_ms = round((time.perf_counter() - start) * 1000, 3)
+        bytes_serialized.labels(FORMAT_JSON).inc(len(encoded))
+        yield encoded
+
+
+def success_body(encoded_results, profile: dict = None) -> str:
+    body = '{"status": "success", "data": [' + ", ".join(encoded_results) + "]"
+    if profile is not None:
+        body += ', "profile": ' + json.dumps(profile)
+    return body + "}"
+
+
+def success_response(encoded_results, profile: dict = None) -> Response:
+    return Response(
+        content=success_body(encoded_results, profile),
+        media_type="application/json",
+        status_code=200,
+    )
+
+
+FORMAT_JSON = "json"
+FORMAT_ARROW = "arrow"
+FORMAT_PARQUET = "parquet"
+
+FORMAT_MEDIA_TYPES = {
+    ARROW_STREAM_MEDIA_TYPE: FORMAT_ARROW,
+    PARQUET_MEDIA_TYPE: FORMAT_PARQUET,
+    "application/x-parquet": FORMAT_PARQUET,
+}
+
+
+def negotiate_format(request: Request, output_format: str = None) -> str:
+    # An explicit ?format= wins over the Accept header
+    if output_format:
+        return output_format.lower().strip()
+    accept = request.headers.get("accept", "")
+    for media_type in accept.split(","):
+        media_type = media_type.split(";")[0].strip().lower()
+        if media_type in FORMAT_MEDIA_TYPES:
+            return FORMAT_MEDIA_TYPES[media_type]
+    return FORMAT_JSON
+
+
+def preview_results(results, outputs=None, preview_rows=None):
+    for result in results:
+        limit = preview_limit(result, outputs, preview_rows)
+        yield result if limit is None else result.head(limit)
+
+
+def format_error(output_format: str):
+    if output_format == FORMAT_JSON:
+        return None
+    if output_format not in (FORMAT_ARROW, FORMAT_PARQUET):
+        return JSONResponse(
+            {"status": "error", "message": f"Unsupported format: {output_format}"},
+            status_code=406,
+        )
+    if not ARROW_AVAILABLE:
+        return JSONResponse(
+            {"status": "error", "message": "Arrow/Parquet output requires pyarrow"},
+            status_code=406,
+        )
+    return None
+
+
+def parquet_response(runner: Runner, node_id: str = None):
+    export_nodes = [
+        nid
+        for nid in runner.exec_order
+        if func_map.get(runner.node_type(nid)) is Export
+    ]
+    target = node_id or (export_nodes[-1] if export_nodes else None)
+    if target not in export_nodes:
+        return JSONResponse(
+            {"status": "error", "message": "Parquet output is only available for export nodes"},
+            status_code=400,
+        )
+
+    for result in runner.execute_nodes():
+        if result.node_id == target:
+            content = parquet_bytes(result.output, node_id=target)
+            bytes_serialized.labels(FORMAT_PARQUET).inc(len(content))
+            return Response(
+                content=content,
+                media_type=PARQUET_MEDIA_TYPE,
+                headers={"Content-Disposition": f'attachment; filename="{target}.parquet"'},
+                status_code=200,
+            )
+    content = {"status": "error", "message": f"Node {target} did not produce an output"}
+    if runner.error is not None:
+        content["detail"] = str(runner.error)
+    return JSONResponse(content, status_code=500)
+
+
+def flow_response(
+    runner: Runner,
+    output_format: str,
+    return_data: bool = True,
+    node_id: str = None,
+    outputs: List[str] = None,
+    preview_rows: int = None,
+):
+    """Runs the whole flow and builds the response. Blocking, call it on the executor."""
+    # --- Parquet mode ---
+    if output_format == FORMAT_PARQUET:
+        return parquet_response(runner, node_id)
+
+    # --- return_data=False metadata mode ---
+    if not return_data:
+        metadata = [result.describe() for result in runner.execute_nodes()]
+        content = {"status": "success", "data": metadata}
+        if runner.profile:
+            content["profile"] = runner.profile_report()
+        return JSONResponse(content, status_code=200)
+
+    # --- return full data ---
+    encoded = list(encode_results(runner.execute_nodes(), outputs, preview_rows))
+    return success_response(
+        encoded, runner.profile_report() if runner.profile else None
+    )
+
+
+def build_and_respond(make_runner, *args):
+    """Plans and runs the flow in one executor task, so it is admitted once."""
+    return flow_response(make_runner(), *args)
+
+
+def stream_body(
+    runner: Runner,
+    output_format: str,
+    outputs: List[str] = None,
+    preview_rows: int = None,
+):
+    results = runner.execute_nodes()
+    try:
+        if output_format == FORMAT_ARROW:
+            for chunk in iter_ipc_streams(preview_results(results, outputs, preview_rows)):
+                bytes_serialized.labels(FORMAT_ARROW).inc(len(chunk))
+                yield chunk
+            return
+        for encoded in encode_results(results, outputs, preview_rows):
+            yield encoded + "\n"
+        if runner.profile:
+            # Trailing line, once every node has been run and encoded
+            yield json.dumps({"profile": runner.profile_report()}) + "\n"
+    except ExecutionCancelled as e:
+        # The status line is already sent, all we can do is end the stream
+        print("Flow execution stopped :", e)
+
+
+def cancel_token(timeout: float = None) -> CancelToken:
+    return CancelToken(timeout or DEFAULT_TIMEOUT or None)
+
+
+async def run_until_disconnect(
+    request: Request, executor: FlowExecutor, token: CancelToken, fn, *args
+):
+    watcher = asyncio.create_task(
+        watch_disconnect(request, partial(token.cancel, "disconnected"))
+    )
+    try:
+        return await executor.run(fn, *args)
+    finally:
+        watcher.cancel()
+
+
+async def respond(
+    request: Request,
+    executor: FlowExecutor,
+    make_runner,
+    token: CancelToken,
+    output_format: str,
+    stream: bool = False,
+    return_data: bool = True,
+    node_id: str = None,
+    outputs: List[str] = None,
+    preview_rows: int = None,
+):
+    error = format_error(output_format)
+    if error is not None:
+        return error
+
+    # --- Streaming and Arrow IPC modes: pulled item by item on the executor ---
+    if output_format == FORMAT_ARROW or (stream and return_data):
+        # Parsing and planning happen on the executor too, but before the
+        # response starts so an invalid graph still gets a 500
+        runner = await run_until_disconnect(request, executor, token, make_runner)
+        media_type = (
+            ARROW_STREAM_MEDIA_TYPE if output_format == FORMAT_ARROW else "application/json"
+        )
+        body = executor.stream(
+            partial(stream_body, runner, output_format, outputs, preview_rows),
+            on_abort=partial(token.cancel, "disconnected"),
+        )
+        return StreamingResponse(body, media_type=media_type, status_code=200)
+
+    return await run_until_disconnect(
+        request,
+        executor,
+        token,
+        build_and_respond,
+        make_runner,
+        output_format,
+        return_data,
+        node_id,
+        outputs,
+        preview_rows,
+    )
+
+
+def cancelled_response(error: ExecutionCancelled) -> JSONResponse:
+    if isinstance(error, DeadlineExceeded):
+        return JSONResponse(
+            {"status": "error", "message": "Flow execution timed out"},
+            status_code=504,
+        )
+    # The client is gone, nobody will read this
+    return JSONResponse(
+        {"status": "error", "message": "Flow execution was cancelled"},
+        status_code=499,
+    )
+
+
 @router.post("/execute")
 async def execute_flow(
     request: Request,
     db: Database = Depends(get_db),
+    executor: FlowExecutor = Depends(get_flow_executor),
     stream: bool = Query(default=False),
     return_data: bool = Query(default=True),
+    incremental: bool = Query(default=False),
+    output_format: str = Query(default=None, alias="format"),
+    node_id: str = Query(default=None),
+    outputs: List[str] = Query(default=None),
+    only_outputs: bool = Query(default=False),
+    preview_rows: int = Query(default=None, ge=0),
+    targets: List[str] = Query(default=None),
+    optimize: bool = Query(default=False),
+    timeout: float = Query(default=None, gt=0),
+    profile: bool = Query(default=False),
 ):
     try:
         payload = await request.json()
@@ -129,69 +404,39 @@ async def execute_flow(
                 status_code=200,
             )
 
-        runner = Runner(flow_graph)
-
-        # --- Streaming mode ---
-        if stream and return_data:
-
-            async def generator():
-                for o in runner.execute():
-                    if isinstance(o, dict):
-                        yield json.dumps(o)
-                    elif isinstance(o, str) and o.strip():
-                        yield o
-
-            return StreamingResponse(
-                generator(), media_type="application/json", status_code=200
-            )
-
-        # --- Non-streaming mode ---
-        outputs_raw = list(runner.execute())
+        token = cancel_token(timeout)
+        make_runner = partial(
+            Runner,
+            flow_graph,
+            flow_uid=payload.get("flow_uid"),
+            incremental=incremental,
+            targets=targets,
+            optimize=optimize,
+            cancel_token=token,
+            profile=profile,
+            plan_cache=flow_plans,
+            database=db,
+            reported=outputs if only_outputs else None,
+        )
 
-        # Safely parse outputs
-        outputs = []
-        for o in outputs_raw:
-            if isinstance(o, dict):
-                outputs.append(o)
-            elif isinstance(o, str) and o.strip():
-                try:
-                    outputs.append(json.loads(o))
-                except json.JSONDecodeError:
-                    # fallback: store raw string
-                    outputs.append({"raw": o})
-            else:
-                # fallback for None or unexpected type
-                outputs.append({"raw": str(o)})
+        return await respond(
+            request,
+            executor,
+            make_runner,
+            token,
+            negotiate_format(request, output_format),
+            stream=stream,
+            return_data=return_data,
+            node_id=node_id,
+            outputs=outputs,
+            preview_rows=preview_rows,
+        )
 
-        # --- return_data=False metadata mode ---
-        if not return_data:
-            metadata = []
-            for output in outputs:
-                node_output = output.get("output", [])
-                if node_output:
-                    first_row = node_output[0]
-                    column_names = list(first_row.keys())
-                    column_types = [
-                        "string" if isinstance(x, str) else "number"
-                        for x in first_row.values()
-                    ]
-                else:
-                    column_names, column_types = [], []
-
-                metadata.append(
-                    {
-                        "node_id": output.get("node_id"),
-                        "total_rows": len(node_output),
-                        "column_names": column_names,
-                        "column_types": column_types,
-                    }
-                )
-            return JSONResponse(
-                {"status": "success", "data": metadata}, status_code=200
-            )
+    except ExecutorRejected as e:
+        return rejected_response(e)
 
-        # --- return full data ---
-        return JSONResponse({"status": "success", "data": outputs}, status_code=200)
+    except ExecutionCancelled as e:
+        return cancelled_response(e)
 
     except Exception as e:
         print("Error executing flow:", e)
@@ -206,7 +451,18 @@ async def execute_flow_by_flow_uid(
     request: Request,
     flow_uid: str,
     stream: bool = Query(default=False),
+    incremental: bool = Query(default=False),
+    output_format: str = Query(default=None, alias="format"),
+    node_id: str = Query(default=None),
+    outputs: List[str] = Query(default=None),
+    only_outputs: bool = Query(default=False),
+    preview_rows: int = Query(default=None, ge=0),
+    targets: List[str] = Query(default=None),
+    optimize: bool = Query(default=False),
+    timeout: float = Query(default=None, gt=0),
+    profile: bool = Query(default=False),
     db: Database = Depends(get_db),
+    executor: FlowExecutor = Depends(get_flow_executor),
 ):
     try:
         data = db[COLLECTION_NAME].find_one({"flow_uid": flow_uid})
@@ -218,28 +474,37 @@ async def execute_flow_by_flow_uid(
 
         flow_graph_dict = data.get("flow_graph", "")
 
-        runner = Runner(flow_graph_dict)
+        token = cancel_token(timeout)
+        make_runner = partial(
+            Runner,
+            flow_graph_dict,
+            flow_uid=flow_uid,
+            incremental=incremental,
+            targets=targets,
+            optimize=optimize,
+            cancel_token=token,
+            profile=profile,
+            plan_cache=flow_plans,
+            database=db,
+            reported=outputs if only_outputs else None,
+        )
 
-        # --- Non-streaming mode ---
-        outputs_raw = list(runner.execute())
+        return await respond(
+            request,
+            executor,
+            make_runner,
+            token,
+            negotiate_format(request, output_format),
+            node_id=node_id,
+            outputs=outputs,
+            preview_rows=preview_rows,
+        )
 
-        # Safely parse outputs
-        outputs = []
-        for o in outputs_raw:
-            if isinstance(o, dict):
-                outputs.append(o)
-            elif isinstance(o, str) and o.strip():
-                try:
-                    outputs.append(json.loads(o))
-                except json.JSONDecodeError:
-                    # fallback: store raw string
-                    outputs.append({"raw": o})
-            else:
-                # fallback for None or unexpected type
-                outputs.append({"raw": str(o)})
+    except ExecutorRejected as e:
+        return rejected_response(e)
 
-        # --- return full data ---
-        return JSONResponse({"status": "success", "data": outputs}, status_code=200)
+    except ExecutionCancelled as e:
+        return cancelled_response(e)
 
     except Exception as e:
         print("Error executing flow:", e)
@@ -249,6 +514,33 @@ async def execute_flow_by_flow_uid(
         )
 
 
+@router.post("/plan")
+async def explain_flow_plan(
+    request: Request,
+    targets: List[str] = Query(default=None),
+    outputs: List[str] = Query(default=None),
+):
+    try:
+        payload = await request.json()
+        flow_graph = payload.get("flow_graph")
+
+        if not flow_graph:
+            return JSONResponse(
+                {"status": "error", "message": "Flow graph is empty"},
+                status_code=200,
+            )
+
+        plan = optimize_flow(flow_graph, protected=targets, reported=outputs)
+        return JSONResponse({"status": "success", "data": plan.explain()})
+
+    except Exception as e:
+        print("Error optimizing flow:", e)
+        return JSONResponse(
+            {"status": "error", "message": "Failed to optimize flow", "detail": str(e)},
+            status_code=500,
+        )
+
+
 ################################################################################
 # Metadata Methods
 ################################################################################
@@ -259,6 +551,7 @@ async def execute_flow_metadata(
     request: Request,
     db: Database = Depends(get_db),
     stream: bool = Query(default=False),
+    profile: bool = Query(default=False),
 ):
     try:
         payload = await request.json()
@@ -270,7 +563,7 @@ async def execute_flow_metadata(
                 status_code=200,
             )
 
-        pseudo_runner = PseudoRunner(flow_graph)
+        pseudo_runner = PseudoRunner(flow_graph, profile=profile)
 
         if stream:
             return StreamingResponse(
@@ -0,0 +1,398 @@
+import os
+import json
+import time
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request
+
+from api.utils import generate_uid, utc_now
+from flow_graph.cancellation import CancelToken, ExecutionCancelled
+
+################################################################################
+# Constants
+################################################################################
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+BACKEND_MEMORY = "memory"
+BACKEND_DISK = "disk"
+
+DEFAULT_BACKEND = os.getenv("FLOW_JOB_BACKEND", BACKEND_MEMORY).lower()
+DEFAULT_JOB_DIR = os.getenv("FLOW_JOB_DIR", os.path.join(os.getcwd(), ".jobs"))
+DEFAULT_WORKERS = int(os.getenv("FLOW_JOB_WORKERS", "2"))
+DEFAULT_MAX_PENDING = int(os.getenv("FLOW_JOB_MAX_PENDING", "64"))
+DEFAULT_TTL = int(os.getenv("FLOW_JOB_TTL", "3600"))
+# Seconds a job may run before it is stopped, 0 for no limit
+DEFAULT_JOB_TIMEOUT = float(os.getenv("FLOW_JOB_TIMEOUT", "0"))
+
+
+################################################################################
+# Errors
+################################################################################
+
+
+class JobNotFound(Exception):
+    pass
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+################################################################################
+# Job
+################################################################################
+
+
+def instance_owner() -> dict:
+    """Identifies this API process: host, pid and a per-start boot id."""
+    return {"host": socket.gethostname(), "pid": os.getpid(), "boot_id": generate_uid("boot", 16)}
+
+
+def process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # Signal 0 is CTRL_C_EVENT there, never send it
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        # Someone else's process, or a platform without signal 0
+        return True
+    return True
+
+
+class Job:
+    def __init__(self, job_id: str, flow_uid: str = None, owner: dict = None):
+        self.job_id = job_id
+        self.flow_uid = flow_uid
+        # The process running it, see instance_owner()
+        self.owner = owner
+        self.status = JOB_QUEUED
+        self.progress = {"completed": 0, "total": None, "current_node": None}
+        self.error = None
+        self.created_at = utc_now()
+        self.started_at = None
+        self.finished_at = None
+        # Epoch seconds, used for TTL expiry
+        self.finished_ts = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "flow_uid": self.flow_uid,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "finished_ts": self.finished_ts,
+        }
+
+    def to_record(self) -> dict:
+        """What the stores keep: the API view plus the owning process."""
+        return {**self.to_dict(), "owner": self.owner}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        job = cls(data["job_id"], data.get("flow_uid"), data.get("owner"))
+        for key in (
+            "status",
+            "progress",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "finished_ts",
+        ):
+            setattr(job, key, data.get(key))
+        return job
+
+
+################################################################################
+# Backends
+################################################################################
+
+
+class MemoryJobStore:
+    def __init__(self):
+        self._jobs: Dict[str, dict] = {}
+        self._results: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: Job):
+        with self._lock:
+            self._jobs[job.job_id] = job.to_record()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            data = self._jobs.get(job_id)
+        return Job.from_dict(data) if data else None
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [Job.from_dict(data) for data in jobs]
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+
+    def save_result(self, job_id: str, body: str):
+        with self._lock:
+            self._results[job_id] = body
+
+    def load_result(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            return self._results.get(job_id)
+
+
+class DiskJobStore:
+    """
+    One `<job_id>.json` status file and one `<job_id>.result.json` body per
+    job, so results survive a restart of the API process.
+    """
+
+    def __init__(self, directory: str = DEFAULT_JOB_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, job_id: str, suffix: str = ".json") -> str:
+        return os.path.join(self.directory, f"{os.path.basename(job_id)}{suffix}")
+
+    def _write(self, path: str, content: str):
+        # Write then rename so readers never see a half written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def save(self, job: Job):
+        with self._lock:
+            self._write(self._path(job.job_id), json.dumps(job.to_record()))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        try:
+            with open(self._path(job_id), "r") as f:
+                return Job.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def list(self) -> List[Job]:
+        jobs = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json") and not name.endswith(".result.json"):
+                job = self.get(name[: -len(".json")])
+                if job is not None:
+                    jobs.append(job)
+        return jobs
+
+    def delete(self, job_id: str):
+        with self._lock:
+            for suffix in (".json", ".result.json"):
+                try:
+                    os.remove(self._path(job_id, suffix))
+                except OSError:
+                    pass
+
+    def save_result(self, job_id: str, body: str):
+        with self._lock:
+            self._write(self._path(job_id, ".result.json"), body)
+
+    def load_result(self, job_id: str) -> Optional[str]:
+        try:
+            with open(self._path(job_id, ".result.json"), "r") as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+def create_store(backend: str = DEFAULT_BACKEND):
+    if backend == BACKEND_MEMORY:
+        return MemoryJobStore()
+    if backend == BACKEND_DISK:
+        return DiskJobStore()
+    raise ValueError(f"Invalid job backend: {backend}")
+
+
+################################################################################
+# Manager
+################################################################################
+
+
+class JobManager:
+    """
+    Runs flows in the background on its own worker pool. Each job records
+    per-node progress, and its encoded result is kept for `ttl` seconds
+    after it finishes.
+
+    `execute(job_id, progress, cancel_token)` does the actual work and
+    returns the response body to store.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        workers: int = DEFAULT_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        ttl: int = DEFAULT_TTL,
+        timeout: float = DEFAULT_JOB_TIMEOUT,
+    ):
+        self.store = store if store is not None else create_store()
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.timeout = timeout or None
+        self.owner = instance_owner()
+        self._pool = None
+        self._futures = {}
+        self._tokens: Dict[str, CancelToken] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Jobs submitted and not finished yet, queued or running."""
+        return len(self._futures)
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="flow-job"
+            )
+        # Jobs left unfinished by a previous process will never complete.
+        # The disk store is shared, other workers' jobs are left alone.
+        for job in self.store.list():
+            if not job.finished and self._orphaned(job):
+                self._finish(job, JOB_FAILED, "Interrupted by a server restart")
+
+    def _orphaned(self, job: Job) -> bool:
+        """True when the job's process is known to be gone."""
+        owner = job.owner or {}
+        if owner.get("host") != self.owner["host"] or not isinstance(owner.get("pid"), int):
+            # Another host's liveness can't be checked from here
+            return False
+        if owner["pid"] == self.owner["pid"]:
+            # Our pid, so an earlier start of this process (containers reuse pids)
+            return owner.get("boot_id") != self.owner["boot_id"]
+        return not process_alive(owner["pid"])
+
+    def shutdown(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, execute: Callable, flow_uid: str = None) -> Job:
+        self.purge_expired()
+        with self._lock:
+            if self._pool is None:
+                raise RuntimeError("Job manager is not running")
+            if len(self._futures) >= self.max_pending:
+                raise JobQueueFull()
+            job = Job(generate_uid("job", 16), flow_uid, self.owner)
+            self.store.save(job)
+            # The deadline starts in _run, queueing time doesn't count
+            token = CancelToken()
+            future = self._pool.submit(self._run, job.job_id, execute, token)
+            self._futures[job.job_id] = future
+            self._tokens[job.job_id] = token
+        future.add_done_callback(lambda _: self._forget(job.job_id))
+        return job
+
+    def get(self, job_id: str) -> Job:
+        self.purge_expired()
+        job = self.store.get(job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return job
+
+    def list(self) -> List[Job]:
+        self.purge_expired()
+        return sorted(self.store.list(), key=lambda job: job.created_at)
+
+    def result(self, job_id: str) -> Optional[str]:
+        self.get(job_id)
+        return self.store.load_result(job_id)
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job.finished:
+            return job
+
+        with self._lock:
+            future = self._futures.get(job_id)
+            token = self._tokens.get(job_id)
+        if token is not None:
+            token.cancel()
+        if future is not None and future.cancel():
+            # Never started, so nothing else will record the cancellation
+            self._finish(job, JOB_CANCELLED)
+        return self.store.get(job_id)
+
+    def purge_expired(self):
+        now = time.time()
+        for job in self.store.list():
+            if job.finished_ts is not None and now - job.finished_ts > self.ttl:
+                self.store.delete(job.job_id)
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._tokens.pop(job_id, None)
+
+    def _finish(self, job: Job, status: str, error: str = None):
+        job.status = status
+        job.error = error
+        job.finished_at = utc_now()
+        job.finished_ts = time.time()
+        self.store.save(job)
+
+    def _run(self, job_id: str, execute: Callable, token: CancelToken):
+        job = self.store.get(job_id)
+        if job is None:
+            return
+        job.status = JOB_RUNNING
+        job.started_at = utc_now()
+        token.start_deadline(self.timeout)
+        self.store.save(job)
+
+        def progress(node_id: str, completed: int, total: int):
+            job.progress = {"completed": completed, "total": total, "current_node": node_id}
+            self.store.save(job)
+
+        try:
+            body = execute(job_id, progress, token)
+            token.check()
+        except ExecutionCancelled as e:
+            if token.expired:
+                self._finish(job, JOB_FAILED, str(e))
+            else:
+                self._finish(job, JOB_CANCELLED)
+            return
+        except Exception as e:
+            print("Error running job :", e)
+            self._finish(job, JOB_FAILED, str(e))
+            return
+
+        self.store.save_result(job_id, body)
+        self._finish(job, JOB_SUCCEEDED)
+
+
+def get_job_manager(request: Request) -> JobManager:
+    return request.app.state.job_manager
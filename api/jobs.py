@@ -0,0 +1,177 @@
+from functools import partial
+from typing import List
+
+from fastapi import APIRouter, Depends, Request, Query, Response
+from fastapi.responses import JSONResponse
+
+from pymongo.database import Database
+
+from api.tags import APITags
+from api.db import get_db
+from api.flows import COLLECTION_NAME, encode_results, success_body
+from api.job_manager import (
+    JOB_CANCELLED,
+    JOB_FAILED,
+    JOB_SUCCEEDED,
+    JobManager,
+    JobNotFound,
+    JobQueueFull,
+    get_job_manager,
+)
+
+from flow_graph.runner import Runner
+from flow_graph.plan_cache import flow_plans
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=[APITags.JOBS],
+)
+
+
+################################################################################
+# Helpers
+################################################################################
+
+
+def run_flow_job(
+    flow_graph: dict,
+    runner_options: dict,
+    outputs: List[str],
+    preview_rows: int,
+    job_id: str,
+    progress,
+    cancel_token,
+) -> str:
+    runner = Runner(
+        flow_graph,
+        progress_callback=progress,
+        cancel_token=cancel_token,
+        plan_cache=flow_plans,
+        **runner_options,
+    )
+    encoded = list(encode_results(runner.execute_nodes(), outputs, preview_rows))
+    if runner.error is not None:
+        # The run stopped at a failed node, the job must not look finished
+        raise runner.error
+    return success_body(encoded, runner.profile_report() if runner.profile else None)
+
+
+def not_found(job_id: str) -> JSONResponse:
+    return JSONResponse(
+        {"status": "error", "message": f"Job {job_id} not found"}, status_code=404
+    )
+
+
+################################################################################
+# Job Methods
+################################################################################
+
+
+@router.post("")
+async def submit_job(
+    request: Request,
+    db: Database = Depends(get_db),
+    manager: JobManager = Depends(get_job_manager),
+    incremental: bool = Query(default=False),
+    outputs: List[str] = Query(default=None),
+    only_outputs: bool = Query(default=False),
+    preview_rows: int = Query(default=None, ge=0),
+    targets: List[str] = Query(default=None),
+    optimize: bool = Query(default=False),
+    profile: bool = Query(default=False),
+):
+    try:
+        payload = await request.json()
+        flow_uid = payload.get("flow_uid")
+        flow_graph = payload.get("flow_graph")
+
+        if not flow_graph and flow_uid:
+            data = db[COLLECTION_NAME].find_one({"flow_uid": flow_uid})
+            flow_graph = data.get("flow_graph") if data else None
+
+        if not flow_graph:
+            return JSONResponse(
+                {"status": "error", "message": "Flow graph is empty"},
+                status_code=200,
+            )
+
+        runner_options = {
+            "flow_uid": flow_uid,
+            "incremental": incremental,
+            "targets": targets,
+            "optimize": optimize,
+            "profile": profile,
+            "database": db,
+            "reported": outputs if only_outputs else None,
+        }
+        job = manager.submit(
+            partial(run_flow_job, flow_graph, runner_options, outputs, preview_rows),
+            flow_uid=flow_uid,
+        )
+        return JSONResponse({"status": "success", "data": job.to_dict()}, status_code=202)
+
+    except JobQueueFull:
+        return JSONResponse(
+            {"status": "error", "message": "Too many pending jobs, retry later"},
+            status_code=429,
+            headers={"Retry-After": "5"},
+        )
+
+    except Exception as e:
+        print("Error submitting job :", e)
+        return JSONResponse(
+            {"status": "error", "message": "Failed to submit job", "detail": str(e)},
+            status_code=500,
+        )
+
+
+@router.get("")
+async def get_all_jobs(manager: JobManager = Depends(get_job_manager)):
+    jobs = [job.to_dict() for job in manager.list()]
+    return JSONResponse({"status": "success", "data": jobs})
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, manager: JobManager = Depends(get_job_manager)):
+    try:
+        job = manager.get(job_id)
+    except JobNotFound:
+        return not_found(job_id)
+    return JSONResponse({"status": "success", "data": job.to_dict()})
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str, manager: JobManager = Depends(get_job_manager)):
+    try:
+        job = manager.get(job_id)
+    except JobNotFound:
+        return not_found(job_id)
+
+    if job.status == JOB_SUCCEEDED:
+        body = manager.result(job_id)
+        if body is not None:
+            return Response(content=body, media_type="application/json", status_code=200)
+        return not_found(job_id)
+
+    if job.status == JOB_FAILED:
+        return JSONResponse(
+            {"status": "error", "message": "Job failed", "detail": job.error, "data": job.to_dict()},
+            status_code=500,
+        )
+    if job.status == JOB_CANCELLED:
+        return JSONResponse(
+            {"status": "error", "message": "Job was cancelled", "data": job.to_dict()},
+            status_code=409,
+        )
+
+    # Still queued or running
+    return JSONResponse({"status": "pending", "data": job.to_dict()}, status_code=202)
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str, manager: JobManager = Depends(get_job_manager)):
+    try:
+        job = manager.cancel(job_id)
+    except JobNotFound:
+        return not_found(job_id)
+    return JSONResponse({"status": "success", "data": job.to_dict()})
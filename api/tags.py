@@ -1,6 +1,8 @@
 class APITags:
     DASHBOARD = "Dashboard APi"
     FLOWS = "Flows API"
+    JOBS = "Jobs API"
 
     HEALTH_CHECK = "Health Check"
+    METRICS = "Metrics"
     DOCS = "[INTERNAL] Documentation"
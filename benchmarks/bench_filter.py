@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Vectorized Filter masks against the per-row Series.apply reference
+
+    python -m benchmarks.bench_filter --rows 10000 100000 1000000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_serializer import timed
+from flow_graph.filter import Filter
+
+REFERENCE = {
+    "gt": lambda x, y: x > y,
+    "in": lambda x, y: x in y,
+    "contains": lambda x, y: y in x if isinstance(x, str) else False,
+    "startswith": lambda x, y: str(x).startswith(y),
+    "range": lambda x, low, high: x >= low and x <= high,
+}
+
+CASES = [
+    ("revenue", "gt", 2000, None),
+    ("units", "in", list(range(0, 500, 7)), None),
+    ("product", "contains", "B", None),
+    ("product", "startswith", "Product A", None),
+    ("units", "range", 100, 200),
+]
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "revenue": rng.normal(2000, 100, rows),
+            "units": rng.integers(0, 500, rows),
+            "product": rng.choice(["Product A", "Product B", "Product C"], rows),
+        }
+    )
+
+
+def reference(df, field, condition, value1, value2):
+    fn = REFERENCE[condition]
+    if value2:
+        mask = df[field].apply(lambda x: fn(x, value1, value2))
+    else:
+        mask = df[field].apply(lambda x: fn(x, value1))
+    return df[mask].reset_index(drop=True)
+
+
+def vectorized(df, field, condition, value1, value2):
+    return Filter(df).run(field=field, condition=condition, value1=value1, value2=value2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'condition':>11} {'apply ms':>10} {'vectorized ms':>14} {'speedup':>8}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        for case in CASES:
+            old_time, old = timed(reference, df, *case, repeat=args.repeat)
+            new_time, new = timed(vectorized, df, *case, repeat=args.repeat)
+            assert old.equals(new), f"{case[1]} differs from the reference"
+            print(
+                f"{rows:>10} {case[1]:>11} {old_time * 1000:>10.1f} "
+                f"{new_time * 1000:>14.1f} {old_time / new_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Throughput of the columnar record flattener against json_normalize on
+nested API log records
+
+    python -m benchmarks.bench_flatten --rows 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+from pandas import json_normalize
+
+from benchmarks.bench_serializer import timed
+from flow_graph.data_source import DataSource
+from flow_graph.flatten import flatten_records
+
+METHODS = ["GET", "POST", "PUT", "DELETE"]
+PATHS = ["/api/v1/flows", "/api/v1/jobs", "/api/v1/metadata", "/health"]
+AGENTS = ["Mozilla/5.0", "curl/8.4.0", "python-requests/2.31"]
+
+
+def make_log_records(rows: int, seed: int = 0) -> list:
+    """Request logs shaped like our gateway's: net.client.*, http.request.headers.*..."""
+    rng = np.random.default_rng(seed)
+    status = rng.choice([200, 201, 204, 400, 404, 500], rows, p=[0.7, 0.1, 0.05, 0.06, 0.06, 0.03])
+    latency = rng.gamma(2.0, 40.0, rows).round(3)
+    records = []
+    for i in range(rows):
+        headers = {
+            "user-agent": AGENTS[i % 3],
+            "accept": "application/json",
+            "content-length": int(latency[i] * 10),
+        }
+        if i % 4 == 0:
+            # Optional headers: json_normalize leaves NaN where they're missing
+            headers["x-request-id"] = f"req-{i:08d}"
+        records.append(
+            {
+                "timestamp": f"2025-01-{i % 28 + 1:02d}T{i % 24:02d}:{i % 60:02d}:00Z",
+                "service": "dynamatics-api",
+                "level": "error" if status[i] >= 500 else "info",
+                "net": {
+                    "client": {"ip": f"10.0.{i % 256}.{i % 199}", "port": 40000 + i % 20000},
+                    "server": {"ip": "10.1.0.5", "port": 8000},
+                },
+                "http": {
+                    "request": {
+                        "method": METHODS[i % 4],
+                        "path": PATHS[i % 4],
+                        "headers": headers,
+                    },
+                    "response": {"status": int(status[i]), "bytes": int(latency[i] * 37)},
+                },
+                "metrics": {"response_time_ms": float(latency[i]), "db_queries": i % 7},
+                "tags": ["prod", "eu-west-1"],
+            }
+        )
+    return records
+
+
+def read_file(path: str):
+    return DataSource.read_ndjson(path, None, 10_000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'json_normalize rows/s':>22} {'columnar rows/s':>16} {'speedup':>8} {'ndjson file rows/s':>19}")
+    for rows in args.rows:
+        records = make_log_records(rows)
+        old_time, old = timed(json_normalize, records, repeat=args.repeat)
+        new_time, new = timed(flatten_records, records, repeat=args.repeat)
+        assert list(old.columns) == list(new.columns) and old.equals(new), "flattened frame differs from json_normalize"
+
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson", delete=False) as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+        try:
+            file_time, _ = timed(read_file, f.name, repeat=args.repeat)
+        finally:
+            os.remove(f.name)
+
+        print(
+            f"{rows:>10} {rows / old_time:>22,.0f} {rows / new_time:>16,.0f} "
+            f"{old_time / new_time:>7.1f}x {rows / file_time:>19,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Operator, end-to-end Runner and serialization timings, checked against the
+stored baselines
+
+    python -m benchmarks.bench_flows --rows 1000 10000 100000
+    python -m benchmarks.bench_flows --rows 1000 10000 100000 --save-baseline
+    python -m benchmarks.bench_flows --rows 10000000 --shapes 1x2 --repeat 1
+
+Exits with status 1 when a case is slower than its baseline by more than the
+regression threshold. Baselines are only comparable on the machine that
+recorded them, so re-record them (--save-baseline) when the box changes.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+
+import pandas as pd
+
+from benchmarks.bench_serializer import timed
+from flow_graph.arrow_io import ARROW_AVAILABLE, ipc_stream_bytes
+from flow_graph.data_source import DataSource
+from flow_graph.filter import Filter
+from flow_graph.forecast import Forecast
+from flow_graph.group import Group
+from flow_graph.merge import Merge
+from flow_graph.mock_data.generate_timeseries import make_timeseries_frame
+from flow_graph.runner import Runner
+from flow_graph.serializer import encode_node_output
+from flow_graph.sort import Sort
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.25"))
+# Absolute slack in seconds, timings this small are mostly scheduler noise
+NOISE_FLOOR = 0.002
+# Building records for json_normalize dominates memory past this size
+DATASOURCE_MAX_ROWS = 1_000_000
+DEFAULT_SHAPES = ["1x2", "2x4", "4x8"]
+
+REGIONS = pd.DataFrame(
+    {
+        "region": ["North", "South", "East", "West"],
+        "manager": ["Ana", "Bo", "Cy", "Di"],
+        "budget": [100_000, 80_000, 120_000, 90_000],
+    }
+)
+
+
+################################################################################
+# Cases
+################################################################################
+
+
+def operator_cases(df: pd.DataFrame) -> dict:
+    cases = {
+        "filter": lambda: Filter(df).run(field="revenue", condition="gt", value1=2100),
+        "sort": lambda: Sort(df).run(field="revenue"),
+        "group": lambda: Group(df).run(
+            ["product", "region"], ["sum", "mean"], ["cost", "revenue"]
+        ),
+        "merge": lambda: Merge(df, REGIONS).run(
+            how="inner", left_on="region", right_on="region"
+        ),
+        "forecast": lambda: Forecast(df).run(
+            target="cost", ts_col="date", method="exp_smoothing", horizon=7
+        ),
+        "serialize_json": lambda: encode_node_output("export-1", df),
+    }
+    if len(df) <= DATASOURCE_MAX_ROWS:
+        records = df.assign(date=df["date"].astype(str)).to_dict(orient="records")
+        cases["dataSource"] = lambda: DataSource(records)
+    if ARROW_AVAILABLE:
+        cases["serialize_arrow"] = lambda: ipc_stream_bytes("export-1", df)
+    return cases
+
+
+def make_flow(df: pd.DataFrame, width: int, depth: int) -> dict:
+    """
+    One dataSource fanning out into `width` branches of `depth` alternating
+    filter and sort nodes, each branch ending in an export.
+    """
+    nodes = [{"id": "dataSource-1", "type": "dataSource", "config": {"input": df}}]
+    edges = []
+    for branch in range(width):
+        previous = "dataSource-1"
+        for level in range(depth):
+            node_id = f"node-{branch}-{level}"
+            if level % 2 == 0:
+                node = {
+                    "id": node_id,
+                    "type": "filter",
+                    "config": {"field": "cost", "condition": "gt", "value": 900 + branch + level},
+                }
+            else:
+                node = {"id": node_id, "type": "sort", "config": {"field": "revenue", "asc": level % 4 == 1}}
+            nodes.append(node)
+            edges.append({"source": previous, "target": node_id})
+            previous = node_id
+        nodes.append({"id": f"export-{branch}", "type": "export", "config": {}})
+        edges.append({"source": previous, "target": f"export-{branch}"})
+    return {"nodes": nodes, "edges": edges}
+
+
+def run_flow(flow: dict) -> int:
+    """Runs the flow and encodes every node, like /execute does."""
+    encoded = 0
+    for result in Runner(flow, cache=None).execute_nodes():
+        encoded += len(result.to_json())
+    return encoded
+
+
+def run_suite(rows_list, shapes, repeat: int) -> dict:
+    results = {}
+    for rows in rows_list:
+        df = make_timeseries_frame(rows)
+        for name, case in operator_cases(df).items():
+            results[f"operator/{name}/{rows}"], _ = timed(case, repeat=repeat)
+        for shape in shapes:
+            width, depth = (int(part) for part in shape.split("x"))
+            flow = make_flow(df, width, depth)
+            results[f"flow/{shape}/{rows}"], _ = timed(run_flow, flow, repeat=repeat)
+        print(f"   - {rows:,} rows done", file=sys.stderr)
+    return results
+
+
+################################################################################
+# Baselines
+################################################################################
+
+
+def load_baseline(path: str) -> dict:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"results": {}}
+
+
+def save_baseline(path: str, results: dict, threshold: float):
+    baseline = load_baseline(path)
+    baseline["threshold"] = threshold
+    baseline["environment"] = {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+    # Merge, so recording one size doesn't drop the others
+    baseline.setdefault("results", {}).update(
+        {name: round(seconds, 6) for name, seconds in results.items()}
+    )
+    baseline["results"] = dict(sorted(baseline["results"].items()))
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Prints a comparison table and returns the names of regressed cases."""
+    regressions = []
+    stored = baseline.get("results", {})
+    print(f"{'case':<32} {'baseline ms':>12} {'current ms':>11} {'ratio':>7}  status")
+    for name, seconds in results.items():
+        base = stored.get(name)
+        if base is None:
+            print(f"{name:<32} {'-':>12} {seconds * 1000:>11.2f} {'-':>7}  new")
+            continue
+        ratio = seconds / base if base else float("inf")
+        regressed = seconds > base * (1 + threshold) and seconds - base > NOISE_FLOOR
+        status = "REGRESSED" if regressed else "ok"
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<32} {base * 1000:>12.2f} {seconds * 1000:>11.2f} {ratio:>6.2f}x  {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--shapes", nargs="*", default=DEFAULT_SHAPES, help="flow shapes as WIDTHxDEPTH, none to skip flows")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="allowed slowdown as a fraction, defaults to the baseline's or BENCH_REGRESSION_THRESHOLD",
+    )
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    threshold = args.threshold
+    if threshold is None:
+        threshold = baseline.get("threshold", DEFAULT_THRESHOLD)
+
+    results = run_suite(args.rows, args.shapes, args.repeat)
+    regressions = compare(results, baseline, threshold)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, threshold)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than {threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
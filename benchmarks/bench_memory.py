@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Memory allocated by each node with and without pandas copy-on-write
+
+    python -m benchmarks.bench_memory --rows 200000
+"""
+import argparse
+import gc
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from flow_graph.cow import copy_on_write_enabled, enable_copy_on_write
+from flow_graph.runner import Runner
+
+
+def make_flow(rows: int) -> dict:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2000-01-01", periods=rows, freq="h"),
+            "cost": rng.normal(1000, 50, rows),
+            "revenue": rng.normal(2000, 100, rows),
+            "product": rng.choice(["Product A", "Product B"], rows),
+        }
+    )
+    return {
+        "nodes": [
+            {"id": "dataSource-1", "type": "dataSource", "config": {"input": df}},
+            {"id": "sort-1", "type": "sort", "config": {"field": "date"}},
+            {
+                "id": "forecast-1",
+                "type": "forecast",
+                "config": {"target": "cost", "ts_col": "date", "method": "mean", "horizon": 7, "combine": True},
+            },
+            {"id": "export-1", "type": "export", "config": {}},
+        ],
+        "edges": [
+            {"source": "dataSource-1", "target": "sort-1"},
+            {"source": "sort-1", "target": "forecast-1"},
+            {"source": "forecast-1", "target": "export-1"},
+        ],
+    }
+
+
+def measure(flow: dict) -> dict:
+    """Net bytes allocated while producing each node's output."""
+    runner = Runner(flow, executor="sync", cache=None, retain_outputs=True)
+    gc.collect()
+    tracemalloc.start()
+    per_node = {}
+    before = tracemalloc.get_traced_memory()[0]
+    for result in runner.execute_nodes():
+        current = tracemalloc.get_traced_memory()[0]
+        per_node[result.node_id] = current - before
+        before = current
+    tracemalloc.stop()
+    return per_node
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    flow = make_flow(args.rows)
+    original = copy_on_write_enabled()
+    try:
+        enable_copy_on_write(False)
+        without_cow = measure(flow)
+        enable_copy_on_write(True)
+        with_cow = measure(flow)
+    finally:
+        enable_copy_on_write(original)
+
+    print(f"{'node':>14} {'copying MB':>12} {'CoW MB':>10} {'saved MB':>10}")
+    for node_id in without_cow:
+        old, new = without_cow[node_id] / 1e6, with_cow[node_id] / 1e6
+        print(f"{node_id:>14} {old:>12.1f} {new:>10.1f} {old - new:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Throughput of the columnar serializer against the row-wise reference
+
+    python -m benchmarks.bench_serializer --rows 1000 10000 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from flow_graph.serializer import serialize_output, serialize_records
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    cost = rng.normal(1000, 50, rows).round(2)
+    cost[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("2020-01-01", periods=rows, freq="min"),
+            "cost": cost,
+            "revenue": rng.normal(2000, 100, rows),
+            "units": rng.integers(0, 500, rows),
+            "product": rng.choice(["Product A", "Product B", "Product C"], rows),
+            "is_active": rng.random(rows) < 0.5,
+        }
+    )
+
+
+def timed(fn, *args, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def reference(df):
+    return json.dumps(serialize_records(df))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'row-wise rows/s':>18} {'columnar rows/s':>18} {'speedup':>8}")
+    for rows in args.rows:
+        df = make_frame(rows)
+        old_time, old = timed(reference, df, repeat=args.repeat)
+        new_time, new = timed(serialize_output, df, repeat=args.repeat)
+        assert old == new, "columnar output differs from the reference"
+        print(
+            f"{rows:>10} {rows / old_time:>18,.0f} {rows / new_time:>18,.0f} "
+            f"{old_time / new_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
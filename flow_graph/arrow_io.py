@@ -0,0 +1,87 @@
+import json
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+from flow_graph.serializer import flatten_columns
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except Exception:
+    ARROW_AVAILABLE = False
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+
+def _require_arrow():
+    if not ARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for Arrow/Parquet output. Install: pip install pyarrow")
+
+
+def _column_to_arrow(series: pd.Series):
+    try:
+        # Numeric and datetime columns are wrapped without copying
+        return pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Mixed object columns (dicts, lists of mixed types...) travel as JSON text
+        return pa.array(
+            [None if v is None else json.dumps(v, default=str) for v in series.tolist()],
+            type=pa.string(),
+        )
+
+
+def to_arrow_table(output, node_id: str = None):
+    _require_arrow()
+    if not isinstance(output, pd.DataFrame):
+        output = pd.DataFrame(output)
+    df = flatten_columns(output)
+
+    names = [str(c) for c in df.columns]
+    arrays = [_column_to_arrow(df.iloc[:, i]) for i in range(len(names))]
+    table = pa.Table.from_arrays(arrays, names=names)
+    if node_id is not None:
+        table = table.replace_schema_metadata({"node_id": str(node_id)})
+    return table
+
+
+def _single_batch(table):
+    batches = table.combine_chunks().to_batches()
+    if len(batches) == 1:
+        return batches[0]
+    if not batches:
+        return pa.RecordBatch.from_arrays(
+            [pa.array([], type=field.type) for field in table.schema],
+            schema=table.schema,
+        )
+    return pa.Table.from_batches(batches).combine_chunks().to_batches()[0]
+
+
+def ipc_stream_bytes(node_id: str, output) -> bytes:
+    """
+    One self-contained Arrow IPC stream holding a single record batch. The
+    node id travels in the schema metadata.
+    """
+    table = to_arrow_table(output, node_id=node_id)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_batch(_single_batch(table))
+    return sink.getvalue().to_pybytes()
+
+
+def iter_ipc_streams(results: Iterable) -> Iterator[bytes]:
+    """
+    Concatenated IPC streams, one per NodeResult. Read them back by calling
+    `pyarrow.ipc.open_stream` repeatedly on the same input until it is exhausted.
+    """
+    for result in results:
+        yield ipc_stream_bytes(result.node_id, result.output)
+
+
+def parquet_bytes(output, node_id: str = None) -> bytes:
+    table = to_arrow_table(output, node_id=node_id)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,156 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import pandas as pd
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("FLOW_CACHE_MAX_ENTRIES", "256"))
+DEFAULT_MAX_BYTES = int(os.getenv("FLOW_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+MOCK_DATA_DIR = os.path.join(os.path.dirname(__file__), "mock_data")
+
+# Live database reads: nothing in their config says the data changed
+UNCACHEABLE_TYPES = {"mongosource"}
+
+
+class UnhashableConfig(Exception):
+    pass
+
+
+def file_signature(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def mock_data_path(name: str) -> str:
+    return os.path.join(MOCK_DATA_DIR, f"{name}.ndjson")
+
+
+def mock_data_names() -> List[str]:
+    return sorted(
+        name[: -len(".ndjson")]
+        for name in os.listdir(MOCK_DATA_DIR)
+        if name.endswith(".ndjson")
+    )
+
+
+def _reject(value: Any):
+    # DataFrames and other live objects have no stable content hash here
+    raise UnhashableConfig(type(value).__name__)
+
+
+def node_key(node_type: str, config: dict, upstream_keys: List[str]) -> Optional[str]:
+    """
+    Stable content hash of a node: its type, its config and the keys of the
+    nodes feeding it. Returns None when the node cannot be cached.
+    """
+    if node_type in UNCACHEABLE_TYPES or any(key is None for key in upstream_keys):
+        return None
+
+    payload = {"type": node_type, "config": config, "inputs": upstream_keys}
+    if isinstance(config.get("input"), str):
+        # Mock datasets are invalidated whenever the file on disk changes
+        payload["source"] = file_signature(mock_data_path(config["input"]))
+    return content_hash(payload)
+
+
+def content_hash(payload: Any) -> Optional[str]:
+    """sha256 of a JSON payload, None if it holds values JSON can't encode."""
+    try:
+        encoded = json.dumps(payload, sort_keys=True, default=_reject)
+    except (UnhashableConfig, ValueError):
+        return None
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def estimate_size(output: Any) -> int:
+    if isinstance(output, pd.DataFrame):
+        return int(output.memory_usage(index=True, deep=True).sum())
+    return len(json.dumps(output, default=str))
+
+
+class CachedNode:
+    def __init__(self, output):
+        self.output = output
+
+
+class NodeCache:
+    """
+    Thread-safe LRU of node outputs bounded by entry count and total bytes.
+    Cached outputs are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (output, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Optional[str]):
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Optional[str], output: Any):
+        if key is None or output is None:
+            return
+        size = estimate_size(output)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (output, size)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+node_cache = NodeCache()
@@ -0,0 +1,83 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+class ExecutionCancelled(Exception):
+    pass
+
+
+class DeadlineExceeded(ExecutionCancelled):
+    pass
+
+
+class CancelToken:
+    """
+    Cooperative cancellation for one flow execution. The Runner checks it
+    between nodes and long operators check it while they work; `timeout`
+    (seconds) turns it into a deadline as well.
+    """
+
+    def __init__(self, timeout: float = None):
+        self.deadline = None
+        self.reason = None
+        self._event = threading.Event()
+        self.start_deadline(timeout)
+
+    def start_deadline(self, timeout: float = None):
+        """Sets the deadline `timeout` seconds from now, None for no limit."""
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or self.expired
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        if self._event.is_set():
+            raise ExecutionCancelled(f"Execution {self.reason}")
+        if self.expired:
+            raise DeadlineExceeded("Execution deadline exceeded")
+
+
+# Operators run on pool threads, so the token of the node being computed is
+# kept per thread instead of being threaded through every operator signature
+_active = threading.local()
+
+
+@contextmanager
+def active(token: Optional[CancelToken]):
+    previous = getattr(_active, "token", None)
+    _active.token = token
+    try:
+        yield token
+    finally:
+        _active.token = previous
+
+
+def current_token() -> Optional[CancelToken]:
+    return getattr(_active, "token", None)
+
+
+def check_cancelled(*args, **kwargs):
+    """
+    Raises if the execution running on this thread was cancelled. Accepts
+    and ignores any arguments so it can be used as an optimizer callback.
+    """
+    token = current_token()
+    if token is not None:
+        token.check()
@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+
+# With pandas copy-on-write, frames handed from one node to the next share
+# their buffers until one side writes, so no defensive copies are needed and
+# shared (cached) outputs can never be mutated by a downstream node. The app
+# applies it at startup with enable_copy_on_write(COPY_ON_WRITE).
+COPY_ON_WRITE = os.getenv("FLOW_COPY_ON_WRITE", "1").lower() not in ("0", "false", "no")
+
+
+# pandas 3 always copies on write and deprecates the option, reading it
+# warns, so the state is looked up once here and then tracked in _enabled
+ALWAYS_COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+_enabled = ALWAYS_COPY_ON_WRITE or pd.get_option("mode.copy_on_write") is True
+
+
+def enable_copy_on_write(enabled: bool = True):
+    global _enabled
+    if ALWAYS_COPY_ON_WRITE:
+        # Can't be turned off there
+        _enabled = True
+        return
+    pd.set_option("mode.copy_on_write", enabled)
+    _enabled = enabled is True
+
+
+def copy_on_write_enabled() -> bool:
+    return _enabled
+
+
+def owned(df: pd.DataFrame) -> pd.DataFrame:
+    """A frame that is safe to modify without affecting `df`."""
+    if copy_on_write_enabled():
+        return df
+    return df.copy()
@@ -1,32 +1,87 @@
 import os
 import pandas as pd
-from typing import Union, List, Dict
-from pandas import json_normalize
+from typing import Union, List, Dict, Optional
 import json
 
+from flow_graph import sidecar
+from flow_graph.flatten import flatten_frame, flatten_records
+from flow_graph.dataset_cache import dataset_cache, warm_names
+
+# Rows read from a mock dataset unless the node sets `limit` (None reads all)
+DEFAULT_ROW_LIMIT = int(os.getenv("FLOW_DATASOURCE_ROW_LIMIT", "100"))
+# Lines parsed at a time, bounds the parser's working memory on full scans
+DEFAULT_CHUNKSIZE = int(os.getenv("FLOW_DATASOURCE_CHUNKSIZE", "10000"))
+
 
 class DataSource:
-    def __init__(self, input: Union[Dict, List, pd.DataFrame, str]):
+    def __init__(
+        self,
+        input: Union[Dict, List, pd.DataFrame, str],
+        limit: Optional[int] = DEFAULT_ROW_LIMIT,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        columns: Optional[List[str]] = None,
+    ):
         if isinstance(input, (Dict, List)):
             self.output = self._load_from_dict_or_list(input)
         elif isinstance(input, pd.DataFrame):
             self.output = input
         elif isinstance(input, str):
-            file_path = os.path.join(
-                os.path.dirname(__file__), "mock_data", f"{input}.ndjson"
-            )
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
-            data = pd.read_json(file_path, lines=True).head(100)
-            self.output = self._load_from_dict_or_list(data.to_dict(orient="records"))
+            # Shared with every other runner in the process, never mutated
+            self.output = load_dataset(input, limit, chunksize, columns)
         else:
             raise ValueError("Invalid input type")
 
-    def _load_from_dict_or_list(self, data: Union[Dict, List[Dict]]):
-        if isinstance(data, dict):
-            data = [data]
-        df = json_normalize(data, sep=".", max_level=None)
-        return df
+    @classmethod
+    def read_ndjson(
+        cls,
+        file_path: str,
+        limit: Optional[int],
+        chunksize: int,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        if limit is not None:
+            chunksize = min(chunksize, limit)
+
+        # Stop at the limit, the rest of the file is never read
+        frames = []
+        rows = 0
+        with pd.read_json(file_path, lines=True, chunksize=chunksize, nrows=limit) as reader:
+            for chunk in reader:
+                if limit is not None and rows + len(chunk) > limit:
+                    chunk = chunk.iloc[: limit - rows]
+                # Only the projected columns outlive the chunk they were parsed in
+                frames.append(sidecar.select_columns(cls._flatten(chunk), columns))
+                rows += len(chunk)
+                if limit is not None and rows >= limit:
+                    break
+
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+    @classmethod
+    def _flatten(cls, data: pd.DataFrame) -> pd.DataFrame:
+        if cls._has_nested_values(data):
+            # Flattens the object columns in place of a to_dict records round trip
+            return flatten_frame(data, sep=".")
+        # Already flat: nothing to flatten
+        return data
+
+    @staticmethod
+    def _load_from_dict_or_list(data: Union[Dict, List[Dict]]):
+        # Same frame as json_normalize(data, sep="."), built column-wise
+        return flatten_records(data, sep=".")
+
+    @staticmethod
+    def _has_nested_values(df: pd.DataFrame) -> bool:
+        for col in df.columns:
+            if df[col].dtype == object and any(
+                isinstance(v, dict) for v in df[col].to_numpy()
+            ):
+                return True
+        return False
 
     def get_info(self):
         return self.output.info()
@@ -50,3 +105,55 @@ class DataSource:
         if isinstance(val, (dict, list)):
             return json.dumps(val)
         return val
+
+
+def read_dataset(
+    file_path: str,
+    limit: Optional[int],
+    chunksize: int,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Full reads memory-map the columnar sidecar when there is one, or parse
+    the NDJSON and keep it as the sidecar for the next cold load. Limited
+    reads are always parsed: their dtypes come from their own rows.
+    """
+    if limit is None:
+        frame = sidecar.read(file_path, columns)
+        if frame is not None:
+            return frame
+        if sidecar.writable(file_path):
+            # Every column once, so later projections of any width are mapped
+            frame = DataSource.read_ndjson(file_path, None, chunksize)
+            sidecar.write(file_path, frame)
+            return sidecar.select_columns(frame, columns)
+    return DataSource.read_ndjson(file_path, limit, chunksize, columns)
+
+
+def load_dataset(
+    name: str,
+    limit: Optional[int] = DEFAULT_ROW_LIMIT,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """A mock dataset as a flat frame, parsed once per process and file version."""
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be a positive number of rows, or None for all rows")
+    if chunksize < 1:
+        raise ValueError("chunksize must be a positive number of rows")
+    return dataset_cache.get(name, limit, chunksize, load=read_dataset, columns=columns)
+
+
+def warm_datasets(names: List[str] = None) -> List[str]:
+    """
+    Parses the given datasets (FLOW_DATASET_WARM by default) in full ahead of
+    the first flow, which also writes their columnar sidecars.
+    """
+    warmed = []
+    for name in warm_names() if names is None else names:
+        try:
+            load_dataset(name, limit=None)
+            warmed.append(name)
+        except Exception as e:
+            print(f"Error warming dataset {name} :", e)
+    return warmed
@@ -0,0 +1,167 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from flow_graph.cache import estimate_size, file_signature, mock_data_names, mock_data_path
+from flow_graph.sidecar import select_columns
+
+DEFAULT_MAX_BYTES = int(os.getenv("FLOW_DATASET_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Comma separated dataset names loaded at startup, "*" for every mock dataset
+DEFAULT_WARM = os.getenv("FLOW_DATASET_WARM", "")
+
+
+class DatasetCache:
+    """
+    Process-wide LRU of parsed, flattened mock datasets bounded by total
+    bytes. Entries are keyed by dataset name, row limit and column subset
+    and are dropped as soon as the file's mtime or size changes. Frames are
+    shared by every runner in the process and must not be mutated.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (name, limit, columns) -> (signature, frame, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # One lock per key so concurrent runners parse a file only once
+        self._loading = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def _lookup(self, key, signature) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != signature:
+                # The file changed on disk since it was parsed
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get(
+        self,
+        name: str,
+        limit: Optional[int],
+        chunksize: int,
+        load: Callable[[str, Optional[int], int, Optional[List[str]]], pd.DataFrame],
+        columns: List[str] = None,
+    ) -> pd.DataFrame:
+        """
+        The dataset `name` capped to `limit` rows and reduced to `columns`,
+        parsed with `load(path, limit, chunksize, columns)` on a miss.
+        """
+        path = mock_data_path(name)
+        signature = file_signature(path)
+        if signature is None:
+            raise FileNotFoundError(f"File not found: {path}")
+
+        columns = tuple(sorted(columns)) if columns is not None else None
+        key = (name, limit, columns)
+        frame = self._lookup(key, signature)
+        if frame is None:
+            frame = self._derive(name, limit, columns, signature)
+        if frame is not None:
+            self._count(hit=True)
+            return frame
+
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        try:
+            with loading:
+                # Another runner may have parsed it while we waited
+                frame = self._lookup(key, signature)
+                if frame is not None:
+                    self._count(hit=True)
+                    return frame
+
+                self._count(hit=False)
+                frame = load(path, limit, chunksize, list(columns) if columns is not None else None)
+                self._put(key, signature, frame)
+            return frame
+        finally:
+            with self._lock:
+                # Waiters already hold it, later callers find the entry
+                if self._loading.get(key) is loading:
+                    del self._loading[key]
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _derive(self, name, limit, columns, signature) -> Optional[pd.DataFrame]:
+        """
+        Serves a column subset from all the columns read with the same limit.
+        Other limits are never used: dtypes are inferred from the rows that
+        were parsed, so the head of a longer read can differ from a short one.
+        """
+        if columns is None:
+            return None
+        frame = self._lookup((name, limit, None), signature)
+        if frame is None:
+            return None
+        return select_columns(frame, list(columns))
+
+    def _put(self, key, signature, frame: pd.DataFrame):
+        size = estimate_size(frame)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (signature, frame, size)
+            self._bytes += size
+            while self._entries and self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        # Callers hold self._lock
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, name: str = None):
+        with self._lock:
+            for key in [k for k in self._entries if name is None or k[0] == name]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def warm_names(spec: str = DEFAULT_WARM) -> List[str]:
+    """Dataset names listed in FLOW_DATASET_WARM."""
+    if spec.strip() == "*":
+        return mock_data_names()
+    return [name.strip() for name in spec.split(",") if name.strip()]
+
+
+dataset_cache = DatasetCache()
@@ -1,19 +1,86 @@
+import operator
+from functools import reduce
+
 import pandas as pd
+from typing import Dict, List
+
+
+def _is_string_column(series: pd.Series) -> bool:
+    return pd.api.types.infer_dtype(series, skipna=False) == "string"
+
+
+def _is_nan(value) -> bool:
+    return isinstance(value, float) and value != value
+
+
+def _membership(series: pd.Series, values) -> pd.Series:
+    if isinstance(values, str):
+        # `x in "abc"` is a substring test, keep the per-row semantics
+        return series.map(lambda x: x in values)
+    # isin hashes the values once instead of scanning a list per row. It
+    # also matches NaN with NaN, which `x in values` never did.
+    return series.isin([value for value in values if not _is_nan(value)])
+
+
+def _per_value(series: pd.Series, predicate) -> pd.Series:
+    """
+    Evaluates a string predicate once per distinct value. Categorical-like
+    text columns have few distinct values, so this skips most of the work.
+    """
+    if _is_string_column(series):
+        codes, uniques = pd.factorize(series)
+        if len(uniques) * 2 <= len(series):
+            mask = predicate(pd.Series(uniques, dtype=object)).to_numpy()[codes]
+            return pd.Series(mask, index=series.index)
+    return predicate(series)
+
+
+def _contains(series: pd.Series, value) -> pd.Series:
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return pd.Series(False, index=series.index)
+    if not _is_string_column(series):
+        # .str.contains would also look inside list and dict cells, only
+        # strings are searched
+        strings = series.map(lambda x: isinstance(x, str)).astype(bool)
+        series = series.where(strings, None)
+    return _per_value(
+        series, lambda s: s.str.contains(value, regex=False, na=False).astype(bool)
+    )
+
+
+def _startswith(series: pd.Series, value) -> pd.Series:
+    if not _is_string_column(series):
+        # Non-string cells are compared through their str() form
+        series = series.map(str)
+    return _per_value(series, lambda s: s.str.startswith(value).astype(bool))
+
+
+def _between(series: pd.Series, low, high) -> pd.Series:
+    if high is None:
+        raise ValueError("Range filter requires value2")
+    return series.between(low, high, inclusive="both")
+
 
+# Each filter maps (column, value1, value2) to a boolean mask in one pass
 Filters = {
-    "gt": lambda x, y: x > y,
-    "gte": lambda x, y: x >= y,
-    "lt": lambda x, y: x < y,
-    "lte": lambda x, y: x <= y,
-    "eq": lambda x, y: x == y,
-    "neq": lambda x, y: x != y,
-    "in": lambda x, y: x in y,
-    "nin": lambda x, y: x not in y,
-    "range": lambda x, low_lim,high_lim: x >= low_lim and x <= high_lim,
-    "contains": lambda x, y: y in x if isinstance(x, str) else False,
-    "ncontains": lambda x, y: y not in x if isinstance(x, str) else True,
-    "startswith": lambda x, y: str(x).startswith(y),
-    "nstartswith": lambda x, y: not str(x).startswith(y),
+    "gt": lambda s, y, _: s > y,
+    "gte": lambda s, y, _: s >= y,
+    "lt": lambda s, y, _: s < y,
+    "lte": lambda s, y, _: s <= y,
+    "eq": lambda s, y, _: s == y,
+    "neq": lambda s, y, _: s != y,
+    "in": lambda s, y, _: _membership(s, y),
+    "nin": lambda s, y, _: ~_membership(s, y),
+    "range": _between,
+    "contains": lambda s, y, _: _contains(s, y),
+    "ncontains": lambda s, y, _: ~_contains(s, y),
+    "startswith": lambda s, y, _: _startswith(s, y),
+    "nstartswith": lambda s, y, _: ~_startswith(s, y),
+}
+
+Logic = {
+    "and": operator.and_,
+    "or": operator.or_,
 }
 
 
@@ -22,19 +89,68 @@ class Filter:
         self.input = input
         self.output = None
 
-    def run(self, field: str, condition: str, value1, value2=None):
+    def run(
+        self,
+        field: str = None,
+        condition: str = None,
+        value1=None,
+        value2=None,
+        rules: List[Dict] = None,
+        logic: str = "and",
+        value=None,
+    ):
+        if rules:
+            mask = self._evaluate(rules, logic)
+        else:
+            mask = self._mask(field, condition, value1 if value1 is not None else value, value2)
+
+        if mask is None:
+            self.output = self.input
+            return self.output
+
+        self.output = self.input[mask].reset_index(drop=True)
+        return self.output
+
+    def _evaluate(self, rules: List[Dict], logic: str = "and"):
+        """
+        Combines the masks of `rules` with `logic`. A rule holding its own
+        `rules` list is a nested group with its own `logic`.
+        """
+        combine = Logic.get((logic or "and").lower())
+        if combine is None:
+            raise ValueError(f"Invalid filter logic: {logic}")
+
+        masks = []
+        for rule in rules:
+            if "rules" in rule:
+                mask = self._evaluate(rule["rules"], rule.get("logic", "and"))
+            else:
+                value1 = rule.get("value1")
+                mask = self._mask(
+                    rule.get("field"),
+                    rule.get("condition"),
+                    value1 if value1 is not None else rule.get("value"),
+                    rule.get("value2"),
+                )
+            if mask is not None:
+                masks.append(mask)
+
+        if not masks:
+            return None
+        return reduce(combine, masks)
+
+    def _mask(self, field: str, condition: str, value1, value2=None):
         if not field or not condition:
-            return self.input
-        
+            return None
+
         filter_func = Filters.get(condition)
         if not filter_func:
             raise ValueError(f"Invalid filter condition: {condition}")
-        if value2:
-            mask = self.input[field].apply(lambda x: filter_func(x, value1, value2))
-        else:
-            mask = self.input[field].apply(lambda x: filter_func(x, value1))
-        self.output = self.input[mask].reset_index(drop=True)
-        return self.output
+        mask = filter_func(self.input[field], value1, value2)
+        if mask.dtype != bool:
+            # Nullable columns give NA where the comparison is unknown
+            mask = mask.fillna(False).astype(bool)
+        return mask
 
 
 if __name__ == "__main__":
@@ -42,3 +158,13 @@ if __name__ == "__main__":
     f = Filter(df)
     result = f.run(field="A", condition="range", value1=3, value2=20)
     print(result)
+    result = f.run(
+        rules=[
+            {"field": "A", "condition": "gt", "value": 2},
+            {"logic": "or", "rules": [
+                {"field": "B", "condition": "lt", "value": 4},
+                {"field": "B", "condition": "in", "value": [7, 8]},
+            ]},
+        ]
+    )
+    print(result)
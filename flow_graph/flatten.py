@@ -0,0 +1,172 @@
+from itertools import repeat
+from operator import is_
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from pandas import json_normalize
+
+# Records the flattened schema is inferred from
+DEFAULT_SAMPLE_SIZE = 100
+
+# Stand in for keys a record doesn't have, _EMPTY is never mutated
+_EMPTY = {}
+_MISSING = object()
+
+
+def _add_leaf(container: dict, key: str, name: str, columns: List[str], seen: set) -> bool:
+    existing = container.get(key)
+    if existing is None:
+        if name in seen:
+            # Two key paths flatten to the same name, e.g. "a.b" and a -> b
+            return False
+        container[key] = name
+        seen.add(name)
+        columns.append(name)
+        return True
+    return not isinstance(existing, dict)
+
+
+def _add_object(container: dict, key: str, value: dict, prefix: str, sep: str, columns: List[str], seen: set) -> bool:
+    existing = container.setdefault(key, {})
+    if not isinstance(existing, dict):
+        return False
+    for child_key, child in value.items():
+        if type(child_key) is not str:
+            return False
+        name = f"{prefix}{sep}{child_key}"
+        if isinstance(child, dict):
+            if not _add_object(existing, child_key, child, name, sep, columns, seen):
+                return False
+        elif not _add_leaf(existing, child_key, name, columns, seen):
+            return False
+    return True
+
+
+def infer_schema(records: List[dict], sep: str = ".") -> Optional[tuple]:
+    """
+    The key tree of the sampled records and their flattened column names,
+    in the order json_normalize would give them: per record top-level
+    scalars first and then nested keys, columns in order of first appearance.
+    None when the sample can't be described by a single tree.
+    """
+    schema, columns, seen = {}, [], set()
+    for record in records:
+        if type(record) is not dict or not all(type(key) is str for key in record):
+            return None
+        for key, value in record.items():
+            if not isinstance(value, dict) and not _add_leaf(schema, key, key, columns, seen):
+                return None
+        for key, value in record.items():
+            if isinstance(value, dict) and not _add_object(schema, key, value, key, sep, columns, seen):
+                return None
+    return schema, columns
+
+
+def _infer(arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    # The dtype inference DataFrame(records) runs on its object columns
+    return pd.DataFrame(arrays, copy=False).infer_objects()
+
+
+def _extract(schema: dict, values: list, arrays: Dict[str, np.ndarray]) -> bool:
+    """
+    Fills `arrays` with one object array per leaf below `schema` for the
+    objects in `values`, False as soon as one of them doesn't fit the schema.
+    """
+    if not set(map(type, values)) <= {dict}:
+        return False
+
+    rows = len(values)
+    found = 0
+    for key, child in schema.items():
+        if isinstance(child, dict):
+            nested = list(map(dict.get, values, repeat(key), repeat(_EMPTY)))
+            found += rows - sum(map(is_, nested, repeat(_EMPTY)))
+            if not _extract(child, nested, arrays):
+                return False
+            continue
+
+        column = list(map(dict.get, values, repeat(key), repeat(_MISSING)))
+        if any(issubclass(kind, dict) for kind in set(map(type, column))):
+            return False
+        array = np.fromiter(column, dtype=object, count=rows)
+        missing = sum(map(is_, column, repeat(_MISSING)))
+        if missing:
+            # DataFrame(records) fills keys a record lacks with NaN
+            array[np.fromiter(map(is_, column, repeat(_MISSING)), dtype=bool, count=rows)] = np.nan
+        found += rows - missing
+        arrays[child] = array
+
+    # Every key found is one of the object's own, so equal totals mean no
+    # object holds a key the sample didn't have
+    return found == sum(map(len, values))
+
+
+def flatten_records(
+    data: Union[Dict, List[Dict]],
+    sep: str = ".",
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+) -> pd.DataFrame:
+    """
+    Same frame as `json_normalize(data, sep=sep)`, built column by column.
+    The key tree is inferred once from the first `sample_size` records and
+    every column is pulled out with C-level lookups along its key path, so no
+    per-record dict is ever built. Records that don't fit the sampled tree
+    (new keys, a scalar where an object was seen...) make the whole batch
+    fall back to json_normalize.
+    """
+    if isinstance(data, dict):
+        data = [data]
+    if not data:
+        return pd.DataFrame()
+
+    inferred = infer_schema(data[:sample_size], sep)
+    if inferred is None or not inferred[1]:
+        return json_normalize(data, sep=sep)
+    schema, columns = inferred
+
+    arrays = {}
+    if not _extract(schema, data, arrays):
+        return json_normalize(data, sep=sep)
+
+    return _infer({name: arrays[name] for name in columns})
+
+
+def flatten_frame(df: pd.DataFrame, sep: str = ".", sample_size: int = DEFAULT_SAMPLE_SIZE) -> pd.DataFrame:
+    """
+    Same frame as `flatten_records(df.to_dict(orient="records"))` for a frame
+    whose object columns hold parsed JSON, without building the records:
+    flat columns are kept as they are and only the columns of objects are
+    flattened. Frames mixing objects and scalars in a column go the records
+    way.
+    """
+    flat, nested = [], []
+    for name in df.columns:
+        column = df[name]
+        if type(name) is not str:
+            return flatten_records(df.to_dict(orient="records"), sep, sample_size)
+        if column.dtype != object:
+            flat.append(name)
+            continue
+        kinds = set(map(type, column.to_numpy()))
+        if not any(issubclass(kind, dict) for kind in kinds):
+            flat.append(name)
+        elif kinds == {dict}:
+            nested.append(name)
+        else:
+            return flatten_records(df.to_dict(orient="records"), sep, sample_size)
+
+    values = [df[name].to_numpy() for name in nested]
+    inner = flatten_records(list(map(dict, map(zip, repeat(nested), zip(*values)))), sep, sample_size)
+    if set(flat) & set(inner.columns) or len(inner) != len(df):
+        return flatten_records(df.to_dict(orient="records"), sep, sample_size)
+
+    # Each record lists its scalars before its nested keys, so the flat
+    # columns come first. DataFrame(records) only re-infers object columns,
+    # typed ones come back unchanged.
+    converted = _infer({name: df[name].to_numpy() for name in flat if df[name].dtype == object})
+    arrays = {name: converted[name].array if name in converted else df[name].array for name in flat}
+    arrays.update((name, inner[name].array) for name in inner.columns)
+    # Copied: the arrays are read-only views of the copy-on-write input
+    return pd.DataFrame(arrays)
+
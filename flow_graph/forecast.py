@@ -7,6 +7,9 @@ import pandas as pd
 import numpy as np
 from typing import Optional, Tuple, Dict, List
 
+from flow_graph.cow import owned
+from flow_graph.cancellation import ExecutionCancelled, check_cancelled
+
 try:
     from statsmodels.tsa.holtwinters import SimpleExpSmoothing, Holt, ExponentialSmoothing
     STATSMODELS_HW_AVAILABLE = True
@@ -24,7 +27,7 @@ class Forecast:
     def __init__(self, input_df: pd.DataFrame):
         if not isinstance(input_df, pd.DataFrame):
             raise ValueError("Forecast requires a pandas DataFrame as input")
-        self.input = input_df.copy()
+        self.input = owned(input_df)
         self.output = None
 
     def _validate(self, ts_col: str, target: str):
@@ -109,7 +112,7 @@ class Forecast:
             raise ImportError("statsmodels is required for forecasting. Install: pip install statsmodels")
         
         self._validate(ts_col, target)
-        df = self.input[[ts_col, target]].dropna().copy()
+        df = owned(self.input[[ts_col, target]].dropna())
         
         try:
             if not np.issubdtype(df[ts_col].dtype, np.datetime64):
@@ -136,6 +139,8 @@ class Forecast:
                 seasonal_periods=seasonal_periods,
                 combine=True
             )
+        except ExecutionCancelled:
+            raise
         except (ValueError, Exception) as e:
             result = self.run(
                 target=target,
@@ -173,7 +178,7 @@ class Forecast:
         If combine=True returns concatenated historical rows then forecast rows (useful for plotting).
         """
         self._validate(ts_col, target)
-        df = self.input[[ts_col, target]].dropna().copy()
+        df = owned(self.input[[ts_col, target]].dropna())
 
         is_datetime = False
         try:
@@ -232,7 +237,8 @@ class Forecast:
             if not STATSMODELS_HW_AVAILABLE:
                 raise ImportError("statsmodels is required for Holt method. Install: pip install statsmodels")
             model = Holt(y)
-            fitted = model.fit(optimized=True)
+            # The optimizer callback lets a cancelled execution stop mid-fit
+            fitted = model.fit(optimized=True, minimize_kwargs={"callback": check_cancelled})
             preds = fitted.forecast(horizon).tolist()
 
         elif method == 'hw' or method == 'holt_winters':
@@ -241,7 +247,7 @@ class Forecast:
             if seasonal_periods is None:
                 raise ValueError("seasonal_periods must be provided for Holt-Winters")
             model = ExponentialSmoothing(y, seasonal_periods=seasonal_periods, trend='add', seasonal='add', initialization_method="estimated")
-            fitted = model.fit(optimized=True)
+            fitted = model.fit(optimized=True, minimize_kwargs={"callback": check_cancelled})
             preds = fitted.forecast(horizon).tolist()
 
         elif method == 'linear_trend':
@@ -268,9 +274,11 @@ class Forecast:
                 raise ValueError("ARIMA requires at least 3 data points")
             try:
                 model = ARIMA(y, order=order)
-                fitted_model = model.fit()
+                fitted_model = model.fit(method_kwargs={"callback": check_cancelled})
                 forecast_result = fitted_model.get_forecast(steps=horizon)
                 preds = forecast_result.predicted_mean.tolist() if hasattr(forecast_result.predicted_mean, 'tolist') else list(forecast_result.predicted_mean)
+            except ExecutionCancelled:
+                raise
             except Exception as e:
                 raise ValueError(f"ARIMA fitting failed: {str(e)}. Try different order parameters.")
 
@@ -280,9 +288,9 @@ class Forecast:
         out_df = pd.DataFrame({ts_col: future_idx, 'forecast': preds})
         
         if combine:
-            hist = df.rename(columns={target: 'forecast'})[[ts_col, 'forecast']].copy()
+            hist = owned(df.rename(columns={target: 'forecast'})[[ts_col, 'forecast']])
             hist['source'] = 'history'
-            out_df2 = out_df.copy()
+            out_df2 = owned(out_df)
             out_df2['source'] = 'forecast'
             combined = pd.concat([hist, out_df2], ignore_index=True)
             self.output = combined
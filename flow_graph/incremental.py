@@ -0,0 +1,127 @@
+import os
+import copy
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Set
+
+from flow_graph.cache import UNCACHEABLE_TYPES, estimate_size, file_signature, mock_data_path
+
+DEFAULT_MAX_SESSIONS = int(os.getenv("FLOW_SESSION_MAX", "32"))
+DEFAULT_MAX_SESSION_BYTES = int(os.getenv("FLOW_SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def node_signature(node: dict, inputs: List[str]) -> dict:
+    config = node.get("config", {})
+    signature = {
+        "type": node.get("type", "export").lower().strip(),
+        "config": copy.deepcopy(config),
+        "inputs": list(inputs),
+    }
+    if isinstance(config.get("input"), str):
+        signature["source"] = file_signature(mock_data_path(config["input"]))
+    return signature
+
+
+def _same(old: dict, new: dict) -> bool:
+    try:
+        return bool(old == new)
+    except (ValueError, TypeError):
+        # Inline DataFrames can't be compared cheaply, treat them as changed
+        return False
+
+
+def dirty_nodes(
+    old_signatures: Dict[str, dict],
+    new_signatures: Dict[str, dict],
+    graph: Dict[str, List[str]],
+) -> Set[str]:
+    """
+    Nodes that are new or whose type/config/inputs changed since the previous
+    run, plus everything downstream of them. Nodes reading live data, like
+    Mongo collections, are always dirty.
+    """
+    changed = [
+        node_id
+        for node_id, signature in new_signatures.items()
+        if node_id not in old_signatures
+        or signature["type"] in UNCACHEABLE_TYPES
+        or not _same(old_signatures[node_id], signature)
+    ]
+
+    dirty = set()
+    queue = deque(changed)
+    while queue:
+        node_id = queue.popleft()
+        if node_id in dirty:
+            continue
+        dirty.add(node_id)
+        queue.extend(graph.get(node_id, []))
+    return dirty
+
+
+class FlowSession:
+    def __init__(self, signatures: Dict[str, dict], outputs: Dict[str, object]):
+        self.signatures = signatures
+        self.outputs = outputs
+        # Same estimate the NodeCache budgets with
+        self.size = sum(
+            estimate_size(output) for output in outputs.values() if output is not None
+        )
+
+
+class SessionStore:
+    """
+    Keeps the node outputs of the last run of each flow_uid so that an edited
+    flow only recomputes the nodes affected by the edit. Bounded by session
+    count and total bytes, since every output of a session is retained.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        max_bytes: int = DEFAULT_MAX_SESSION_BYTES,
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, flow_uid: str):
+        with self._lock:
+            session = self._sessions.get(flow_uid)
+            if session is not None:
+                self._sessions.move_to_end(flow_uid)
+            return session
+
+    def save(self, flow_uid: str, session: FlowSession):
+        with self._lock:
+            previous = self._sessions.pop(flow_uid, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            if session.size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            self._sessions[flow_uid] = session
+            self._bytes += session.size
+            while self._sessions and (
+                len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._sessions.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def discard(self, flow_uid: str):
+        with self._lock:
+            session = self._sessions.pop(flow_uid, None)
+            if session is not None:
+                self._bytes -= session.size
+
+
+flow_sessions = SessionStore()
@@ -0,0 +1,284 @@
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Tuple
+
+# Seconds, from sub-millisecond filters up to multi-minute forecasts
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        # Children are created once per label set, so the hot path is a dict hit
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """The per label set value this metric type keeps."""
+
+    @abstractmethod
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        """Exposition lines for one label set."""
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue(_Value):
+    def set(self, value: float):
+        self.value = value
+
+
+class _Scalar(_Metric):
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Counter(_Scalar):
+    kind = "counter"
+
+    def _new_child(self):
+        # No set(), counters only ever go up
+        return _Value()
+
+
+class Gauge(_Scalar):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+
+class _Buckets:
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def _render_child(self, values, child):
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    In-process metrics exposed in the Prometheus text format. Values that
+    already live elsewhere (cache counters, executor slots) are read by
+    collectors at scrape time instead of being updated on the hot path.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect: Callable[[], None]):
+        """`collect()` runs before every scrape to refresh gauges."""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def remove_collector(self, collect: Callable[[], None]):
+        with self._lock:
+            if collect in self._collectors:
+                self._collectors.remove(collect)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collect in collectors:
+            try:
+                collect()
+            except Exception as e:
+                print("Error collecting metrics :", e)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+operator_duration = registry.histogram(
+    "flow_operator_duration_seconds",
+    "Execution time of a node by operator type",
+    ("operator",),
+)
+rows_processed = registry.counter(
+    "flow_rows_processed_total",
+    "Rows output by executed nodes",
+    ("operator",),
+)
+bytes_serialized = registry.counter(
+    "flow_bytes_serialized_total",
+    "Bytes of node output encoded into responses",
+    ("format",),
+)
+# Gauges, the caches reset their hit/miss counts when they are cleared
+cache_requests = registry.gauge(
+    "flow_node_cache_requests",
+    "Node cache lookups since the cache was last cleared",
+    ("result",),
+)
+cache_hit_ratio = registry.gauge(
+    "flow_node_cache_hit_ratio",
+    "Share of node cache lookups that were hits",
+)
+cache_bytes = registry.gauge(
+    "flow_node_cache_bytes",
+    "Bytes held by the node cache",
+)
+
+dataset_requests = registry.gauge(
+    "flow_dataset_cache_requests",
+    "Dataset cache lookups since the cache was last cleared",
+    ("result",),
+)
+dataset_bytes = registry.gauge(
+    "flow_dataset_cache_bytes",
+    "Bytes of parsed datasets held in memory",
+)
+
+
+def observe_node(node_type: str, seconds: float, rows):
+    operator_duration.labels(node_type).observe(seconds)
+    if rows:
+        rows_processed.labels(node_type).inc(rows)
+
+
+def collect_cache(cache):
+    """Collector reading the hit/miss counters a NodeCache already keeps."""
+
+    def collect():
+        hits, misses = cache.hits, cache.misses
+        cache_requests.labels("hit").set(hits)
+        cache_requests.labels("miss").set(misses)
+        cache_hit_ratio.set(hits / (hits + misses) if hits + misses else 0)
+        cache_bytes.set(cache.total_bytes)
+
+    return collect
+
+
+def collect_datasets(cache):
+    """Collector for the parsed dataset cache."""
+
+    def collect():
+        dataset_requests.labels("hit").set(cache.hits)
+        dataset_requests.labels("miss").set(cache.misses)
+        dataset_bytes.set(cache.total_bytes)
+
+    return collect
@@ -138,6 +138,56 @@ def generate_multiple_products(
     return pd.DataFrame(all_data)
 
 
+def make_timeseries_frame(
+    rows=1000,
+    start_date='2024-01-01',
+    freq='min',
+    products=('Product A', 'Product B', 'Product C'),
+    regions=('North', 'South', 'East', 'West'),
+    seed=0
+):
+    """
+    Build a synthetic time series DataFrame in memory, fully vectorized so
+    it scales to tens of millions of rows. Used by the benchmarks.
+
+    Parameters:
+    -----------
+    rows : int
+        Number of rows to generate
+    start_date : str
+        Starting date in 'YYYY-MM-DD' format
+    freq : str
+        Frequency of the date column
+    products : sequence of str
+        Product labels, assigned at random
+    regions : sequence of str
+        Region labels, assigned at random
+    seed : int
+        Seed of the random generator, so runs are reproducible
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(rows)
+
+    trend = 2.0 * t / max(rows, 1) * 100
+    seasonal = 100 * np.sin(2 * np.pi * t / 24)
+    cost_values = 1000 + trend + seasonal + rng.normal(0, 20, rows)
+    revenue_values = cost_values * 2.0 + rng.normal(0, 10, rows)
+
+    return pd.DataFrame({
+        'id': t,
+        'date': pd.date_range(start=start_date, periods=rows, freq=freq),
+        'cost': cost_values.round(2),
+        'revenue': revenue_values.round(2),
+        'units': rng.integers(0, 500, rows),
+        'product': pd.Categorical.from_codes(
+            rng.integers(0, len(products), rows), categories=list(products)
+        ).astype(object),
+        'region': pd.Categorical.from_codes(
+            rng.integers(0, len(regions), rows), categories=list(regions)
+        ).astype(object),
+    })
+
+
 if __name__ == '__main__':
     print("=" * 70)
     print("TIME SERIES DATA GENERATOR")
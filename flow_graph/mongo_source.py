@@ -0,0 +1,215 @@
+import os
+import re
+from itertools import islice
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from flow_graph.data_source import DEFAULT_CHUNKSIZE, DEFAULT_ROW_LIMIT
+from flow_graph.flatten import flatten_records
+
+# Comma separated collections of the app's database flows may read. Empty:
+# none, so a saved flow can never reach users, flows or other app data.
+COLLECTIONS = {
+    name.strip() for name in os.getenv("FLOW_MONGO_COLLECTIONS", "").split(",") if name.strip()
+}
+
+# Filter conditions with a Mongo operator that selects the same rows
+COMPARISONS = {"eq": "$eq", "gt": "$gt", "gte": "$gte", "lt": "$lt", "lte": "$lte"}
+NEGATIONS = {"neq": "eq", "nin": "in", "ncontains": "contains"}
+LOGIC = {"and": "$and", "or": "$or"}
+
+# Reads follow _id so the rows come back in the same order whatever the
+# query, an index picked for a pushed filter would reorder them otherwise
+READ_ORDER = [("_id", 1)]
+
+
+def _scalar(value) -> bool:
+    # bool is left out: pandas has True == 1, BSON types don't match. NaN
+    # equals nothing in pandas but matches NaN in Mongo.
+    return isinstance(value, (int, float, str)) and not isinstance(value, bool) and value == value
+
+
+def _rule_query(rule: dict) -> Optional[dict]:
+    if "rules" in rule:
+        return rules_query(rule["rules"], rule.get("logic", "and"))
+
+    field, condition = rule.get("field"), rule.get("condition")
+    value = rule.get("value1")
+    if value is None:
+        value = rule.get("value")
+    if not isinstance(field, str) or not field or not isinstance(condition, str):
+        return None
+
+    if condition in NEGATIONS:
+        # pandas negates the mask, so missing fields and arrays match too
+        positive = _rule_query({**rule, "condition": NEGATIONS[condition]})
+        return {"$nor": [positive]} if positive is not None else None
+
+    if condition in COMPARISONS and _scalar(value):
+        predicate = {COMPARISONS[condition]: value}
+    elif condition == "range" and _scalar(value) and _scalar(rule.get("value2")):
+        predicate = {"$gte": value, "$lte": rule["value2"]}
+    elif condition == "in" and isinstance(value, list) and value and all(map(_scalar, value)):
+        predicate = {"$in": value}
+    elif condition == "contains" and isinstance(value, str):
+        predicate = {"$regex": re.escape(value)}
+    else:
+        # startswith compares str() of any cell, no Mongo operator does that
+        return None
+    # Mongo matches array fields element-wise, pandas compares the whole cell
+    predicate["$not"] = {"$type": "array"}
+    return {field: predicate}
+
+
+def _query_value(op: str, value) -> bool:
+    if op == "$in":
+        return isinstance(value, list) and bool(value) and all(map(_scalar, value))
+    if op == "$regex":
+        return isinstance(value, str)
+    if op == "$not":
+        return value == {"$type": "array"}
+    return op in COMPARISONS.values() and _scalar(value)
+
+
+def validate_query(query) -> dict:
+    """
+    `query` when it only uses what `rules_query` produces: $and/$or/$nor,
+    comparisons, $in and $regex on scalars and the array guard. Anything
+    else ($where, $expr, $function...) could run code on the server.
+    """
+    if not isinstance(query, dict):
+        raise ValueError("mongoSource query must be an object")
+    for key, value in query.items():
+        if key in ("$and", "$or", "$nor"):
+            if not isinstance(value, list) or not value:
+                raise ValueError(f"mongoSource query {key} needs a list of queries")
+            for part in value:
+                validate_query(part)
+        elif not isinstance(key, str) or not key or key.startswith("$"):
+            raise ValueError(f"mongoSource query operator {key!r} is not allowed")
+        elif not isinstance(value, dict) or not value or not all(
+            _query_value(op, arg) for op, arg in value.items()
+        ):
+            raise ValueError(f"mongoSource query on {key!r} uses an unsupported condition")
+    return query
+
+
+def rules_query(rules: List[dict], logic: str = "and") -> Optional[dict]:
+    """
+    The Mongo query selecting the rows a filter with these rules keeps, None
+    when one of the rules has no exact Mongo equivalent.
+    """
+    combine = LOGIC.get((logic or "and").lower())
+    if combine is None or not isinstance(rules, list) or not rules:
+        return None
+    queries = []
+    for rule in rules:
+        query = _rule_query(rule) if isinstance(rule, dict) else None
+        if query is None:
+            return None
+        queries.append(query)
+    return queries[0] if len(queries) == 1 else {combine: queries}
+
+
+def projection(columns: Optional[List[str]]) -> Dict[str, int]:
+    if columns is None:
+        return {"_id": 0}
+    # Mongo rejects a path next to one of its own prefixes, the prefix
+    # already returns the whole subdocument
+    paths = sorted(set(columns))
+    kept = [
+        path for path in paths
+        if not any(path.startswith(other + ".") for other in paths)
+    ]
+    fields = {path: 1 for path in kept}
+    if "_id" not in fields:
+        fields["_id"] = 0
+    return fields
+
+
+class MongoSource:
+    """
+    Reads one of the FLOW_MONGO_COLLECTIONS of the app's database. Filters
+    and projected columns the optimizer pushed down arrive as `query` and
+    `columns`, so only the matching documents and fields leave the server.
+    The cursor is read `batch_size` documents at a time, each batch
+    flattened straight into column arrays. Without `dtypes` the column types
+    are inferred from the documents read; with it the frame has exactly those
+    columns and types, whatever documents matched.
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        database=None,
+        query: dict = None,
+        columns: List[str] = None,
+        limit: Optional[int] = DEFAULT_ROW_LIMIT,
+        batch_size: int = DEFAULT_CHUNKSIZE,
+        dtypes: Dict[str, str] = None,
+    ):
+        if database is None:
+            raise ValueError("mongoSource nodes need a database, none was given to the Runner")
+        if not isinstance(collection, str) or not collection:
+            raise ValueError("mongoSource requires a collection name")
+        if collection not in COLLECTIONS:
+            raise ValueError(f"Collection {collection!r} is not readable by flows")
+        if columns is not None and not all(
+            isinstance(column, str) and column and not column.startswith("$") for column in columns
+        ):
+            raise ValueError("mongoSource columns must be field paths")
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be a positive number of rows, or None for all rows")
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive number of documents")
+        if dtypes is not None:
+            if not isinstance(dtypes, dict) or not all(
+                isinstance(column, str) and column and not column.startswith("$") for column in dtypes
+            ):
+                raise ValueError("mongoSource dtypes must map field paths to pandas dtypes")
+            for dtype in dtypes.values():
+                # Raises TypeError for anything pandas can't build a column of
+                pd.api.types.pandas_dtype(dtype)
+
+        self.collection = collection
+        self.query = validate_query(query) if query else {}
+        self.columns = columns
+        self.dtypes = dtypes
+        self.output = self.read(database[collection], limit, batch_size)
+
+    def _fields(self) -> Optional[List[str]]:
+        if self.dtypes is None:
+            return self.columns
+        return [c for c in self.dtypes if self.columns is None or c in self.columns]
+
+    def read(self, collection, limit: Optional[int], batch_size: int) -> pd.DataFrame:
+        fields = self._fields()
+        cursor = collection.find(
+            self.query,
+            projection(fields),
+            sort=READ_ORDER,
+            limit=limit or 0,
+            batch_size=batch_size,
+        )
+        frames = []
+        try:
+            while True:
+                batch = list(islice(cursor, batch_size))
+                if not batch:
+                    break
+                frames.append(flatten_records(batch))
+        finally:
+            cursor.close()
+
+        if not frames:
+            frame = pd.DataFrame(columns=fields or [])
+        else:
+            frame = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        if "_id" in frame.columns:
+            # ObjectIds aren't JSON, their hex string is what clients know
+            frame["_id"] = frame["_id"].astype(str)
+        if self.dtypes is not None:
+            # Fields missing from every document read still get their column
+            frame = frame.reindex(columns=fields).astype({c: self.dtypes[c] for c in fields})
+        return frame
@@ -0,0 +1,87 @@
+from typing import List, Optional, Set
+
+# What each operator reads from its config, shared by PseudoRunner (which
+# propagates schemas forward) and projection (which walks them back)
+
+DEFAULT_SUFFIXES = ("_x", "_y")
+
+
+def as_list(value) -> Optional[List[str]]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value):
+        return list(value)
+    return None
+
+
+def _rule_fields(rules) -> Optional[Set[str]]:
+    if not isinstance(rules, list):
+        return None
+    fields = set()
+    for rule in rules:
+        if not isinstance(rule, dict):
+            return None
+        if "rules" in rule:
+            nested = _rule_fields(rule["rules"])
+            if nested is None:
+                return None
+            fields |= nested
+        elif isinstance(rule.get("field"), str):
+            fields.add(rule["field"])
+        else:
+            return None
+    return fields
+
+
+def filter_fields(config: dict) -> Optional[Set[str]]:
+    """Columns a filter reads, or None when they can't be known."""
+    if config.get("rules"):
+        return _rule_fields(config["rules"])
+    field = config.get("field")
+    return {field} if isinstance(field, str) else set()
+
+
+def sort_fields(config: dict) -> Optional[Set[str]]:
+    fields = as_list(config.get("field"))
+    return set(fields) if fields is not None else None
+
+
+def group_keys(config: dict) -> Optional[List[str]]:
+    return as_list(config.get("group_by"))
+
+
+def group_fields(config: dict) -> Optional[List[str]]:
+    """Columns a group aggregates, None when it aggregates every non-key column."""
+    aggregations, fields = config.get("aggregations"), as_list(config.get("fields"))
+    if aggregations and fields:
+        return fields
+    if aggregations:
+        return None
+    # Only counts rows per key
+    return []
+
+
+def forecast_fields(config: dict) -> Optional[Set[str]]:
+    ts_col, target = config.get("ts_col"), config.get("target")
+    if not isinstance(ts_col, str) or not isinstance(target, str):
+        return None
+    return {ts_col, target}
+
+
+def merge_keys(config: dict) -> Set[str]:
+    return {
+        key
+        for key in (config.get("on"), config.get("left_on"), config.get("right_on"))
+        if isinstance(key, str)
+    }
+
+
+def merge_suffixes(config: dict) -> tuple:
+    return tuple(config.get("suffixes") or DEFAULT_SUFFIXES)
+
+
+def strip_suffix(column: str, suffixes) -> str:
+    for suffix in suffixes:
+        if suffix and column.endswith(suffix):
+            return column[: -len(suffix)]
+    return column
@@ -0,0 +1,425 @@
+from typing import Dict, List, Optional, Set
+
+from flow_graph.mongo_source import rules_query
+from flow_graph.parser import Parser
+from flow_graph.projection import PASS_THROUGH, required_columns
+from flow_graph.pseudorunner import PseudoRunner
+
+# Config keys a filter may carry for the optimizer to reason about it
+FILTER_KEYS = {"field", "condition", "value1", "value2", "value", "rules", "logic"}
+
+# Aggregations whose result does not depend on the order rows arrive in.
+# Float sums/means are left out: their rounding depends on summation order.
+ORDER_INSENSITIVE_AGGREGATIONS = {"count", "size", "min", "max", "nunique", "median"}
+
+# Merge key types, as PseudoRunner names them, that pandas joins without
+# coercing the keys. Other pairs (bools, mixed objects) come out with a
+# dtype that depends on which rows reach the merge.
+JOIN_KEY_KINDS = ({"int", "float"}, {"str", "timestamp"})
+
+MAX_PASSES = 64
+
+
+class Plan:
+    """
+    A rewritten flow graph plus what was done to it. `hidden` holds the node
+    ids whose output does not exist in the original flow; they are computed
+    (or dropped) but never reported.
+    """
+
+    def __init__(self, flow: dict, rewrites: List[dict], hidden: Set[str]):
+        self.flow = flow
+        self.rewrites = rewrites
+        self.hidden = hidden
+
+    def explain(self) -> dict:
+        return {
+            "flow_graph": self.flow,
+            "rewrites": self.rewrites,
+            "hidden_nodes": sorted(self.hidden),
+        }
+
+
+class Optimizer:
+    """
+    Rewrites a flow graph before execution while keeping every reported
+    output identical:
+
+    - consecutive filters are fused into one `rules` filter
+    - filters are pushed below sorts
+    - filters are copied below inner merges onto the side owning their
+      fields, when both keys have types pandas joins without coercion
+    - sorts feeding a group with order-insensitive aggregations are dropped
+    - filters over a whole Mongo collection with declared `dtypes` become
+      part of its query
+    - Mongo sources only read, and file sources only keep, the columns
+      downstream nodes use, when `reported` says which nodes the caller
+      reports
+
+    Nodes in `protected` keep their output, so they are never rewritten away.
+    `reported` lists the node ids the caller returns, None meaning all of
+    them; projections never narrow a reported node.
+    """
+
+    def __init__(self, flow_graph_dict: dict, protected: List[str] = None, reported: List[str] = None):
+        self.raw_data = flow_graph_dict
+        parser = Parser()
+        parser.parse(flow_graph_dict)
+        parser.topo_sort()
+
+        self.original_ids = list(parser.nodes)
+        self.nodes = {
+            node_id: {**node, "config": dict(node.get("config") or {})}
+            for node_id, node in parser.nodes.items()
+        }
+        self.inputs = {
+            node_id: list(parser.req_nodes.get(node_id, []))
+            for node_id in self.nodes
+        }
+        self.protected = set(protected or [])
+        self.reported = set(reported) if reported is not None else None
+        self.changed = set()
+        self.rewrites = []
+        self._pushed = set()
+        self._schema = None
+
+    def optimize(self) -> Plan:
+        rules = [
+            self._fuse_filters,
+            self._push_filter_below_sort,
+            self._push_filter_below_merge,
+            self._drop_sort_before_group,
+            self._push_filter_into_collection,
+        ]
+        for _ in range(MAX_PASSES):
+            if not any(rule() for rule in rules):
+                break
+        # Last, once the graph is final: projections depend on every consumer.
+        # When every node is reported, every node needs all of its columns.
+        if self.reported is not None:
+            self._project_datasources()
+
+        # Rewritten, removed and newly inserted nodes are all internal
+        hidden = self.changed | (set(self.nodes) - set(self.original_ids))
+        return Plan(self.to_flow(), self.rewrites, hidden)
+
+    def to_flow(self) -> dict:
+        edges = [
+            {"source": source, "target": target}
+            for target in self.nodes
+            for source in self.inputs[target]
+        ]
+        return {**self.raw_data, "nodes": list(self.nodes.values()), "edges": edges}
+
+    ############################################################################
+    # Graph helpers
+    ############################################################################
+
+    def _order(self) -> List[str]:
+        parser = Parser()
+        parser.parse(self.to_flow())
+        return parser.topo_sort()
+
+    def _type(self, node_id: str) -> str:
+        return self.nodes[node_id].get("type", "export").lower().strip()
+
+    def _consumers(self, node_id: str) -> List[str]:
+        return [n for n, sources in self.inputs.items() if node_id in sources]
+
+    def _only_feeds(self, node_id: str, consumer: str) -> bool:
+        # Rewriting a node is only safe when nobody else reads its output
+        return (
+            node_id not in self.protected
+            and self._consumers(node_id) == [consumer]
+        )
+
+    def _single_input(self, node_id: str) -> Optional[str]:
+        sources = self.inputs[node_id]
+        return sources[0] if len(sources) == 1 else None
+
+    def _columns(self, node_id: str) -> Dict[str, str]:
+        if self._schema is None:
+            pseudo_runner = PseudoRunner(self.to_flow())
+            for _ in pseudo_runner.execute():
+                pass
+            self._schema = pseudo_runner.node_metadata
+        return self._schema.get(node_id, {})
+
+    def _record(self, rule: str, nodes: List[str], detail: str):
+        self._schema = None
+        self.rewrites.append({"rule": rule, "nodes": nodes, "detail": detail})
+
+    ############################################################################
+    # Filters
+    ############################################################################
+
+    def _filter_rules(self, node_id: str) -> Optional[List[dict]]:
+        """The filter as a list of AND-ed rules, or None if it can't be moved."""
+        if self._type(node_id) != "filter" or self._single_input(node_id) is None:
+            return None
+        config = self.nodes[node_id]["config"]
+        if not set(config) <= FILTER_KEYS:
+            return None
+        if config.get("rules"):
+            rules = config["rules"]
+            if not self._valid_rules(rules):
+                return None
+            if (config.get("logic") or "and").lower() == "and":
+                return list(rules)
+            # OR filters travel as one nested group
+            return [{"logic": config["logic"], "rules": list(rules)}]
+        return [{k: v for k, v in config.items() if k not in ("rules", "logic")}]
+
+    @classmethod
+    def _valid_rules(cls, rules) -> bool:
+        if not isinstance(rules, list):
+            return False
+        for rule in rules:
+            if not isinstance(rule, dict):
+                return False
+            if "rules" in rule and not cls._valid_rules(rule["rules"]):
+                return False
+            if "rules" not in rule and "field" not in rule:
+                return False
+        return True
+
+    @classmethod
+    def _rule_fields(cls, rules: List[dict]) -> Set[str]:
+        fields = set()
+        for rule in rules:
+            if "rules" in rule:
+                fields |= cls._rule_fields(rule["rules"])
+            else:
+                fields.add(rule.get("field"))
+        return fields
+
+    def _fuse_filters(self) -> bool:
+        for node_id in self._order():
+            rules = self._filter_rules(node_id)
+            if rules is None:
+                continue
+            upstream = self._single_input(node_id)
+            upstream_rules = self._filter_rules(upstream)
+            if upstream_rules is None or not self._only_feeds(upstream, node_id):
+                continue
+
+            self.nodes[node_id]["config"] = {"rules": upstream_rules + rules}
+            self.inputs[node_id] = list(self.inputs[upstream])
+            del self.nodes[upstream], self.inputs[upstream]
+            self.changed.add(upstream)
+            self._record(
+                "fuse_filters",
+                [upstream, node_id],
+                f"{upstream} merged into {node_id} as a single mask",
+            )
+            return True
+        return False
+
+    def _push_filter_below_sort(self) -> bool:
+        for node_id in self._order():
+            if self._filter_rules(node_id) is None:
+                continue
+            upstream = self._single_input(node_id)
+            if (
+                self._type(upstream) != "sort"
+                or self._single_input(upstream) is None
+                or not self._only_feeds(upstream, node_id)
+            ):
+                continue
+
+            # Swap the operators in place: the downstream id keeps its output
+            sort_node, filter_node = self.nodes[upstream], self.nodes[node_id]
+            sort_node["type"], filter_node["type"] = filter_node["type"], sort_node["type"]
+            sort_node["config"], filter_node["config"] = filter_node["config"], sort_node["config"]
+            self.changed.add(upstream)
+            self._record(
+                "push_filter_below_sort",
+                [upstream, node_id],
+                f"filter runs at {upstream} before the sort at {node_id}",
+            )
+            return True
+        return False
+
+    def _push_filter_below_merge(self) -> bool:
+        for node_id in self._order():
+            rules = self._filter_rules(node_id)
+            if rules is None:
+                continue
+            upstream = self._single_input(node_id)
+            if (
+                (node_id, upstream) in self._pushed
+                or self._type(upstream) != "merge"
+                or len(self.inputs[upstream]) != 2
+                or not self._only_feeds(upstream, node_id)
+            ):
+                continue
+
+            config = self.nodes[upstream]["config"]
+            # Outer joins reorder rows and left/right joins add NaNs that
+            # change dtypes, so only inner joins on columns are rewritten.
+            if (
+                config.get("how", "inner") != "inner"
+                or config.get("left_on") is None
+                or config.get("right_on") is None
+            ):
+                continue
+
+            fields = self._rule_fields(rules)
+            left, right = self.inputs[upstream]
+            left_columns, right_columns = self._columns(left), self._columns(right)
+            left_key = left_columns.get(config["left_on"])
+            right_key = right_columns.get(config["right_on"])
+            if not any(left_key in kind and right_key in kind for kind in JOIN_KEY_KINDS):
+                continue
+            if fields <= set(left_columns) and not fields & set(right_columns):
+                side = left
+            elif fields <= set(right_columns) and not fields & set(left_columns):
+                side = right
+            else:
+                continue
+
+            pushed_id = f"{node_id}:{side}"
+            self.nodes[pushed_id] = {
+                "id": pushed_id,
+                "type": "filter",
+                "config": dict(self.nodes[node_id]["config"]),
+            }
+            self.inputs[pushed_id] = [side]
+            self.inputs[upstream] = [
+                pushed_id if source == side else source
+                for source in self.inputs[upstream]
+            ]
+            self._pushed.add((node_id, upstream))
+            self.changed.add(upstream)
+            self._record(
+                "push_filter_below_merge",
+                [node_id, upstream, pushed_id],
+                f"{node_id} also applied to {side} before the merge",
+            )
+            return True
+        return False
+
+    ############################################################################
+    # Sorts
+    ############################################################################
+
+    def _drop_sort_before_group(self) -> bool:
+        for node_id in self._order():
+            if self._type(node_id) != "group":
+                continue
+            upstream = self._single_input(node_id)
+            if (
+                upstream is None
+                or self._type(upstream) != "sort"
+                or self._single_input(upstream) is None
+                or not self._only_feeds(upstream, node_id)
+            ):
+                continue
+
+            aggregations = self.nodes[node_id]["config"].get("aggregations") or []
+            if not isinstance(aggregations, list) or not all(
+                isinstance(agg, str) and agg in ORDER_INSENSITIVE_AGGREGATIONS
+                for agg in aggregations
+            ):
+                continue
+
+            # groupby sorts by its keys, so the incoming row order is lost
+            self.inputs[node_id] = list(self.inputs[upstream])
+            del self.nodes[upstream], self.inputs[upstream]
+            self.changed.add(upstream)
+            self._record(
+                "drop_sort_before_group",
+                [upstream, node_id],
+                f"sort {upstream} has no effect on group {node_id}",
+            )
+            return True
+        return False
+
+
+    ############################################################################
+    # Mongo sources
+    ############################################################################
+
+    def _push_filter_into_collection(self) -> bool:
+        for node_id in self._order():
+            rules = self._filter_rules(node_id)
+            if rules is None:
+                continue
+            upstream = self._single_input(node_id)
+            if self._type(upstream) != "mongosource" or not self._only_feeds(upstream, node_id):
+                continue
+            source = self.nodes[upstream]["config"]
+            # The first `limit` matches are not the matches in the first `limit` rows
+            if "limit" not in source or source["limit"] is not None:
+                continue
+            # Types inferred from fewer documents can differ (a field missing
+            # only from dropped documents comes back int instead of float).
+            # Declared dtypes fix them, and every filtered field must have one.
+            dtypes = source.get("dtypes")
+            if not isinstance(dtypes, dict) or not self._rule_fields(rules) <= set(dtypes):
+                continue
+            query = rules_query(rules)
+            if query is None:
+                continue
+
+            if source.get("query"):
+                query = {"$and": [source["query"], query]}
+            # The source takes the filter's place: the filter id keeps its rows
+            self.nodes[node_id]["type"] = self.nodes[upstream]["type"]
+            self.nodes[node_id]["config"] = {**source, "query": query}
+            self.inputs[node_id] = []
+            del self.nodes[upstream], self.inputs[upstream]
+            # Only the source is gone, the filter id outputs the same rows
+            self.changed.add(upstream)
+            self._record(
+                "push_filter_into_collection",
+                [upstream, node_id],
+                f"{node_id} runs as a query on {source.get('collection')}",
+            )
+            return True
+        return False
+
+    ############################################################################
+    # Projections
+    ############################################################################
+
+    def _project_datasources(self) -> bool:
+        required = required_columns(self.to_flow(), protected=list(self.protected | self.reported))
+        projected = set()
+        for node_id in self._order():
+            config = self.nodes[node_id]["config"]
+            columns = required.get(node_id)
+            if columns is None or "columns" in config:
+                continue
+            if self._type(node_id) == "mongosource":
+                # A collection's fields aren't known until it is read
+                detail = f"{node_id} reads {len(columns)} fields of {config.get('collection')}"
+            elif self._type(node_id) in ("datasource", "exampledata") and isinstance(config.get("input"), str):
+                schema = self._columns(node_id)
+                if not schema or set(schema) <= columns:
+                    continue
+                # NDJSON is still parsed in full, only sidecar reads skip columns
+                detail = f"{node_id} keeps {len(columns & set(schema))} of {len(schema)} columns"
+            else:
+                continue
+
+            config["columns"] = sorted(columns)
+            projected.add(node_id)
+            self._record("project_datasource", [node_id], detail)
+
+        # Nodes that pass their input through now output fewer columns too
+        narrowed = set(projected)
+        for node_id in self._order():
+            if (
+                node_id not in narrowed
+                and required[node_id] is not None
+                and (self._type(node_id) in PASS_THROUGH or self._type(node_id) == "merge")
+                and any(source in narrowed for source in self.inputs[node_id])
+            ):
+                narrowed.add(node_id)
+        self.changed |= narrowed
+        return bool(projected)
+
+
+def optimize(flow_graph_dict: dict, protected: List[str] = None, reported: List[str] = None) -> Plan:
+    return Optimizer(flow_graph_dict, protected=protected, reported=reported).optimize()
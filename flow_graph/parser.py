@@ -46,6 +46,22 @@ class Parser:
             raise Exception("Graph contains a cycle! Cannot determine execution order.")
         
         return self.exe_order
+
+    def upstream_closure(self, targets: List[str]) -> set:
+        """The target nodes plus every node they transitively depend on."""
+        unknown = [t for t in targets if t not in self.nodes]
+        if unknown:
+            raise ValueError(f"Unknown target nodes: {unknown}")
+
+        closure = set()
+        queue = deque(targets)
+        while queue:
+            current = queue.popleft()
+            if current in closure:
+                continue
+            closure.add(current)
+            queue.extend(self.req_nodes.get(current, []))
+        return closure
         
         
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from flow_graph.cache import content_hash, file_signature, mock_data_path, node_key
+from flow_graph.optimizer import Optimizer
+from flow_graph.parser import Parser
+
+DEFAULT_MAX_PLANS = int(os.getenv("FLOW_PLAN_CACHE_SIZE", "256"))
+
+
+def normalize_type(node: dict) -> str:
+    return node.get("type", "export").lower().strip()
+
+
+def file_sources(flow_graph_dict: dict) -> list:
+    """
+    (input, file_signature) of each file dataSource in the graph. Optimized
+    plans depend on the schemas of those files, not just on the graph.
+    """
+    names = {
+        node.get("config", {}).get("input")
+        for node in flow_graph_dict.get("nodes", [])
+    }
+    return [
+        [name, file_signature(mock_data_path(name))]
+        for name in sorted(name for name in names if isinstance(name, str))
+    ]
+
+
+class CompiledPlan:
+    """
+    Everything the Runner derives from a flow graph before running a node:
+    the parsed nodes and dependency maps, the execution order and the
+    operator bound to each node. It is shared between runs of the same
+    flow, so none of it may be mutated once built.
+    """
+
+    def __init__(
+        self,
+        flow_graph_dict: dict,
+        operators: Dict[str, type],
+        optimize: bool = False,
+        targets: List[str] = None,
+        reported: List[str] = None,
+    ):
+        self.optimized = None
+        self.hidden_nodes = set()
+        if optimize:
+            self.optimized = Optimizer(flow_graph_dict, protected=targets, reported=reported).optimize()
+            self.hidden_nodes = self.optimized.hidden
+            flow_graph_dict = self.optimized.flow
+
+        self.parser = Parser()
+        self.parser.parse(flow_graph_dict)
+        self.nodes = self.parser.nodes
+        self.req_nodes = self.parser.req_nodes
+        self.graph = self.parser.graph
+        self.exec_order = self.parser.topo_sort()
+        if targets:
+            # Demand-driven: only run what the requested nodes depend on
+            needed = self.parser.upstream_closure(targets)
+            self.exec_order = [n for n in self.exec_order if n in needed]
+
+        self.node_types = {
+            node_id: normalize_type(node) for node_id, node in self.nodes.items()
+        }
+        self.bindings = {
+            node_id: operators.get(node_type)
+            for node_id, node_type in self.node_types.items()
+        }
+
+        # Mock datasets can change on disk, so node keys are only reused
+        # while the files they were computed from are unchanged
+        self.file_inputs = {
+            node_id: self.nodes[node_id]["config"]["input"]
+            for node_id in self.exec_order
+            if isinstance(self.nodes[node_id].get("config", {}).get("input"), str)
+        }
+        self._node_keys = None
+        self._key_sources = None
+        self._lock = threading.Lock()
+
+    def node_keys(self) -> Dict[str, Optional[str]]:
+        sources = {
+            node_id: file_signature(mock_data_path(name))
+            for node_id, name in self.file_inputs.items()
+        }
+        with self._lock:
+            if self._node_keys is not None and self._key_sources == sources:
+                return self._node_keys
+
+        keys = {}
+        for node_id in self.exec_order:
+            upstream_keys = [keys[src] for src in self.req_nodes.get(node_id, [])]
+            keys[node_id] = node_key(
+                self.node_types[node_id],
+                self.nodes[node_id].get("config", {}),
+                upstream_keys,
+            )
+        with self._lock:
+            self._node_keys, self._key_sources = keys, sources
+        return keys
+
+
+class PlanCache:
+    """
+    Compiled plans of saved flows, keyed by flow_uid. Each entry also records
+    a content hash of the graph and of the signatures of the datasets it was
+    compiled from, so a flow or a dataset edited behind our back is
+    recompiled rather than served stale. Saved flows hit the same
+    plans over and over; ad-hoc graphs without a flow_uid are never cached.
+    """
+
+    def __init__(self, max_plans: int = DEFAULT_MAX_PLANS):
+        self.max_plans = max_plans
+        self.hits = 0
+        self.misses = 0
+        # flow_uid -> {variant: (content hash, plan)}
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._plans)
+
+    def get(
+        self,
+        flow_uid: str,
+        flow_graph_dict: dict,
+        variant: tuple,
+        compile: Callable[[], CompiledPlan],
+    ) -> CompiledPlan:
+        """
+        The plan for `flow_uid` compiled with the options in `variant`,
+        built with `compile()` when missing or outdated.
+        """
+        digest = content_hash([flow_graph_dict, file_sources(flow_graph_dict)])
+        if digest is None:
+            return compile()
+
+        with self._lock:
+            entry = self._plans.get(flow_uid, {}).get(variant)
+            if entry is not None and entry[0] == digest:
+                self._plans.move_to_end(flow_uid)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Compiled outside the lock, two racing misses just both compile
+        plan = compile()
+        with self._lock:
+            variants = self._plans.setdefault(flow_uid, {})
+            # Plans of an older version of the graph are dead weight now
+            for key in [k for k, (d, _) in variants.items() if d != digest]:
+                del variants[key]
+            variants[variant] = (digest, plan)
+            self._plans.move_to_end(flow_uid)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        return plan
+
+    def invalidate(self, flow_uid: Optional[str]):
+        with self._lock:
+            self._plans.pop(flow_uid, None)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+flow_plans = PlanCache()
@@ -0,0 +1,88 @@
+import time
+from typing import Callable, Optional
+
+import pandas as pd
+
+from flow_graph.cache import estimate_size
+
+
+class Profiled:
+    """A node's return value together with how long it took to compute."""
+
+    def __init__(self, result, wall_ms: float, cpu_ms: float):
+        self.result = result
+        self.wall_ms = wall_ms
+        self.cpu_ms = cpu_ms
+
+
+def profile_call(fn: Callable, args: tuple) -> Profiled:
+    # Runs on the worker, so thread_time only counts this node's CPU
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    result = fn(*args)
+    return Profiled(
+        result,
+        (time.perf_counter() - wall_start) * 1000,
+        (time.thread_time() - cpu_start) * 1000,
+    )
+
+
+def count_rows(output) -> Optional[int]:
+    if output is None:
+        return None
+    if isinstance(output, pd.DataFrame):
+        return len(output)
+    try:
+        return len(output)
+    except TypeError:
+        return None
+
+
+class NodeProfile:
+    def __init__(self, node_id: str, node_type: str, rows_in: int = 0):
+        self.node_id = node_id
+        self.node_type = node_type
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.wall_ms = None
+        self.cpu_ms = None
+        self.output_bytes = None
+        self.serialize_ms = None
+        self.cached = False
+        self.hidden = False
+
+    def record(self, profiled: Profiled, output, cached: bool):
+        self.wall_ms = round(profiled.wall_ms, 3)
+        self.cpu_ms = round(profiled.cpu_ms, 3)
+        self.rows_out = count_rows(output)
+        self.output_bytes = estimate_size(output) if output is not None else 0
+        self.cached = cached
+
+    def to_dict(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "node_type": self.node_type,
+            "wall_ms": self.wall_ms,
+            "cpu_ms": self.cpu_ms,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "output_bytes": self.output_bytes,
+            "serialize_ms": self.serialize_ms,
+            "cached": self.cached,
+            "hidden": self.hidden,
+        }
+
+
+def summarize(profiles) -> dict:
+    """Totals over a run's node profiles, for the `profile` block."""
+    nodes = [profile.to_dict() for profile in profiles]
+
+    def total(key):
+        return round(sum(node[key] or 0 for node in nodes), 3)
+
+    return {
+        "nodes": nodes,
+        "total_wall_ms": total("wall_ms"),
+        "total_cpu_ms": total("cpu_ms"),
+        "total_serialize_ms": total("serialize_ms"),
+    }
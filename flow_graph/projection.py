@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional, Set
+
+from flow_graph.node_columns import (
+    filter_fields,
+    forecast_fields,
+    group_fields,
+    group_keys,
+    merge_keys,
+    merge_suffixes,
+    sort_fields,
+    strip_suffix,
+)
+from flow_graph.parser import Parser
+
+# Node types whose output is their input with rows dropped or reordered, so
+# every column they are asked for has to come from upstream
+PASS_THROUGH = {"filter", "sort"}
+
+
+def _normalize_type(node: dict) -> str:
+    return node.get("type", "export").lower().strip()
+
+
+def input_columns(node_type: str, config: dict, needed: Optional[Set[str]]) -> List[Optional[Set[str]]]:
+    """
+    Columns each input of a node must provide so that the node still outputs
+    the `needed` columns unchanged, None meaning all of them.
+    """
+    if node_type in PASS_THROUGH:
+        if needed is None:
+            return [None]
+        used = filter_fields(config) if node_type == "filter" else sort_fields(config)
+        return [None] if used is None else [needed | used]
+
+    if node_type == "group":
+        keys, fields = group_keys(config), group_fields(config)
+        if not keys or fields is None:
+            return [None]
+        return [set(keys) | set(fields)]
+
+    if node_type == "forecast":
+        return [forecast_fields(config)]
+
+    if node_type == "merge":
+        if needed is None:
+            return [None, None]
+        suffixes = merge_suffixes(config)
+        # Keeping a column on both sides keeps it suffixed the same way
+        wanted = needed | {strip_suffix(column, suffixes) for column in needed}
+        keys = merge_keys(config)
+        return [wanted | keys, wanted | keys]
+
+    # Exports, charts and unknown operators report everything they get
+    return [None]
+
+
+def required_columns(flow_graph_dict: dict, protected: List[str] = None) -> Dict[str, Optional[Set[str]]]:
+    """
+    Walks the graph from its sinks back to its sources and returns, for every
+    node, the output columns its consumers read (None: all of them). Sinks
+    and `protected` nodes are reported as they are, so they need everything.
+    """
+    parser = Parser()
+    parser.parse(flow_graph_dict)
+    order = parser.topo_sort()
+    protected = set(protected or [])
+
+    consumers = {node_id: [] for node_id in order}
+    for node_id in order:
+        for source in parser.req_nodes.get(node_id, []):
+            consumers[source].append(node_id)
+
+    required = {}
+    demands = {node_id: [] for node_id in order}
+    for node_id in reversed(order):
+        needed = demands[node_id]
+        if node_id in protected or not consumers[node_id] or None in needed:
+            required[node_id] = None
+        else:
+            required[node_id] = set().union(*needed)
+
+        node = parser.nodes[node_id]
+        sources = parser.req_nodes.get(node_id, [])
+        per_input = input_columns(_normalize_type(node), node.get("config") or {}, required[node_id])
+        for index, source in enumerate(sources):
+            columns = per_input[index] if index < len(per_input) else None
+            demands[source].append(columns)
+    return required
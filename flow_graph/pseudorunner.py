@@ -1,15 +1,18 @@
 import json
-import os
+import time
 import pandas as pd
 from typing import Dict, List, Any
 
 from flow_graph.parser import Parser
+from flow_graph.data_source import load_dataset
+from flow_graph.node_columns import group_fields, group_keys, merge_keys, merge_suffixes
 
 
 class PseudoRunner:
     
-    def __init__(self, flow_graph_dict: dict):
+    def __init__(self, flow_graph_dict: dict, profile: bool = False):
         self.raw_data = flow_graph_dict
+        self.profile = profile
         self.parser = Parser()
         self.parser.parse(flow_graph_dict)
         self.nodes = self.parser.nodes
@@ -47,20 +50,20 @@ class PseudoRunner:
                 return self._flatten_keys_with_types(input_data[0])
             return {}
         elif isinstance(input_data, str):
-            return self._load_mock_data_columns(input_data)
+            columns = self._load_mock_data_columns(input_data)
+            if config.get("columns") is not None:
+                # A projected dataSource only reads these
+                wanted = set(config["columns"])
+                return {k: v for k, v in columns.items() if k in wanted}
+            return columns
         
         return {}
     
     def _load_mock_data_columns(self, filename: str) -> Dict[str, str]:
         try:
-            file_path = os.path.join(
-                os.path.dirname(__file__), "mock_data", f"{filename}.ndjson"
-            )
-            if not os.path.exists(file_path):
-                return {}
-            
-            df = pd.read_json(file_path, lines=True, nrows=1)
-            first_row = df.to_dict(orient="records")[0]
+            # Same cached frame the DataSource node will get, parsed once
+            df = load_dataset(filename)
+            first_row = df.head(1).to_dict(orient="records")[0]
             return self._flatten_keys_with_types(first_row)
         except Exception:
             return {}
@@ -82,9 +85,9 @@ class PseudoRunner:
         return input_columns.copy()
     
     def get_group_columns(self, input_columns: Dict[str, str], config: dict) -> Dict[str, str]:
-        group_by = config.get("group_by", [])
+        group_by = group_keys(config) or []
         aggregations = config.get("aggregations")
-        fields = config.get("fields")
+        fields = group_fields(config)
         
         result_columns = {}
         
@@ -94,7 +97,7 @@ class PseudoRunner:
             else:
                 result_columns[col] = "str"
         
-        if aggregations and fields:
+        if fields:
             for field in fields:
                 for agg in aggregations:
                     col_name = f"{field}_{agg}"
@@ -105,7 +108,7 @@ class PseudoRunner:
                         result_columns[col_name] = original_type if original_type in ["int", "float"] else "float"
                     else:
                         result_columns[col_name] = "float"
-        elif aggregations:
+        elif fields is None:
             result_columns["<aggregated_columns>"] = "float"
         else:
             result_columns["count"] = "int"
@@ -118,31 +121,21 @@ class PseudoRunner:
         columns2: Dict[str, str], 
         config: dict
     ) -> Dict[str, str]:
-        suffixes = config.get("suffixes", ("_x", "_y"))
-        on = config.get("on")
-        left_on = config.get("left_on")
-        right_on = config.get("right_on")
-        
-        merge_keys = set()
-        if on:
-            merge_keys.add(on)
-        if left_on:
-            merge_keys.add(left_on)
-        if right_on:
-            merge_keys.add(right_on)
+        suffixes = merge_suffixes(config)
+        keys = merge_keys(config)
         
         result_columns = {}
         cols1_set = set(columns1.keys())
         cols2_set = set(columns2.keys())
         
         for col, typ in columns1.items():
-            if col in cols2_set and col not in merge_keys:
+            if col in cols2_set and col not in keys:
                 result_columns[f"{col}{suffixes[0]}"] = typ
             else:
                 result_columns[col] = typ
         
         for col, typ in columns2.items():
-            if col in merge_keys and col in cols1_set:
+            if col in keys and col in cols1_set:
                 continue
             elif col in cols1_set:
                 result_columns[f"{col}{suffixes[1]}"] = typ
@@ -172,6 +165,8 @@ class PseudoRunner:
     def execute(self):
         for node_id in self.exec_order:
             try:
+                wall_start = time.perf_counter()
+                cpu_start = time.thread_time()
                 node = self.nodes[node_id]
                 node_type = node.get("type", "export").lower().strip()
                 config = node.get("config", {})
@@ -222,7 +217,20 @@ class PseudoRunner:
                 
                 # output_data = [columns]
                 
-                yield json.dumps({"node_id": node_id, "allowed_fields": columns}) + "\n"
+                output = {"node_id": node_id, "allowed_fields": columns}
+                if self.profile:
+                    output["profile"] = {
+                        "node_type": node_type,
+                        "wall_ms": round((time.perf_counter() - wall_start) * 1000, 3),
+                        "cpu_ms": round((time.thread_time() - cpu_start) * 1000, 3),
+                        "columns_in": sum(
+                            len(self.node_metadata.get(prev, {}))
+                            for prev in self.req_nodes.get(node_id, [])
+                        ),
+                        "columns_out": len(columns),
+                    }
+
+                yield json.dumps(output) + "\n"
                 
             except Exception:
                 continue
@@ -0,0 +1,107 @@
+import json
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from flow_graph.serializer import (
+    encode_node_output,
+    flatten_columns,
+    serialize_records,
+)
+
+
+class NodeResult:
+    """
+    Output of a single executed node. The DataFrame is handed over as is, so
+    callers decide how (and whether) to encode it.
+    """
+
+    def __init__(self, node_id: str, node_type: str, output, metadata: dict = None):
+        self.node_id = node_id
+        self.node_type = node_type
+        self.output = output
+        self.metadata = metadata or {}
+
+    @property
+    def total_rows(self) -> int:
+        if isinstance(self.output, pd.DataFrame):
+            # to_dict(orient="records") yields no rows for a frame without columns
+            return len(self.output) if len(self.output.columns) else 0
+        return len(self.output) if self.output is not None else 0
+
+    @property
+    def is_sink(self) -> bool:
+        return bool(self.metadata.get("sink"))
+
+    def schema(self) -> dict:
+        if isinstance(self.output, pd.DataFrame):
+            df = flatten_columns(self.output)
+            return {str(col): str(dtype) for col, dtype in df.dtypes.items()}
+        return {}
+
+    def head(self, rows: int):
+        if isinstance(self.output, pd.DataFrame):
+            output = self.output.head(rows)
+        else:
+            output = (self.output or [])[:rows]
+        return NodeResult(self.node_id, self.node_type, output, self.metadata)
+
+    def to_json(self, preview_rows: Optional[int] = None) -> str:
+        if preview_rows is None:
+            return encode_node_output(self.node_id, self.output)
+
+        # Preview: shape/schema plus at most `preview_rows` rows
+        total_rows = self.total_rows
+        summary = json.dumps(
+            {
+                "total_rows": total_rows,
+                "schema": self.schema(),
+                "truncated": total_rows > preview_rows,
+            }
+        )
+        # Splice the summary keys into the node payload object
+        return (
+            encode_node_output(self.node_id, self.head(preview_rows).output)[:-1]
+            + ", "
+            + summary[1:]
+        )
+
+    def describe(self) -> dict:
+        if isinstance(self.output, pd.DataFrame):
+            first_rows = serialize_records(self.output.head(1))
+        else:
+            first_rows = serialize_records(self.output or [])[:1]
+
+        if first_rows:
+            first_row = first_rows[0]
+            column_names = list(first_row.keys())
+            column_types = [
+                "string" if isinstance(x, str) else "number" for x in first_row.values()
+            ]
+        else:
+            column_names, column_types = [], []
+
+        return {
+            "node_id": self.node_id,
+            "total_rows": self.total_rows,
+            "column_names": column_names,
+            "column_types": column_types,
+        }
+
+
+def preview_limit(
+    result: NodeResult,
+    outputs: Optional[Iterable[str]] = None,
+    preview_rows: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Row cap for a node's payload, None meaning full data. Without any option
+    every node is sent in full. Otherwise only the nodes listed in `outputs`
+    (by default the sink nodes) are, and the rest get `preview_rows` rows.
+    """
+    if outputs is None and preview_rows is None:
+        return None
+    selected = result.node_id in outputs if outputs is not None else result.is_sink
+    if selected:
+        return None
+    return max(preview_rows or 0, 0)
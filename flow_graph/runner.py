@@ -1,16 +1,28 @@
-import json
-import pandas as pd
+from functools import partial
+from typing import List
 
-from typing import Any, Dict
-
-from flow_graph.parser import Parser
 from flow_graph.merge import Merge
 from flow_graph.filter import Filter
 from flow_graph.group import Group
 from flow_graph.sort import Sort
 from flow_graph.data_source import DataSource
+from flow_graph.mongo_source import MongoSource
 from flow_graph.export import Export
 from flow_graph.forecast import Forecast
+from flow_graph.scheduler import EXECUTOR_PROCESS, Scheduler
+from flow_graph.cancellation import CancelToken, ExecutionCancelled, active
+from flow_graph.profiling import NodeProfile, count_rows, profile_call, summarize
+from flow_graph.metrics import observe_node
+from flow_graph.result import NodeResult
+from flow_graph.plan_cache import CompiledPlan, PlanCache
+from flow_graph.cache import CachedNode, NodeCache, node_cache
+from flow_graph.incremental import (
+    FlowSession,
+    SessionStore,
+    dirty_nodes,
+    flow_sessions,
+    node_signature,
+)
 
 func_map = {
     # always lowercase the key
@@ -26,126 +38,290 @@ func_map = {
     "barchart": Export,
     "areachart": Export,
     "piechart": Export,
+    "mongosource": MongoSource,
 }
 
 
-def flatten_json(y: Dict[str, Any], parent_key="", sep=".") -> Dict[str, Any]:
-    items = []
-    for k, v in y.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            items.extend(flatten_json(v, new_key, sep=sep).items())
-        elif isinstance(v, list):
-            if all(isinstance(i, dict) for i in v):
-                items.append((new_key, json.dumps(v)))
-            else:
-                items.append((new_key, v))
+# Attributes through which operators keep their input frames alive
+INPUT_ATTRIBUTES = ("input", "df1", "df2", "inputs")
+
+
+def release_inputs(process):
+    for attr in INPUT_ATTRIBUTES:
+        if getattr(process, attr, None) is not None:
+            setattr(process, attr, None)
+
+
+def run_node(operator: type, config: dict, inputs: list, cancel_token: CancelToken = None):
+    _func = operator
+
+    with active(cancel_token):
+        if _func is DataSource or _func is MongoSource:
+            return _func(**config)
+
+        if _func is Merge:
+            cur_process = _func(inputs[0], inputs[1])
         else:
-            items.append((new_key, v))
-    return dict(items)
-
-
-def serialize_and_flatten(output_data):
-    flat_data = []
-    for row in output_data:
-        flat_row = flatten_json(row)
-        # Replace NaN/inf and convert timestamps
-        for k, v in flat_row.items():
-            if isinstance(v, pd.Timestamp):
-                flat_row[k] = v.isoformat()
-            elif isinstance(v, float) and (
-                pd.isna(v) or pd.isnull(v) or v == float("inf") or v == float("-inf")
-            ):
-                flat_row[k] = None
-        flat_data.append(flat_row)
-    return flat_data
+            cur_process = _func(inputs[0])
+        cur_process.run(**config)
+        return cur_process
 
 
 class Runner:
-    def __init__(self, flow_graph_dict: dict):
+    def __init__(
+        self,
+        flow_graph_dict: dict,
+        executor: str = None,
+        max_workers: int = None,
+        cache: NodeCache = node_cache,
+        flow_uid: str = None,
+        incremental: bool = False,
+        sessions: SessionStore = flow_sessions,
+        targets: List[str] = None,
+        retain_outputs: bool = False,
+        optimize: bool = False,
+        progress_callback=None,
+        cancel_token: CancelToken = None,
+        profile: bool = False,
+        plan_cache: PlanCache = None,
+        database=None,
+        reported: List[str] = None,
+    ):
         self.raw_data = flow_graph_dict
-        self.parser = Parser()
-        self.parser.parse(flow_graph_dict)
-        self.nodes = self.parser.nodes
-        self.req_nodes = self.parser.req_nodes
-        self.exec_order = self.parser.topo_sort()
+        self.cancel_token = cancel_token
+        self.profile = profile
+        self.profiles = {}
+        # Called as progress_callback(node_id, completed, total) after each node
+        self.progress_callback = progress_callback
+        self.targets = list(targets) if targets else None
+        # Node ids the caller returns, None for every node. Only the others
+        # may lose columns they don't need.
+        self.reported = set(reported) if reported is not None else None
+        # pymongo Database that mongoSource nodes read from
+        self.database = database
+
+        build_plan = partial(
+            CompiledPlan,
+            flow_graph_dict,
+            func_map,
+            optimize=optimize,
+            targets=self.targets,
+            reported=reported,
+        )
+        if plan_cache is not None and flow_uid:
+            variant = (
+                bool(optimize),
+                tuple(self.targets or ()),
+                tuple(sorted(self.reported)) if self.reported is not None else None,
+            )
+            self.compiled = plan_cache.get(flow_uid, flow_graph_dict, variant, build_plan)
+        else:
+            self.compiled = build_plan()
+
+        self.plan = self.compiled.optimized
+        self.hidden_nodes = self.compiled.hidden_nodes
+        self.parser = self.compiled.parser
+        self.nodes = self.compiled.nodes
+        self.req_nodes = self.compiled.req_nodes
+        self.exec_order = self.compiled.exec_order
         self.executed_processes = {}
+        # The exception that ended the last run early, if any
+        self.error = None
+        self.retain_outputs = retain_outputs
+        self.cache = cache
+        self.node_keys = self.compiled.node_keys() if cache is not None else {}
 
-    def execute(self):
-        prev_output = None
-        try:
-            for node_id in self.exec_order:
-                node = self.nodes[node_id]
-                type = node.get("type", "export").lower().strip()
-                _func = func_map[type]
-
-                cur_process = None
-
-                if _func is DataSource:
-                    config = node.get("config", {})
-                    cur_process = _func(**config)
-                    prev_output = cur_process.output
-
-                elif _func is Merge:
-                    df1 = self.executed_processes[self.req_nodes[node_id][0]].output
-                    df2 = self.executed_processes[self.req_nodes[node_id][1]].output
-                    cur_process = _func(df1, df2)
-                    cur_process.run(**node.get("config", {}))
-
-                elif _func is Export:
-                    prev_node = self.executed_processes[
-                        self.req_nodes.get(node_id, [])[0]
-                    ]
-                    cur_process = _func(prev_node.output)
-                    cur_process.run(**node.get("config", {}))
-
-                    if hasattr(cur_process.output, "to_dict"):
-                        df_copy = cur_process.output.copy()
-                        if isinstance(df_copy.columns, pd.MultiIndex):
-                            df_copy.columns = [
-                                "_".join(map(str, col)).strip()
-                                for col in df_copy.columns.values
-                            ]
-                        output_data = df_copy.to_dict(orient="records")
-                    else:
-                        output_data = cur_process.output
-
-                    output_serializable = serialize_and_flatten(output_data)
-                    yield (
-                        json.dumps({"node_id": node_id, "output": output_serializable})
-                        + "\n"
-                    )
+        self.flow_uid = flow_uid
+        self.sessions = sessions if incremental and flow_uid else None
+        self.signatures = {}
+        self.retained_outputs = {}
+        self.dirty_nodes = set(self.exec_order)
+        if self.sessions is not None:
+            self._load_session()
+
+        self.scheduler = Scheduler(
+            self.exec_order,
+            self.req_nodes,
+            self.parser.graph,
+            executor=executor,
+            max_workers=max_workers,
+        )
+
+    def node_type(self, node_id: str) -> str:
+        return self.compiled.node_types[node_id]
+
+    def _is_sink(self, node_id: str) -> bool:
+        if self.targets:
+            return node_id in self.targets
+        return not self.parser.graph.get(node_id)
+
+    def _load_session(self):
+        self.signatures = {
+            node_id: node_signature(self.nodes[node_id], self.req_nodes.get(node_id, []))
+            for node_id in self.exec_order
+        }
+        previous = self.sessions.get(self.flow_uid)
+        if previous is None:
+            return
+
+        self.dirty_nodes = dirty_nodes(
+            previous.signatures, self.signatures, self.parser.graph
+        )
+        self.retained_outputs = {
+            node_id: output
+            for node_id, output in previous.outputs.items()
+            if node_id in self.signatures and node_id not in self.dirty_nodes
+        }
+
+    def _check_cancelled(self):
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+
+    def _build_task(self, node_id: str, upstream: list):
+        self._check_cancelled()
+        # The scheduler hands back what the tasks returned, unwrap it first
+        upstream = [process.result for process in upstream]
+        fn, args = self._node_task(node_id, upstream)
+        if self.profile:
+            self.profiles[node_id] = NodeProfile(
+                node_id,
+                self.node_type(node_id),
+                rows_in=sum(count_rows(process.output) or 0 for process in upstream),
+            )
+        # Always timed, the operator metrics need it and it is two clock reads
+        return profile_call, (fn, args)
 
-                else:
-                    prev_node = self.executed_processes[
-                        self.req_nodes.get(node_id, [])[0]
-                    ]
-                    cur_process = _func(prev_node.output)
-                    cur_process.run(**node.get("config", {}))
+    def _node_task(self, node_id: str, upstream: list):
+        if node_id in self.retained_outputs:
+            return CachedNode, (self.retained_outputs[node_id],)
 
+        if self.cache is not None:
+            cached = self.cache.get(self.node_keys.get(node_id))
+            if cached is not None:
+                return CachedNode, (cached,)
+
+        inputs = [process.output for process in upstream]
+        config = self.nodes[node_id].get("config", {})
+        # Tokens can't cross process boundaries, those nodes are only
+        # cancelled between nodes
+        token = None if self.scheduler.executor == EXECUTOR_PROCESS else self.cancel_token
+        operator = self.compiled.bindings[node_id]
+        if operator is None:
+            raise ValueError(f"Unknown node type: {self.node_type(node_id)}")
+        if operator is MongoSource:
+            if self.scheduler.executor == EXECUTOR_PROCESS:
+                raise ValueError("mongoSource nodes can't run on the process executor")
+            config = {**config, "database": self.database}
+        return run_node, (operator, config, inputs, token)
+
+    def execute_nodes(self):
+        """
+        Yields a NodeResult per node in execution order. Unlike `execute`, the
+        outputs are not serialized, so the caller encodes them exactly once.
+        """
+        prev_output = None
+        # Incremental sessions need every output once the run is over
+        retain = self.retain_outputs or self.sessions is not None
+        consumers = self.scheduler.consumer_counts()
+        try:
+            for completed, (node_id, cur_process) in enumerate(
+                self.scheduler.run(
+                    self._build_task,
+                    check=self._check_cancelled if self.cancel_token else None,
+                ),
+                start=1,
+            ):
+                self._check_cancelled()
+                profiled, cur_process = cur_process, cur_process.result
                 self.executed_processes[node_id] = cur_process
                 prev_output = cur_process.output
+                cached = isinstance(cur_process, CachedNode)
+                if not cached:
+                    observe_node(
+                        self.node_type(node_id),
+                        profiled.wall_ms / 1000,
+                        count_rows(prev_output),
+                    )
+                    if self.cache is not None:
+                        self.cache.put(self.node_keys.get(node_id), prev_output)
+                if self.progress_callback is not None:
+                    self.progress_callback(node_id, completed, len(self.exec_order))
 
-                if type not in ["export"]:
-                    if hasattr(prev_output, "to_dict"):
-                        df_copy = prev_output.copy()
-                        if isinstance(df_copy.columns, pd.MultiIndex):
-                            df_copy.columns = [
-                                "_".join(map(str, col)).strip()
-                                for col in df_copy.columns.values
-                            ]
-                        output_data = df_copy.to_dict(orient="records")
-                    else:
-                        output_data = prev_output
-
-                    output_serializable = serialize_and_flatten(output_data)
-                    yield (
-                        json.dumps({"node_id": node_id, "output": output_serializable})
-                        + "\n"
+                metadata = {"cached": cached, "sink": self._is_sink(node_id)}
+                if self.profile:
+                    profile = self.profiles[node_id]
+                    profile.record(profiled, prev_output, cached)
+                    profile.hidden = node_id in self.hidden_nodes
+                    # Encoders fill in serialize_ms on the same object
+                    metadata["profile"] = profile
+
+                if node_id not in self.hidden_nodes and (
+                    self.reported is None or node_id in self.reported
+                ):
+                    # Rewritten nodes no longer match the flow, keep them internal
+                    yield NodeResult(
+                        node_id,
+                        self.node_type(node_id),
+                        prev_output,
+                        metadata=metadata,
                     )
 
+                if not retain:
+                    self._release_upstream(node_id, consumers)
+
+            return prev_output
+
+        except ExecutionCancelled:
+            # Unlike node failures, the caller has to know the run was cut short
+            raise
+
+        except Exception as e:
+            # The run just ends, callers that need the reason read it here
+            self.error = e
             return prev_output
 
+        finally:
+            self._save_session()
+
+    def profile_report(self) -> dict:
+        """Per-node timings, rows and sizes of the nodes run so far."""
+        return summarize(
+            self.profiles[node_id]
+            for node_id in self.exec_order
+            if node_id in self.profiles
+        )
+
+    def _release_upstream(self, node_id: str, consumers: dict):
+        """
+        Drop intermediate outputs as soon as their last consumer has run, so
+        peak memory follows the live frontier of the graph instead of the
+        sum of every intermediate. Sinks are kept as the flow's results.
+        """
+        release_inputs(self.executed_processes[node_id])
+        for src in self.req_nodes.get(node_id, []):
+            consumers[src] -= 1
+            if consumers[src] == 0:
+                self.executed_processes.pop(src, None)
+
+    def execute(self):
+        prev_output = None
+        try:
+            for result in self.execute_nodes():
+                prev_output = result.output
+                yield result.to_json() + "\n"
+            return prev_output
+
+        except ExecutionCancelled:
+            raise
+
         except Exception :
-            # print(e)
             return prev_output
+
+    def _save_session(self):
+        if self.sessions is None:
+            return
+        outputs = {
+            node_id: process.output
+            for node_id, process in self.executed_processes.items()
+        }
+        self.sessions.save(self.flow_uid, FlowSession(self.signatures, outputs))
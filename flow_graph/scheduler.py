@@ -0,0 +1,185 @@
+import os
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Callable, Dict, Iterator, List, Tuple
+
+EXECUTOR_SYNC = "sync"
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+
+DEFAULT_EXECUTOR = os.getenv("FLOW_RUNNER_EXECUTOR", EXECUTOR_THREAD).lower()
+DEFAULT_MAX_WORKERS = int(
+    os.getenv("FLOW_RUNNER_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+
+# How often a parallel run wakes up to call `check` while nodes are running
+CHECK_INTERVAL = 0.1
+
+# Pools are shared by every Runner in the process so that concurrent requests
+# are bounded by the same set of workers instead of each spawning their own.
+_pools: Dict[Tuple[str, int], Executor] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(kind: str, max_workers: int) -> Executor:
+    key = (kind, max_workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            if kind == EXECUTOR_PROCESS:
+                pool = ProcessPoolExecutor(max_workers=max_workers)
+            elif kind == EXECUTOR_THREAD:
+                pool = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="flow-node"
+                )
+            else:
+                raise ValueError(f"Invalid executor type: {kind}")
+            _pools[key] = pool
+        return pool
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class Scheduler:
+    """
+    Dispatches nodes to a worker pool as soon as all of their upstream nodes
+    have finished, and hands results back in `exec_order` so the caller sees
+    the same sequence a sequential run would produce.
+
+    `build_task(node_id, upstream_results)` must return `(fn, args)`; with a
+    process pool both have to be picklable. `check()`, if given, is called
+    periodically and may raise to abandon the run.
+    """
+
+    def __init__(
+        self,
+        exec_order: List[str],
+        req_nodes: Dict[str, List[str]],
+        graph: Dict[str, List[str]],
+        executor: str = None,
+        max_workers: int = None,
+    ):
+        self.exec_order = exec_order
+        self.req_nodes = req_nodes
+        self.graph = graph
+        self.executor = (executor or DEFAULT_EXECUTOR).lower()
+        self.max_workers = max_workers if max_workers is not None else DEFAULT_MAX_WORKERS
+
+    @property
+    def is_parallel(self) -> bool:
+        return self.executor != EXECUTOR_SYNC and self.max_workers > 1
+
+    def run(self, build_task: Callable, check: Callable = None) -> Iterator[Tuple[str, object]]:
+        if self.is_parallel:
+            return self._run_parallel(build_task, check)
+        return self._run_sequential(build_task)
+
+    def _upstream(self, node_id: str, results: Dict[str, object]) -> List[object]:
+        return [results[src] for src in self.req_nodes.get(node_id, [])]
+
+    def consumer_counts(self) -> Dict[str, int]:
+        counts = {node_id: 0 for node_id in self.exec_order}
+        for node_id in self.exec_order:
+            for src in self.req_nodes.get(node_id, []):
+                counts[src] += 1
+        return counts
+
+    @staticmethod
+    def _release(node_ids, consumers, yielded, results):
+        # Drop our reference once a result was handed out and every consumer
+        # has been given its inputs, so memory is owned by the caller alone.
+        for node_id in node_ids:
+            if consumers[node_id] == 0 and node_id in yielded:
+                results.pop(node_id, None)
+
+    def _consumed(self, node_id, consumers, yielded, results):
+        sources = self.req_nodes.get(node_id, [])
+        for src in sources:
+            consumers[src] -= 1
+        self._release(sources, consumers, yielded, results)
+
+    def _run_sequential(self, build_task: Callable):
+        results = {}
+        consumers = self.consumer_counts()
+        yielded = set()
+        for node_id in self.exec_order:
+            fn, args = build_task(node_id, self._upstream(node_id, results))
+            self._consumed(node_id, consumers, yielded, results)
+            result = fn(*args)
+            del fn, args
+            results[node_id] = result
+            yielded.add(node_id)
+            self._release([node_id], consumers, yielded, results)
+            yield node_id, result
+            del result
+
+    def _run_parallel(self, build_task: Callable, check: Callable = None):
+        pool = get_pool(self.executor, self.max_workers)
+        remaining = {
+            node_id: len(self.req_nodes.get(node_id, []))
+            for node_id in self.exec_order
+        }
+        results = {}
+        futures = {}
+        consumers = self.consumer_counts()
+        yielded = set()
+
+        def submit(node_id):
+            try:
+                fn, args = build_task(node_id, self._upstream(node_id, results))
+                futures[pool.submit(fn, *args)] = node_id
+            except Exception as e:
+                results[node_id] = _Failed(e)
+            self._consumed(node_id, consumers, yielded, results)
+
+        try:
+            for node_id in self.exec_order:
+                if remaining[node_id] == 0:
+                    submit(node_id)
+
+            for node_id in self.exec_order:
+                while node_id not in results:
+                    if not futures:
+                        # Upstream failed, so this node can never become ready
+                        raise RuntimeError(f"Node {node_id} was never scheduled")
+                    done, _ = wait(
+                        list(futures),
+                        timeout=CHECK_INTERVAL if check else None,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    if check:
+                        check()
+                    for future in done:
+                        finished = futures.pop(future)
+                        try:
+                            results[finished] = future.result()
+                        except Exception as e:
+                            results[finished] = _Failed(e)
+                            continue
+                        for target in self.graph.get(finished, []):
+                            if target not in remaining:
+                                # Pruned from this run
+                                continue
+                            remaining[target] -= 1
+                            if remaining[target] == 0:
+                                submit(target)
+
+                result = results[node_id]
+                if isinstance(result, _Failed):
+                    raise result.error
+                yielded.add(node_id)
+                self._release([node_id], consumers, yielded, results)
+                yield node_id, result
+                del result
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,177 @@
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+    is_object_dtype,
+)
+
+
+def flatten_json(y: Dict[str, Any], parent_key="", sep=".") -> Dict[str, Any]:
+    items = []
+    for k, v in y.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            items.extend(flatten_json(v, new_key, sep=sep).items())
+        elif isinstance(v, list):
+            if all(isinstance(i, dict) for i in v):
+                items.append((new_key, json.dumps(v)))
+            else:
+                items.append((new_key, v))
+        else:
+            items.append((new_key, v))
+    return dict(items)
+
+
+def serialize_and_flatten(output_data):
+    flat_data = []
+    for row in output_data:
+        flat_row = flatten_json(row)
+        # Replace NaN/inf and convert timestamps
+        for k, v in flat_row.items():
+            if isinstance(v, pd.Timestamp):
+                flat_row[k] = v.isoformat()
+            elif isinstance(v, float) and (
+                pd.isna(v) or pd.isnull(v) or v == float("inf") or v == float("-inf")
+            ):
+                flat_row[k] = None
+        flat_data.append(flat_row)
+    return flat_data
+
+
+def flatten_columns(df: pd.DataFrame) -> pd.DataFrame:
+    if isinstance(df.columns, pd.MultiIndex):
+        # Shallow copy: only the column labels change, the data is shared
+        df = df.copy(deep=False)
+        df.columns = ["_".join(map(str, col)).strip() for col in df.columns.values]
+    return df
+
+
+def serialize_records(output) -> list:
+    """Row-wise reference implementation, returns JSON-ready records."""
+    if hasattr(output, "to_dict"):
+        output_data = flatten_columns(output).to_dict(orient="records")
+    else:
+        output_data = output
+    return serialize_and_flatten(output_data)
+
+
+################################################################################
+# Columnar encoder
+################################################################################
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _box_native(value):
+    # The Python value to_dict(orient="records") hands out for an object cell
+    if isinstance(value, np.datetime64):
+        return pd.Timestamp(value)
+    if isinstance(value, np.timedelta64):
+        return pd.Timedelta(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NA:
+        return None
+    return value
+
+
+def _encode_value(value) -> str:
+    # Mirrors to_dict(orient="records") + serialize_and_flatten for one cell
+    value = _box_native(value)
+    if isinstance(value, dict):
+        # Dict cells expand into extra keys, only the row-wise path handles that
+        raise _Unsupported()
+    if isinstance(value, list) and all(isinstance(i, dict) for i in value):
+        return encode_basestring_ascii(json.dumps(value))
+    if isinstance(value, pd.Timestamp):
+        return encode_basestring_ascii(value.isoformat())
+    if isinstance(value, float) and not np.isfinite(value):
+        return "null"
+    return json.dumps(value)
+
+
+def _encode_datetimes(values: np.ndarray) -> List[str]:
+    if np.isnat(values).any():
+        raise _Unsupported()
+    seconds = values.astype("datetime64[s]")
+    if (seconds == values).all():
+        # Whole seconds: isoformat() has no fractional part
+        return ['"' + s + '"' for s in np.datetime_as_string(seconds, unit="s").tolist()]
+    return [encode_basestring_ascii(ts.isoformat()) for ts in pd.DatetimeIndex(values)]
+
+
+def _encode_column(series: pd.Series) -> List[str]:
+    dtype = series.dtype
+    values = series.to_numpy()
+
+    if is_bool_dtype(dtype) and values.dtype == np.bool_:
+        return np.where(values, "true", "false").tolist()
+
+    if is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+        return list(map(int.__repr__, values.tolist()))
+
+    if is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+        encoded = list(map(float.__repr__, values.tolist()))
+        for i in np.flatnonzero(~np.isfinite(values)).tolist():
+            encoded[i] = "null"
+        return encoded
+
+    if is_datetime64_dtype(dtype) and isinstance(dtype, np.dtype):
+        return _encode_datetimes(values)
+
+    if is_object_dtype(dtype):
+        if pd.api.types.infer_dtype(values, skipna=False) == "string":
+            return list(map(encode_basestring_ascii, values.tolist()))
+        return [_encode_value(v) for v in values]
+
+    raise _Unsupported()
+
+
+def _encode_frame(df: pd.DataFrame) -> str:
+    df = flatten_columns(df)
+    columns = df.columns.tolist()
+    if not df.columns.is_unique or not all(isinstance(c, str) for c in columns):
+        raise _Unsupported()
+
+    if len(df) == 0 or not columns:
+        return "[]"
+
+    encoded = [_encode_column(df.iloc[:, i]) for i in range(len(columns))]
+    template = (
+        "{"
+        + ", ".join(encode_basestring_ascii(c).replace("%", "%%") + ": %s" for c in columns)
+        + "}"
+    )
+    return "[" + ", ".join([template % row for row in zip(*encoded)]) + "]"
+
+
+def serialize_output(output) -> str:
+    """
+    JSON text for a node output, byte-for-byte identical to
+    `json.dumps(serialize_records(output))` but built column by column.
+    """
+    if isinstance(output, pd.DataFrame):
+        try:
+            return _encode_frame(output)
+        except _Unsupported:
+            pass
+    return json.dumps(serialize_records(output))
+
+
+def encode_node_output(node_id: Optional[str], output) -> str:
+    return (
+        '{"node_id": '
+        + json.dumps(node_id)
+        + ', "output": '
+        + serialize_output(output)
+        + "}"
+    )
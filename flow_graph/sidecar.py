@@ -0,0 +1,155 @@
+import os
+import sys
+import hashlib
+import threading
+from typing import List, Optional
+
+import pandas as pd
+
+from flow_graph.cache import MOCK_DATA_DIR, file_signature, mock_data_names, mock_data_path
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    ARROW_AVAILABLE = True
+except Exception:
+    ARROW_AVAILABLE = False
+
+# Full parses of NDJSON datasets are kept as uncompressed Arrow files named
+# after the file's content hash, so later loads memory-map them instead of
+# parsing JSON. Limited reads infer dtypes from their own rows and are
+# always parsed.
+SIDECAR_ENABLED = os.getenv("FLOW_SIDECAR", "1").lower() not in ("0", "false", "no")
+DEFAULT_SIDECAR_DIR = os.getenv("FLOW_SIDECAR_DIR", os.path.join(MOCK_DATA_DIR, ".sidecars"))
+HASH_BLOCK_SIZE = 1024 * 1024
+
+_hashes = {}  # path -> (signature, digest)
+# Files whose frame does not survive the Arrow round trip, don't retry them
+_unsupported = set()
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return SIDECAR_ENABLED and ARROW_AVAILABLE
+
+
+def writable(path: str) -> bool:
+    return enabled() and path not in _unsupported
+
+
+def file_hash(path: str) -> Optional[str]:
+    """sha256 of the file, recomputed only when its mtime or size changes."""
+    signature = file_signature(path)
+    if signature is None:
+        return None
+    with _lock:
+        cached = _hashes.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    with _lock:
+        _hashes[path] = (signature, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def sidecar_path(path: str, directory: str = None) -> Optional[str]:
+    digest = file_hash(path)
+    if digest is None:
+        return None
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(directory or DEFAULT_SIDECAR_DIR, f"{name}-{digest[:32]}.arrow")
+
+
+def select_columns(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    """The requested columns that exist, kept in the frame's own order."""
+    if columns is None:
+        return df
+    wanted = set(columns)
+    return df[[col for col in df.columns if col in wanted]]
+
+
+def read(path: str, columns: List[str] = None, directory: str = None) -> Optional[pd.DataFrame]:
+    """The full dataset from its sidecar, or None when there is none yet."""
+    if not enabled():
+        return None
+    target = sidecar_path(path, directory)
+    if target is None or not os.path.exists(target):
+        return None
+
+    try:
+        # memory_map: pages come from the OS page cache, shared by every worker
+        table = feather.read_table(target, memory_map=True)
+        if columns is not None:
+            wanted = set(columns)
+            table = table.select([name for name in table.column_names if name in wanted])
+        return table.to_pandas(split_blocks=True)
+    except Exception as e:
+        print(f"Error reading sidecar {target} :", e)
+        return None
+
+
+def write(path: str, df: pd.DataFrame, directory: str = None) -> Optional[str]:
+    """
+    Stores the fully parsed frame of `path`. Frames that would not come back
+    identical (nested objects, mixed-type columns...) are skipped, those
+    datasets keep being parsed from JSON.
+    """
+    if not writable(path):
+        return None
+    target = sidecar_path(path, directory)
+    if target is None or os.path.exists(target):
+        return target
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if not table.to_pandas().equals(df.reset_index(drop=True)):
+            raise ValueError("frame changes in the Arrow round trip")
+    except Exception as e:
+        print(f"Skipping sidecar for {path} :", e)
+        _unsupported.add(path)
+        return None
+
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    # Write then rename so concurrent readers never map a half written file
+    tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, target)
+    _remove_stale(directory, os.path.basename(target))
+    return target
+
+
+def _remove_stale(directory: str, current: str):
+    """Drops the sidecars of older versions of the same dataset."""
+    prefix = current[: -len(".arrow") - 32]
+    for name in os.listdir(directory):
+        stale = (
+            name != current
+            and name.startswith(prefix)
+            and name.endswith(".arrow")
+            and len(name) == len(current)
+        )
+        if stale:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def main():
+    """`python -m flow_graph.sidecar [name ...]`, every dataset by default."""
+    from flow_graph.data_source import DataSource
+
+    for name in sys.argv[1:] or mock_data_names():
+        path = mock_data_path(name)
+        frame = DataSource.read_ndjson(path, None, 10_000)
+        target = write(path, frame)
+        print(f"{name}: {target or 'not supported'}")
+
+
+if __name__ == "__main__":
+    main()
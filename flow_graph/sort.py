@@ -7,8 +7,9 @@ class Sort:
         self.output = None
 
     def run(self, field, asc: bool = True):
-        self.output = self.input.sort_values(by=field, ascending=asc).reset_index(
-            drop=True
+        # Stable, so ties keep their input order whatever ran upstream
+        self.output = self.input.sort_values(
+            by=field, ascending=asc, kind="stable", ignore_index=True
         )
 
         return self.output
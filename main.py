@@ -1,3 +1,4 @@
+import asyncio
 from http import HTTPStatus
 from contextlib import asynccontextmanager
 
@@ -7,27 +8,88 @@ from pymongo import MongoClient
 
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from middlewares.security import SecurityHeadersMiddleware
+from middlewares.metrics import MetricsMiddleware
+
+from api.executor import FlowExecutor
+from api.job_manager import JobManager
 
 from api.flows import router as DashboardApiRouter
 from api.dashboard import router as FlowsApiRouter
+from api.jobs import router as JobsApiRouter
 
 from api.tags import APITags
 
+from flow_graph.cache import node_cache
+from flow_graph.cow import COPY_ON_WRITE, enable_copy_on_write
+from flow_graph.data_source import warm_datasets
+from flow_graph.dataset_cache import dataset_cache
+from flow_graph.metrics import collect_cache, collect_datasets, registry
+
 load_dotenv()
 
 MONGO_URI = "mongodb://localhost:27017"
 DB_NAME = "dynamatics-backend"
 
 
+flows_in_flight = registry.gauge(
+    "flow_executions_in_flight",
+    "Flow executions running or queued on the request executor",
+)
+flow_execution_slots = registry.gauge(
+    "flow_execution_slots",
+    "Flow executions the request executor runs at once",
+)
+jobs_pending = registry.gauge(
+    "flow_jobs_pending",
+    "Background jobs queued or running",
+)
+
+
+def collect_executors(app: FastAPI):
+    def collect():
+        stats = app.state.flow_executor.stats()
+        flows_in_flight.set(stats["in_flight"])
+        flow_execution_slots.set(stats["max_concurrency"])
+        jobs_pending.set(app.state.job_manager.pending)
+
+    return collect
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Process wide pandas option, set before any flow runs
+    enable_copy_on_write(COPY_ON_WRITE)
+
     app.state.mongo_client = MongoClient(MONGO_URI)
     print("MongoDB connected!")
 
+    app.state.flow_executor = FlowExecutor()
+    app.state.flow_executor.start()
+    app.state.job_manager = JobManager()
+    app.state.job_manager.start()
+
+    # Parse the datasets named in FLOW_DATASET_WARM before the first request
+    warmed = await asyncio.get_running_loop().run_in_executor(None, warm_datasets)
+    if warmed:
+        print(f"Warmed datasets: {', '.join(warmed)}")
+
+    collectors = [
+        collect_cache(node_cache),
+        collect_datasets(dataset_cache),
+        collect_executors(app),
+    ]
+    for collect in collectors:
+        registry.add_collector(collect)
+
     yield
 
+    for collect in collectors:
+        registry.remove_collector(collect)
+    app.state.job_manager.shutdown()
+    app.state.flow_executor.shutdown()
     app.state.mongo_client.close()
     print("MongoDB connection closed !")
 
@@ -52,12 +114,14 @@ app.add_middleware(
 )
 
 app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 api_router = APIRouter()
 
 api_router.include_router(FlowsApiRouter)
 api_router.include_router(DashboardApiRouter)
+api_router.include_router(JobsApiRouter)
 
 app.include_router(api_router, prefix="/api")
 
@@ -66,3 +130,10 @@ app.include_router(api_router, prefix="/api")
 @app.get("/health_check", tags=[APITags.HEALTH_CHECK])
 async def health_check():
     return {"status": HTTPStatus.OK, "message": "ok"}
+
+
+@app.get("/metrics", tags=[APITags.METRICS], response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
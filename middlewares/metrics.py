@@ -0,0 +1,27 @@
+import time
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from flow_graph.metrics import registry
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent, by route",
+    ("method", "route", "status"),
+)
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        # The route template, not the raw path, so flow uids don't each
+        # become their own series
+        route = request.scope.get("route")
+        request_duration.labels(
+            request.method,
+            route.path if route is not None else "<unmatched>",
+            str(response.status_code),
+        ).observe(time.perf_counter() - start)
+        return response
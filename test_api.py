@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Tests for the flow execution and job endpoints
+"""
+import asyncio
+import gc
+import json
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.executor import FlowExecutor
+from api.flows import FORMAT_JSON, stream_body
+from flow_graph.arrow_io import ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE
+from api.flows import router as flows_router
+from api.job_manager import (
+    JOB_CANCELLED,
+    JOB_FAILED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    DiskJobStore,
+    Job,
+    JobManager,
+    MemoryJobStore,
+)
+from api.jobs import router as jobs_router
+from flow_graph.cancellation import CancelToken
+from flow_graph.runner import Runner
+
+
+def load_flow(name: str) -> dict:
+    with open(f"test_data/{name}.json", "r") as f:
+        return json.load(f)
+
+
+def make_app(executor: FlowExecutor = None, job_manager: JobManager = None) -> FastAPI:
+    app = FastAPI()
+    app.include_router(flows_router, prefix="/api")
+    app.include_router(jobs_router, prefix="/api")
+    # Only saved flows are read from Mongo, these tests send their graphs
+    app.state.mongo_client = {"dynamatics-backend": None}
+    app.state.flow_executor = executor or FlowExecutor()
+    app.state.job_manager = job_manager or JobManager(MemoryJobStore())
+    return app
+
+
+def wait_for(manager: JobManager, job_id: str, timeout: float = 10) -> Job:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.store.get(job_id)
+        if job is not None and job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def blocking_job(release: threading.Event, started: threading.Event = None):
+    def execute(job_id, progress, token):
+        if started is not None:
+            started.set()
+        while not release.wait(0.01):
+            token.check()
+        return '{"status": "success", "data": []}'
+
+    return execute
+
+
+################################################################################
+# Executor
+################################################################################
+
+
+def test_executor_not_started():
+    client = TestClient(make_app(FlowExecutor()))
+    response = client.post("/api/flows/execute", json={"flow_graph": load_flow("test_flow")})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+
+
+def test_executor_busy():
+    executor = FlowExecutor(max_concurrency=1, max_queue=1, retry_after=7)
+    executor.start()
+    try:
+        client = TestClient(make_app(executor))
+        flow = {"flow_graph": load_flow("test_flow")}
+        # Streams hold their slot until they are consumed or dropped
+        held = [executor.stream(lambda: iter(())) for _ in range(2)]
+        assert executor.in_flight == executor.max_concurrency + executor.max_queue
+
+        response = client.post("/api/flows/execute", json=flow)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "7"
+
+        del held
+        gc.collect()
+        assert executor.in_flight == 0
+        assert client.post("/api/flows/execute", json=flow).status_code == 200
+    finally:
+        executor.shutdown()
+
+
+def test_execute_admitted_once():
+    executor = FlowExecutor()
+    executor.start()
+    admissions = []
+    admit = executor._admit
+    executor._admit = lambda: admissions.append(1) or admit()
+    try:
+        client = TestClient(make_app(executor))
+        response = client.post("/api/flows/execute", json={"flow_graph": load_flow("test_flow")})
+        assert response.status_code == 200
+        assert len(admissions) == 1 and executor.in_flight == 0
+    finally:
+        executor.shutdown()
+
+
+def test_stream_disconnect_cancels():
+    executor = FlowExecutor(max_concurrency=1, max_queue=0)
+    executor.start()
+    token = CancelToken()
+    runner = Runner(load_flow("test_flow"), cache=None, cancel_token=token)
+
+    async def disconnect_after_first_line():
+        body = executor.stream(
+            lambda: stream_body(runner, FORMAT_JSON),
+            on_abort=lambda: token.cancel("disconnected"),
+        )
+        async for line in body:
+            assert "node_id" in json.loads(line)
+            break
+        # What the server does once the client goes away
+        await body.aclose()
+
+    try:
+        asyncio.run(disconnect_after_first_line())
+        assert token.cancelled and token.reason == "disconnected"
+        assert executor.in_flight == 0
+    finally:
+        executor.shutdown()
+
+
+################################################################################
+# Output formats
+################################################################################
+
+
+@pytest.fixture
+def flow_client():
+    executor = FlowExecutor()
+    executor.start()
+    yield TestClient(make_app(executor))
+    executor.shutdown()
+
+
+def execute(client: TestClient, name: str, params: dict = None, accept: str = None):
+    return client.post(
+        "/api/flows/execute",
+        params=params,
+        headers={"Accept": accept} if accept else None,
+        json={"flow_graph": load_flow(name)},
+    )
+
+
+def read_ipc_streams(content: bytes) -> dict:
+    pa = pytest.importorskip("pyarrow")
+    reader, tables = pa.BufferReader(content), {}
+    while reader.tell() < len(content):
+        table = pa.ipc.open_stream(reader).read_all()
+        tables[table.schema.metadata[b"node_id"].decode()] = table
+    return tables
+
+
+def test_format_arrow(flow_client):
+    pytest.importorskip("pyarrow")
+    streamed = execute(flow_client, "test_flow", {"stream": True})
+    lines = [json.loads(line) for line in streamed.iter_lines() if line]
+    rows = {line["node_id"]: len(line["output"]) for line in lines}
+    for params, accept in [({"format": "arrow"}, None), (None, ARROW_STREAM_MEDIA_TYPE)]:
+        response = execute(flow_client, "test_flow", params, accept)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == ARROW_STREAM_MEDIA_TYPE
+        tables = read_ipc_streams(response.content)
+        assert {node_id: table.num_rows for node_id, table in tables.items()} == rows
+        assert list(tables) == list(rows)
+
+
+def test_format_parquet(flow_client):
+    pq = pytest.importorskip("pyarrow.parquet")
+    pa = pytest.importorskip("pyarrow")
+    for params, accept in [({"format": "parquet"}, None), (None, PARQUET_MEDIA_TYPE)]:
+        response = execute(flow_client, "test_flow", params, accept)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == PARQUET_MEDIA_TYPE
+        assert 'filename="export-1.parquet"' in response.headers["content-disposition"]
+        table = pq.read_table(pa.BufferReader(response.content))
+        assert table.schema.metadata[b"node_id"] == b"export-1"
+        assert table.num_rows == len(execute(flow_client, "test_flow").json()["data"][-1]["output"])
+
+    not_export = execute(flow_client, "test_flow", {"format": "parquet", "node_id": "dataSource-1"})
+    assert not_export.status_code == 400
+
+
+def test_format_parquet_failed_flow(flow_client):
+    pytest.importorskip("pyarrow")
+    # The merge node fails, so the export never runs
+    response = execute(flow_client, "test_merge_agg_flow", {"format": "parquet"})
+    assert response.status_code == 500
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert body["status"] == "error" and "export-1" in body["message"]
+    assert body["detail"]
+
+
+def test_format_json_fallback(flow_client):
+    expected = execute(flow_client, "test_flow")
+    assert expected.status_code == 200
+    for accept in ["text/html", "application/json", "*/*"]:
+        response = execute(flow_client, "test_flow", accept=accept)
+        assert response.headers["content-type"] == "application/json"
+        assert response.text == expected.text
+
+    unsupported = execute(flow_client, "test_flow", {"format": "xml"}, ARROW_STREAM_MEDIA_TYPE)
+    assert unsupported.status_code == 406
+
+
+################################################################################
+# Jobs
+################################################################################
+
+
+def test_job_submit_poll_and_result():
+    manager = JobManager(MemoryJobStore())
+    manager.start()
+    executor = FlowExecutor()
+    executor.start()
+    try:
+        client = TestClient(make_app(executor, manager))
+        flow = load_flow("test_flow")
+
+        submitted = client.post("/api/jobs", json={"flow_graph": flow})
+        assert submitted.status_code == 202
+        job = submitted.json()["data"]
+        assert "owner" not in job
+
+        wait_for(manager, job["job_id"])
+        polled = client.get(f"/api/jobs/{job['job_id']}").json()["data"]
+        assert polled["status"] == JOB_SUCCEEDED
+        assert polled["progress"]["completed"] == polled["progress"]["total"] == len(flow["nodes"])
+
+        result = client.get(f"/api/jobs/{job['job_id']}/result")
+        direct = client.post("/api/flows/execute", json={"flow_graph": flow})
+        assert result.status_code == 200 and result.text == direct.text
+        assert [j["job_id"] for j in client.get("/api/jobs").json()["data"]] == [job["job_id"]]
+        assert client.get("/api/jobs/job_missing").status_code == 404
+    finally:
+        manager.shutdown()
+        executor.shutdown()
+
+
+def test_job_cancel():
+    manager = JobManager(MemoryJobStore(), workers=1)
+    manager.start()
+    release, started = threading.Event(), threading.Event()
+    try:
+        client = TestClient(make_app(job_manager=manager))
+        running = manager.submit(blocking_job(release, started))
+        queued = manager.submit(blocking_job(release))
+        assert started.wait(5)
+
+        assert client.delete(f"/api/jobs/{queued.job_id}").json()["data"]["status"] == JOB_CANCELLED
+        assert client.get(f"/api/jobs/{queued.job_id}/result").status_code == 409
+
+        assert client.get(f"/api/jobs/{running.job_id}/result").status_code == 202
+        client.delete(f"/api/jobs/{running.job_id}")
+        assert wait_for(manager, running.job_id).status == JOB_CANCELLED
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_job_failed_node():
+    manager = JobManager(MemoryJobStore())
+    manager.start()
+    try:
+        client = TestClient(make_app(job_manager=manager))
+        flow = load_flow("test_flow")
+        for node in flow["nodes"]:
+            if node["id"] == "sort-1":
+                node["config"]["field"] = "missing"
+
+        job = client.post("/api/jobs", json={"flow_graph": flow}).json()["data"]
+        failed = wait_for(manager, job["job_id"])
+        assert failed.status == JOB_FAILED
+        assert "missing" in failed.error
+        result = client.get(f"/api/jobs/{job['job_id']}/result")
+        assert result.status_code == 500
+        assert manager.store.load_result(job["job_id"]) is None
+    finally:
+        manager.shutdown()
+
+
+def test_job_timeout_starts_when_running():
+    manager = JobManager(MemoryJobStore(), workers=1, timeout=0.2)
+    manager.start()
+    release, started = threading.Event(), threading.Event()
+    try:
+        first = manager.submit(blocking_job(release, started))
+        queued = manager.submit(lambda job_id, progress, token: "{}")
+        assert started.wait(5)
+        # Longer than the timeout, but the queued job hasn't started yet
+        time.sleep(0.3)
+        release.set()
+        assert wait_for(manager, first.job_id).status == JOB_FAILED
+        assert wait_for(manager, queued.job_id).status == JOB_SUCCEEDED
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_job_queue_full():
+    manager = JobManager(MemoryJobStore(), workers=1, max_pending=1)
+    manager.start()
+    release = threading.Event()
+    try:
+        client = TestClient(make_app(job_manager=manager))
+        manager.submit(blocking_job(release))
+        response = client.post("/api/jobs", json={"flow_graph": load_flow("test_flow")})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"]
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_job_ttl_purge():
+    manager = JobManager(MemoryJobStore(), ttl=0)
+    manager.start()
+    try:
+        job = manager.submit(lambda job_id, progress, token: "{}")
+        wait_for(manager, job.job_id)
+        time.sleep(0.01)
+        client = TestClient(make_app(job_manager=manager))
+        assert client.get(f"/api/jobs/{job.job_id}").status_code == 404
+        assert manager.store.load_result(job.job_id) is None
+    finally:
+        manager.shutdown()
+
+
+def test_disk_jobs_survive_restart(tmp_path):
+    first = JobManager(DiskJobStore(str(tmp_path)))
+    first.start()
+    job = first.submit(lambda job_id, progress, token: '{"status": "success", "data": [1]}')
+    wait_for(first, job.job_id)
+    first.shutdown()
+
+    second = JobManager(DiskJobStore(str(tmp_path)))
+    second.start()
+    try:
+        assert second.get(job.job_id).status == JOB_SUCCEEDED
+        assert second.result(job.job_id) == '{"status": "success", "data": [1]}'
+    finally:
+        second.shutdown()
+
+
+def test_restart_only_fails_own_jobs(tmp_path):
+    store = DiskJobStore(str(tmp_path))
+    manager = JobManager(store)
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+
+    owners = {
+        "previous_boot": {**manager.owner, "boot_id": "boot_previous"},
+        "dead_process": {**manager.owner, "pid": dead.pid},
+        "live_process": {**manager.owner, "pid": 1},
+        "other_host": {**manager.owner, "host": "another-worker"},
+        "unknown": None,
+    }
+    for job_id, owner in owners.items():
+        job = Job(job_id, owner=owner)
+        job.status = JOB_RUNNING
+        store.save(job)
+
+    manager.start()
+    try:
+        statuses = {job_id: store.get(job_id).status for job_id in owners}
+        assert statuses == {
+            "previous_boot": JOB_FAILED,
+            "dead_process": JOB_FAILED,
+            "live_process": JOB_RUNNING,
+            "other_host": JOB_RUNNING,
+            "unknown": JOB_RUNNING,
+        }
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -2,9 +2,49 @@
 """
 Test script for the Runner class
 """
+import io
+import os
+import re
 import json
+import operator
+import shutil
+import tempfile
+import time
+import pandas as pd
+import pytest
+from pandas import json_normalize
+from concurrent.futures import ThreadPoolExecutor
 from flow_graph.parser import Parser
+from flow_graph.filter import Filter
 from flow_graph.runner import Runner
+from flow_graph.cancellation import CancelToken, DeadlineExceeded, ExecutionCancelled
+from flow_graph.metrics import Counter, cache_requests, operator_duration, registry
+from flow_graph.plan_cache import PlanCache
+from flow_graph.data_source import DataSource, read_dataset
+from flow_graph.dataset_cache import DatasetCache
+from flow_graph.cache import estimate_size, mock_data_path, node_key
+from flow_graph.flatten import flatten_frame, flatten_records
+from flow_graph.mongo_source import MongoSource
+from flow_graph import cache, mongo_source, sidecar
+
+BUNDLED_DATA_DIR = cache.MOCK_DATA_DIR
+
+
+def use_mock_data_dir(monkeypatch, directory: str):
+    """
+    Copies the bundled datasets under `directory` and points dataSources and
+    their sidecars there, so tests never write into the package.
+    """
+    data_dir = os.path.join(directory, "mock_data")
+    shutil.copytree(BUNDLED_DATA_DIR, data_dir, ignore=shutil.ignore_patterns(".*", "__pycache__", "*.py"))
+    monkeypatch.setattr(cache, "MOCK_DATA_DIR", data_dir)
+    monkeypatch.setattr(sidecar, "DEFAULT_SIDECAR_DIR", os.path.join(data_dir, ".sidecars"))
+
+
+@pytest.fixture(autouse=True)
+def mock_data_dir(monkeypatch, tmp_path):
+    use_mock_data_dir(monkeypatch, str(tmp_path))
+
 
 def test_basic_flow():
     print("=" * 60)
@@ -24,7 +64,7 @@ def test_basic_flow():
     # Create runner instance (it will parse internally)
     print("\n2. Creating Runner instance and parsing...")
     try:
-        runner = Runner(flow_data)
+        runner = Runner(flow_data, retain_outputs=True)
         print("   ✓ Runner created successfully")
         print(f"   - Execution order: {runner.exec_order}")
         print(f"   - Required nodes: {dict(runner.req_nodes)}")
@@ -92,7 +132,7 @@ def test_merge_flow():
     # Create runner instance (it will parse internally)
     print("\n2. Creating Runner instance and parsing...")
     try:
-        runner = Runner(flow_data)
+        runner = Runner(flow_data, retain_outputs=True)
         print("   ✓ Runner created successfully")
         print(f"   - Execution order: {runner.exec_order}")
         print(f"   - Required nodes: {dict(runner.req_nodes)}")
@@ -170,7 +210,7 @@ def test_complex_flow():
     # Create runner instance (it will parse internally)
     print("\n2. Creating Runner instance and parsing...")
     try:
-        runner = Runner(flow_data)
+        runner = Runner(flow_data, retain_outputs=True)
         print("   ✓ Runner created successfully")
         print(f"   - Execution order: {runner.exec_order}")
         print(f"   - Required nodes (dependencies):")
@@ -256,7 +296,7 @@ def test_merge_with_aggregation():
     # Create runner instance (it will parse internally)
     print("\n2. Creating Runner instance and parsing...")
     try:
-        runner = Runner(flow_data)
+        runner = Runner(flow_data, retain_outputs=True)
         print("   ✓ Runner created successfully")
         print(f"   - Execution order: {runner.exec_order}")
     except Exception as e:
@@ -333,7 +373,7 @@ def test_forecast_flow():
     # Create runner instance
     print("\n2. Creating Runner instance and parsing...")
     try:
-        runner = Runner(flow_data)
+        runner = Runner(flow_data, retain_outputs=True)
         print("   ✓ Runner created successfully")
         print(f"   - Execution order: {runner.exec_order}")
         print(f"   - Required nodes: {dict(runner.req_nodes)}")
@@ -443,18 +483,954 @@ def test_forecast_flow():
     print("Forecast flow test completed successfully!")
     print("=" * 60)
 
-def main():
-    print("=" * 70)
-    print(" " * 20 + "RUNNER TEST SUITE")
-    print("=" * 70)
-    
-    # Run all tests
+def test_parallel_execution():
+    print("\n\n" + "=" * 60)
+    print("Testing Runner with PARALLEL branch execution")
+    print("=" * 60)
+
+    with open("test_data/test_merge_agg_flow.json", "r") as f:
+        flow_data = json.load(f)
+
+    sequential = list(Runner(flow_data, executor="sync").execute())
+    parallel = list(Runner(flow_data, executor="thread", max_workers=4).execute())
+
+    print(f"   - Sequential outputs: {len(sequential)}")
+    print(f"   - Parallel outputs: {len(parallel)}")
+    assert parallel == sequential
+    print("   ✓ Parallel run streams the same outputs in the same order")
+
+    print("\n" + "=" * 60)
+    print("Parallel execution test completed successfully!")
+    print("=" * 60)
+
+def test_node_cache():
+    print("\n\n" + "=" * 60)
+    print("Testing Runner with the node output CACHE")
+    print("=" * 60)
+
+    from flow_graph.cache import NodeCache
+
+    with open("test_data/test_forecast_flow.json", "r") as f:
+        flow_data = json.load(f)
+
+    cache = NodeCache()
+    first = list(Runner(flow_data, cache=cache).execute())
+    misses = cache.misses
+    second = list(Runner(flow_data, cache=cache).execute())
+
+    print(f"   - Cache stats: {cache.stats()}")
+    assert second == first
+    assert cache.misses == misses
+    assert cache.hits == len(flow_data["nodes"])
+
+    flow_data["nodes"][1]["config"]["horizon"] = 7
+    list(Runner(flow_data, cache=cache).execute())
+    # dataSource is reused, forecast and its export are recomputed
+    assert cache.hits == len(flow_data["nodes"]) + 1
+    print("   ✓ Repeated runs are served from the cache")
+
+    small = NodeCache(max_entries=2)
+    list(Runner(flow_data, cache=small).execute())
+    assert len(small) == 2
+    print("   ✓ LRU eviction keeps the cache bounded")
+
+    print("\n" + "=" * 60)
+    print("Node cache test completed successfully!")
+    print("=" * 60)
+
+def test_incremental_execution():
+    print("\n\n" + "=" * 60)
+    print("Testing Runner with INCREMENTAL re-execution")
+    print("=" * 60)
+
+    from flow_graph.incremental import SessionStore
+
+    with open("test_data/test_forecast_flow.json", "r") as f:
+        flow_data = json.load(f)
+
+    sessions = SessionStore()
+    options = {"flow_uid": "flow_test", "incremental": True, "sessions": sessions, "cache": None}
+
+    first = Runner(flow_data, **options)
+    first_outputs = list(first.execute())
+    assert first.dirty_nodes == set(first.exec_order)
+
+    unchanged = Runner(flow_data, **options)
+    assert list(unchanged.execute()) == first_outputs
+    assert unchanged.dirty_nodes == set()
+
+    flow_data["nodes"][1]["config"]["horizon"] = 7
+    edited = Runner(flow_data, **options)
+    list(edited.execute())
+    print(f"   - Dirty after editing forecast-1: {sorted(edited.dirty_nodes)}")
+    assert edited.dirty_nodes == {"forecast-1", "export-1"}
+    assert edited.executed_processes["dataSource-1"].output is (
+        first.executed_processes["dataSource-1"].output
+    )
+    print("   ✓ Only the edited node and its descendants were recomputed")
+
+    sized = SessionStore(max_bytes=sessions.get("flow_test").size)
+    bounded = {**options, "sessions": sized}
+    list(Runner(flow_data, **bounded).execute())
+    assert len(sized) == 1 and sized.total_bytes <= sized.max_bytes
+    list(Runner(flow_data, **{**bounded, "flow_uid": "flow_other"}).execute())
+    assert sized.get("flow_test") is None and sized.get("flow_other") is not None
+    assert sized.total_bytes <= sized.max_bytes
+    print("   ✓ Sessions are evicted once their outputs exceed the byte budget")
+
+    print("\n" + "=" * 60)
+    print("Incremental execution test completed successfully!")
+    print("=" * 60)
+
+def test_target_pruning():
+    print("\n\n" + "=" * 60)
+    print("Testing Runner with TARGET node pruning")
+    print("=" * 60)
+
+    with open("test_data/test_merge_agg_flow.json", "r") as f:
+        flow_data = json.load(f)
+
+    runner = Runner(flow_data, targets=["filter-2"], cache=None)
+    print(f"   - Execution order: {runner.exec_order}")
+    assert runner.exec_order == ["dataSource-2", "filter-2"]
+
+    outputs = [json.loads(o)["node_id"] for o in runner.execute()]
+    assert "dataSource-1" not in outputs and "export-1" not in outputs
+    print("   ✓ Only the upstream closure of the target was executed")
+
+    print("\n" + "=" * 60)
+    print("Target pruning test completed successfully!")
+    print("=" * 60)
+
+def test_release_intermediates():
+    print("\n\n" + "=" * 60)
+    print("Testing Runner RELEASE of intermediate outputs")
+    print("=" * 60)
+
+    with open("test_data/test_forecast_flow.json", "r") as f:
+        flow_data = json.load(f)
+
+    runner = Runner(flow_data, cache=None)
+    outputs = list(runner.execute())
+    print(f"   - Kept after run: {list(runner.executed_processes)}")
+    assert len(outputs) == 3
+    assert list(runner.executed_processes) == ["export-1"]
+    assert runner.executed_processes["export-1"].output is not None
+
+    debug_runner = Runner(flow_data, cache=None, retain_outputs=True)
+    assert list(debug_runner.execute()) == outputs
+    assert list(debug_runner.executed_processes) == runner.exec_order
+    print("   ✓ Intermediates are dropped after their last consumer ran")
+
+    print("\n" + "=" * 60)
+    print("Release test completed successfully!")
+    print("=" * 60)
+
+def test_optimizer():
+    print("\n\n" + "=" * 60)
+    print("Testing Runner with the PLAN optimizer")
+    print("=" * 60)
+
+    flow_data = {
+        "nodes": [
+            {"id": "dataSource-1", "type": "dataSource", "config": {"input": "test"}},
+            {"id": "dataSource-2", "type": "dataSource", "config": {"input": "test2"}},
+            {"id": "sort-1", "type": "sort", "config": {"field": "age", "asc": False}},
+            {"id": "merge-1", "type": "merge", "config": {"how": "inner", "left_on": "id", "right_on": "id"}},
+            {"id": "filter-1", "type": "filter", "config": {"field": "salary", "condition": "gt", "value1": 55000}},
+            {"id": "filter-2", "type": "filter", "config": {"field": "country", "condition": "eq", "value1": "USA"}},
+            {"id": "sort-2", "type": "sort", "config": {"field": "name"}},
+            {"id": "group-1", "type": "group", "config": {"group_by": ["country"], "aggregations": ["max", "count"], "fields": ["salary"]}},
+            {"id": "export-1", "type": "export", "config": {}},
+            {"id": "export-2", "type": "export", "config": {}},
+        ],
+        "edges": [
+            {"source": "dataSource-1", "target": "sort-1"},
+            {"source": "sort-1", "target": "merge-1"},
+            {"source": "dataSource-2", "target": "merge-1"},
+            {"source": "merge-1", "target": "filter-1"},
+            {"source": "filter-1", "target": "filter-2"},
+            {"source": "filter-2", "target": "export-1"},
+            {"source": "dataSource-1", "target": "sort-2"},
+            {"source": "sort-2", "target": "group-1"},
+            {"source": "group-1", "target": "export-2"},
+        ],
+    }
+
+    plain = Runner(flow_data, cache=None, retain_outputs=True)
+    expected = list(plain.execute())
+    runner = Runner(flow_data, cache=None, optimize=True, retain_outputs=True)
+    rules = [rewrite["rule"] for rewrite in runner.plan.rewrites]
+    print(f"   - Rewrites: {rules}")
+    assert rules == [
+        "fuse_filters",
+        "push_filter_below_merge",
+        "push_filter_below_sort",
+        "drop_sort_before_group",
+    ]
+
+    outputs = list(runner.execute())
+    hidden = {"sort-1", "merge-1", "filter-1", "sort-2"}
+    assert outputs == [
+        o for o in expected if json.loads(o)["node_id"] not in hidden
+    ]
+    assert len(json.loads(outputs[-1])["output"]) == 2
+    for output in outputs:
+        node_id = json.loads(output)["node_id"]
+        assert runner.executed_processes[node_id].output.dtypes.equals(
+            plain.executed_processes[node_id].output.dtypes
+        ), node_id
+    print("   ✓ Rewritten plan returns the same outputs, with the same dtypes")
+
+    # Bool against int keys are coerced to a dtype that depends on the rows
+    coerced = json.loads(json.dumps(flow_data))
+    coerced["nodes"][3]["config"] = {"how": "inner", "left_on": "active", "right_on": "id"}
+    coerced["nodes"][0]["config"]["input"] = [
+        {"active": True, "salary": 60000},
+        {"active": False, "salary": 40000},
+    ]
+    runner = Runner(coerced, cache=None, optimize=True)
+    assert "push_filter_below_merge" not in [rewrite["rule"] for rewrite in runner.plan.rewrites]
+    print("   ✓ Filters stay above merges whose key dtypes would be coerced")
+
+    protected = Runner(flow_data, cache=None, optimize=True, targets=["merge-1"])
+    assert not protected.plan.hidden & {"sort-1", "merge-1"}
+    print("   ✓ Target nodes are never rewritten away")
+
+    with open("test_data/test_flow.json", "r") as f:
+        test_flow = json.load(f)
+    plain = [json.loads(o)["node_id"] for o in Runner(test_flow, cache=None).execute()]
+    optimized = [json.loads(o)["node_id"] for o in Runner(test_flow, cache=None, optimize=True).execute()]
+    assert optimized == plain and len(plain) == len(test_flow["nodes"])
+    print("   ✓ Projections don't drop reported nodes")
+
+    print("\n" + "=" * 60)
+    print("Optimizer test completed successfully!")
+    print("=" * 60)
+
+def test_filter_rules():
+    print("\n\n" + "=" * 60)
+    print("Testing Runner with FILTER rule groups")
+    print("=" * 60)
+
+    flow_data = {
+        "nodes": [
+            {"id": "dataSource-1", "type": "dataSource", "config": {"input": "test"}},
+            {
+                "id": "filter-1",
+                "type": "filter",
+                "config": {
+                    "rules": [
+                        {"field": "age", "condition": "range", "value1": 25, "value2": 40},
+                        {
+                            "logic": "or",
+                            "rules": [
+                                {"field": "country", "condition": "in", "value": ["UK", "Canada"]},
+                                {"field": "name", "condition": "startswith", "value": "A"},
+                            ],
+                        },
+                    ]
+                },
+            },
+            {"id": "export-1", "type": "export", "config": {}},
+        ],
+        "edges": [
+            {"source": "dataSource-1", "target": "filter-1"},
+            {"source": "filter-1", "target": "export-1"},
+        ],
+    }
+
+    runner = Runner(flow_data, cache=None, retain_outputs=True)
+    list(runner.execute())
+    output = runner.executed_processes["export-1"].output
+    print(f"   - Rows kept: {len(output)}")
+    assert len(output) > 0
+    assert output["age"].between(25, 40).all()
+    assert (output["country"].isin(["UK", "Canada"]) | output["name"].str.startswith("A")).all()
+    print("   ✓ AND/OR rule groups evaluate into one mask")
+
+    cells = pd.DataFrame({
+        "text": ["abc", ["a", "b"], {"a": 1}, float("nan"), 5, "xyz"],
+        "score": [1.0, float("nan"), 3.0, 1.0, float("nan"), 2.0],
+    })
+    contains = Filter(cells).run(field="text", condition="contains", value1="a")
+    assert contains["text"].tolist() == ["abc"]
+    ncontains = Filter(cells).run(field="text", condition="ncontains", value1="a")
+    assert len(ncontains) == 5 and "abc" not in ncontains["text"].tolist()
+    print("   ✓ contains only searches string cells, not lists or dicts")
+
+    kept = Filter(cells).run(field="score", condition="in", value1=[1.0, float("nan")])
+    assert kept["score"].tolist() == [1.0, 1.0]
+    dropped = Filter(cells).run(field="score", condition="nin", value1=[1.0, float("nan")])
+    assert dropped["score"].isna().sum() == 2 and len(dropped) == 4
+    print("   ✓ in/nin never match NaN cells")
+
+    print("\n" + "=" * 60)
+    print("Filter rules test completed successfully!")
+    print("=" * 60)
+
+def test_cancellation():
+    print("\n\n" + "=" * 60)
+    print("Testing Runner CANCELLATION and deadlines")
+    print("=" * 60)
+
+    with open("test_data/test_forecast_flow.json", "r") as f:
+        flow_data = json.load(f)
+
+    token = CancelToken()
+    runner = Runner(flow_data, cache=None, cancel_token=token)
+    outputs = []
+    try:
+        for output in runner.execute():
+            outputs.append(output)
+            token.cancel()
+        assert False, "cancelled execution kept running"
+    except ExecutionCancelled:
+        pass
+    assert len(outputs) == 1
+    print("   ✓ Execution stops at the next node once cancelled")
+
+    rows = [{"t": i, "v": float((i * 7919) % 101)} for i in range(2000)]
+    slow_flow = {
+        "nodes": [
+            {"id": "dataSource-1", "type": "dataSource", "config": {"input": rows}},
+            {
+                "id": "forecast-1",
+                "type": "forecast",
+                "config": {"target": "v", "ts_col": "t", "method": "arima", "order": [4, 1, 4]},
+            },
+        ],
+        "edges": [{"source": "dataSource-1", "target": "forecast-1"}],
+    }
+    start = time.perf_counter()
+    try:
+        list(Runner(slow_flow, cache=None, cancel_token=CancelToken(timeout=0.2)).execute())
+        assert False, "deadline was not enforced"
+    except DeadlineExceeded:
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"   - Stopped after {elapsed:.2f}s")
+    assert elapsed < 2
+    print("   ✓ Deadline interrupts model fitting")
+
+    print("\n" + "=" * 60)
+    print("Cancellation test completed successfully!")
+    print("=" * 60)
+
+def test_profiling():
+    print("\n\n" + "=" * 60)
+    print("Testing Runner PROFILING")
+    print("=" * 60)
+
+    with open("test_data/test_flow.json", "r") as f:
+        flow_data = json.load(f)
+
+    runner = Runner(flow_data, cache=None, profile=True)
+    results = list(runner.execute_nodes())
+    report = runner.profile_report()
+
+    assert [node["node_id"] for node in report["nodes"]] == runner.exec_order
+    for result, node in zip(results, report["nodes"]):
+        assert result.metadata["profile"].node_id == node["node_id"]
+        assert node["wall_ms"] >= 0 and node["cpu_ms"] >= 0
+        assert node["rows_out"] == len(result.output)
+        assert node["output_bytes"] > 0
+    source = report["nodes"][0]
+    assert source["rows_in"] == 0
+    assert report["nodes"][1]["rows_in"] == source["rows_out"]
+    print(f"   - {len(report['nodes'])} nodes, {report['total_wall_ms']}ms total")
+    print("   ✓ Every node reports timings, rows and output size")
+
+    assert "profile" not in next(Runner(flow_data, cache=None).execute_nodes()).metadata
+    print("   ✓ Profiling is off by default")
+
+    print("\n" + "=" * 60)
+    print("Profiling test completed successfully!")
+    print("=" * 60)
+
+def test_metrics():
+    print("\n\n" + "=" * 60)
+    print("Testing operator METRICS")
+    print("=" * 60)
+
+    with open("test_data/test_flow.json", "r") as f:
+        flow_data = json.load(f)
+
+    before = sum(operator_duration.labels("filter").counts)
+    list(Runner(flow_data, cache=None).execute_nodes())
+    assert sum(operator_duration.labels("filter").counts) == before + 1
+    print("   ✓ Each executed node is observed under its operator type")
+
+    text = registry.render()
+    assert "# TYPE flow_operator_duration_seconds histogram" in text
+    assert 'flow_operator_duration_seconds_bucket{operator="filter",le="+Inf"}' in text
+    assert 'flow_rows_processed_total{operator="datasource"}' in text
+    print("   ✓ Registry renders the Prometheus text format")
+
+    assert not hasattr(Counter("test_total", "test").labels(), "set")
+    assert cache_requests.kind == "gauge" and not cache_requests.name.endswith("_total")
+    print("   ✓ Counters can't be set, cache lookups resettable by clear() are gauges")
+
+    print("\n" + "=" * 60)
+    print("Metrics test completed successfully!")
+    print("=" * 60)
+
+def test_plan_cache():
+    print("\n\n" + "=" * 60)
+    print("Testing compiled PLAN CACHE")
+    print("=" * 60)
+
+    with open("test_data/test_flow.json", "r") as f:
+        flow_data = json.load(f)
+
+    plans = PlanCache()
+    first = Runner(flow_data, cache=None, flow_uid="flow-1", plan_cache=plans)
+    second = Runner(flow_data, cache=None, flow_uid="flow-1", plan_cache=plans)
+    assert first.compiled is second.compiled
+    assert list(first.execute()) == list(second.execute())
+    print("   ✓ Repeated runs of a saved flow share one compiled plan")
+
+    edited = json.loads(json.dumps(flow_data))
+    edited["nodes"][1]["config"]["value"] = 1
+    assert Runner(edited, cache=None, flow_uid="flow-1", plan_cache=plans).compiled is not first.compiled
+    print("   ✓ An edited graph is recompiled")
+
+    optimized = Runner(edited, cache=None, flow_uid="flow-1", plan_cache=plans, optimize=True)
+    assert optimized.compiled is not Runner(edited, cache=None, flow_uid="flow-1", plan_cache=plans).compiled
+    assert Runner(edited, cache=None, flow_uid="flow-1", plan_cache=plans, optimize=True).compiled is optimized.compiled
+    dataset = mock_data_path(flow_data["nodes"][0]["config"]["input"])
+    stat = os.stat(dataset)
+    os.utime(dataset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert Runner(edited, cache=None, flow_uid="flow-1", plan_cache=plans, optimize=True).compiled is not optimized.compiled
+    print("   ✓ Plans compiled against an older version of a dataset are rebuilt")
+    plans.invalidate("flow-1")
+    assert len(plans) == 0
+    assert Runner(flow_data, cache=None, plan_cache=plans).compiled is not first.compiled
+    assert len(plans) == 0
+    print("   ✓ Variants are kept apart, invalidation drops them and ad-hoc flows are not cached")
+
+    print("\n" + "=" * 60)
+    print("Plan cache test completed successfully!")
+    print("=" * 60)
+
+def test_datasource_limits():
+    print("\n\n" + "=" * 60)
+    print("Testing chunked DATASOURCE reads")
+    print("=" * 60)
+
+    full = DataSource("timeseries_long", limit=None, chunksize=50).output
+    assert len(full) == 365
+    assert len(DataSource("timeseries_long").output) == 100
+    print(f"   - {len(full)} rows in the file, 100 by default")
+
+    limited = DataSource("timeseries_long", limit=120, chunksize=50).output
+    assert limited.equals(full.head(120))
+    print("   ✓ The limit holds across chunk boundaries")
+
+    flow = {
+        "nodes": [
+            {"id": "dataSource-1", "type": "dataSource", "config": {"input": "timeseries_long", "limit": None}},
+            {"id": "export-1", "type": "export", "config": {}},
+        ],
+        "edges": [{"source": "dataSource-1", "target": "export-1"}],
+    }
+    results = list(Runner(flow, cache=None).execute_nodes())
+    assert len(results[-1].output) == 365
+    print("   ✓ Flows can ask for a full scan")
+
+    print("\n" + "=" * 60)
+    print("DataSource test completed successfully!")
+    print("=" * 60)
+
+def test_dataset_cache():
+    print("\n\n" + "=" * 60)
+    print("Testing shared DATASET CACHE")
+    print("=" * 60)
+
+    name = "_test_dataset_cache"
+    path = mock_data_path(name)
+    datasets = DatasetCache()
+    calls = []
+
+    def load(file_path, limit, chunksize, columns):
+        calls.append(file_path)
+        time.sleep(0.05)
+        return DataSource.read_ndjson(file_path, limit, chunksize)
+
+    with open(path, "w") as f:
+        f.write('{"a": 1, "b": {"c": 2}}\n{"a": 3, "b": {"c": 4}}\n')
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        frames = list(pool.map(lambda _: datasets.get(name, 100, 10, load), range(4)))
+    assert len(calls) == 1 and all(frame is frames[0] for frame in frames)
+    assert list(frames[0].columns) == ["a", "b.c"]
+    print("   ✓ Concurrent loads parse the file once and share the frame")
+
+    with open(path, "a") as f:
+        f.write('{"a": 5, "b": {"c": 6}}\n')
+    assert len(datasets.get(name, 100, 10, load)) == 3 and len(calls) == 2
+    print("   ✓ A changed file is parsed again")
+
+    datasets.max_bytes = datasets.total_bytes
+    datasets.get(name, None, 10, load)
+    assert datasets.total_bytes <= datasets.max_bytes and len(datasets) == 1
+    print("   ✓ Entries are evicted past the byte budget")
+    assert not datasets._loading
+    print("   ✓ Per-key load locks are dropped once loaded")
+
+    assert datasets.hits and datasets.misses
+    datasets.clear()
+    assert len(datasets) == 0 and datasets.total_bytes == 0
+    assert datasets.hits == datasets.misses == 0
+    print("   ✓ clear() empties the cache and resets its lookup counts")
+
+    with open(path, "w") as f:
+        f.write('{"v": 1}\n{"v": 2}\n{"w": 3}\n')
+    cold = DatasetCache().get(name, 2, 10, load)
+    warm = DatasetCache()
+    assert warm.get(name, None, 10, load)["v"].dtype == "float64"
+    assert warm.get(name, 2, 10, load).dtypes.equals(cold.dtypes)
+    assert cold["v"].dtype == "int64"
+    print("   ✓ A limited read has the same dtypes after a full read")
+
+    print("\n" + "=" * 60)
+    print("Dataset cache test completed successfully!")
+    print("=" * 60)
+
+def test_projection():
+    print("\n\n" + "=" * 60)
+    print("Testing COLUMN PROJECTION into dataSources")
+    print("=" * 60)
+
+    name = "_test_projection"
+    path = mock_data_path(name)
+    with open(path, "w") as f:
+        for i in range(200):
+            row = {
+                "timestamp": f"2025-01-{i % 28 + 1:02d}T00:00:00",
+                "endpoint": f"/api/v{i % 3}",
+                "metrics": {"response_time_ms": i % 17 * 10, "bytes": i * 100, "status": 200},
+                "user": {"id": i, "plan": "pro", "tags": ["a", "b"]},
+                "payload": {f"field_{k}": k * i for k in range(20)},
+            }
+            f.write(json.dumps(row) + "\n")
+
+    flow_data = {
+        "nodes": [
+            {"id": "dataSource-1", "type": "dataSource", "config": {"input": name, "limit": None}},
+            {"id": "filter-1", "type": "filter", "config": {"field": "metrics.response_time_ms", "condition": "gt", "value1": 40}},
+            {"id": "sort-1", "type": "sort", "config": {"field": "timestamp"}},
+            {"id": "group-1", "type": "group", "config": {"group_by": ["endpoint"], "aggregations": ["mean", "count"], "fields": ["metrics.response_time_ms"]}},
+            {"id": "export-1", "type": "export", "config": {}},
+        ],
+        "edges": [
+            {"source": "dataSource-1", "target": "filter-1"},
+            {"source": "filter-1", "target": "sort-1"},
+            {"source": "sort-1", "target": "group-1"},
+            {"source": "group-1", "target": "export-1"},
+        ],
+    }
+
+    expected = list(Runner(flow_data, cache=None).execute())
+    optimized = Runner(flow_data, cache=None, optimize=True)
+    assert "columns" not in optimized.nodes["dataSource-1"]["config"]
+    assert list(optimized.execute()) == expected
+    print("   ✓ Every node is reported, so nothing is projected by default")
+
+    runner = Runner(flow_data, cache=None, optimize=True, reported=["group-1", "export-1"])
+    source = runner.nodes["dataSource-1"]["config"]
+    assert source["columns"] == ["endpoint", "metrics.response_time_ms", "timestamp"]
+    print(f"   - dataSource-1 reads {source['columns']}")
+
+    outputs = list(runner.execute())
+    assert runner.hidden_nodes == {"dataSource-1", "filter-1", "sort-1"}
+    assert outputs == [o for o in expected if json.loads(o)["node_id"] in ("group-1", "export-1")]
+    print("   ✓ Projected plan returns the same reported outputs")
+
+    frame = DataSource(name, limit=None, columns=source["columns"]).output
+    assert sorted(frame.columns) == source["columns"] and len(frame) == 200
+    print("   ✓ Only the used columns are materialized")
+
+    protected = Runner(flow_data, cache=None, optimize=True, targets=["filter-1"], reported=["filter-1"])
+    assert "columns" not in protected.nodes["dataSource-1"]["config"]
+    print("   ✓ A target reading the whole frame keeps every column")
+
+    print("\n" + "=" * 60)
+    print("Projection test completed successfully!")
+    print("=" * 60)
+
+def test_flatten():
+    print("\n\n" + "=" * 60)
+    print("Testing columnar record FLATTENING")
+    print("=" * 60)
+
+    records = [
+        {
+            "ts": f"2025-01-0{i % 9 + 1}",
+            "net": {"client": {"ip": f"10.0.0.{i}", "port": 4000 + i}},
+            "http": {"request": {"method": "GET", "headers": {"accept": "*/*"}}, "status": 200 if i % 3 else None},
+            "tags": ["a"],
+        }
+        for i in range(12)
+    ]
+    # Optional keys, a missing object and an empty one
+    records[3]["http"]["request"]["headers"]["x-request-id"] = "r-3"
+    del records[5]["net"]
+    records[7]["net"] = {}
+
+    for sample_size in (len(records), 1):
+        expected = json_normalize(records, sep=".")
+        frame = flatten_records(records, sample_size=sample_size)
+        assert list(frame.columns) == list(expected.columns)
+        assert frame.dtypes.equals(expected.dtypes) and frame.equals(expected)
+    print("   ✓ Same columns, order, dtypes and values as json_normalize")
+
+    chunk = pd.read_json(io.StringIO("".join(json.dumps(r) + "\n" for r in records[:3])), lines=True)
+    frame = flatten_frame(chunk)
+    assert frame.equals(json_normalize(chunk.to_dict(orient="records"), sep="."))
+    assert estimate_size(frame) > 0
+    print("   ✓ Parsed NDJSON chunks flatten without a records round trip")
+
+    print("\n" + "=" * 60)
+    print("Flatten test completed successfully!")
+    print("=" * 60)
+
+def test_sidecar():
+    print("\n\n" + "=" * 60)
+    print("Testing columnar dataset SIDECARS")
+    print("=" * 60)
+
+    if not sidecar.enabled():
+        print("   - pyarrow not installed, skipping")
+        return
+
+    name = "_test_sidecar"
+    path = mock_data_path(name)
+    directory = tempfile.mkdtemp()
+    try:
+        with open(path, "w") as f:
+            for i in range(50):
+                f.write(json.dumps({"id": i, "v": i * 1.5, "meta": {"tag": f"t{i % 3}"}}) + "\n")
+
+        frame = DataSource.read_ndjson(path, None, 10)
+        target = sidecar.write(path, frame, directory)
+        assert target and os.path.exists(target)
+        assert sidecar.read(path, directory=directory).equals(frame)
+        print("   ✓ A full parse round-trips through the sidecar")
+
+        subset = sidecar.read(path, columns=["meta.tag", "id"], directory=directory)
+        assert list(subset.columns) == ["id", "meta.tag"]
+        assert subset.equals(frame[["id", "meta.tag"]])
+        print("   ✓ Reads only the requested columns")
+
+        with open(path, "a") as f:
+            f.write(json.dumps({"id": 50, "v": 0.5, "meta": {"tag": "t0"}}) + "\n")
+        assert sidecar.read(path, directory=directory) is None
+        sidecar.write(path, DataSource.read_ndjson(path, None, 10), directory)
+        assert os.listdir(directory) == [os.path.basename(sidecar.sidecar_path(path, directory))]
+        print("   ✓ A changed file gets a new sidecar and the old one is removed")
+
+        nested = pd.DataFrame({"id": [1, 2], "items": [[1, 2], ["a"]]})
+        nested_path = mock_data_path("_test_sidecar_nested")
+        with open(nested_path, "w") as f:
+            f.write("{}\n")
+        assert sidecar.write(nested_path, nested, directory) is None
+        print("   ✓ Frames that don't survive the Arrow round trip are skipped")
+
+        with open(path, "w") as f:
+            f.write('{"v": 1}\n{"v": 2}\n{"w": 3}\n')
+        cold = read_dataset(path, 2, 10)
+        assert read_dataset(path, None, 10)["v"].dtype == "float64"
+        assert os.path.exists(sidecar.sidecar_path(path))
+        assert read_dataset(path, 2, 10).dtypes.equals(cold.dtypes)
+        assert cold["v"].dtype == "int64"
+        print("   ✓ Limited reads keep their own dtypes once a sidecar exists")
+    finally:
+        shutil.rmtree(directory)
+
+    print("\n" + "=" * 60)
+    print("Sidecar test completed successfully!")
+    print("=" * 60)
+
+_ABSENT = object()
+_COMPARE = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def _lookup_path(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return _ABSENT
+        doc = doc[part]
+    return doc
+
+
+def _fake_satisfies(value, condition):
+    for op, arg in condition.items():
+        if op == "$not":
+            # The only negation the pushdown emits is {"$not": {"$type": "array"}}
+            assert arg == {"$type": "array"}
+            ok = not isinstance(value, list)
+        elif value is _ABSENT or isinstance(value, list):
+            ok = False
+        elif op == "$eq":
+            ok = value == arg
+        elif op == "$in":
+            ok = value in arg
+        elif op == "$regex":
+            ok = isinstance(value, str) and re.search(arg, value) is not None
+        else:
+            # Mongo only compares values of the same BSON type
+            numbers = isinstance(value, (int, float)) and isinstance(arg, (int, float))
+            ok = (numbers or type(value) is type(arg)) and _COMPARE[op](value, arg)
+        if not ok:
+            return False
+    return True
+
+
+def _fake_matches(doc, query):
+    for key, condition in query.items():
+        if key == "$and":
+            ok = all(_fake_matches(doc, q) for q in condition)
+        elif key == "$or":
+            ok = any(_fake_matches(doc, q) for q in condition)
+        elif key == "$nor":
+            ok = not any(_fake_matches(doc, q) for q in condition)
+        else:
+            ok = _fake_satisfies(_lookup_path(doc, key), condition)
+        if not ok:
+            return False
+    return True
+
+
+def _fake_project(doc, paths):
+    # Mongo keeps the document's own field order, not the projection's
+    out = {}
+    for key, value in doc.items():
+        if key in paths:
+            out[key] = value
+        elif isinstance(value, dict):
+            nested = {p[len(key) + 1:] for p in paths if p.startswith(key + ".")}
+            if nested:
+                out[key] = _fake_project(value, nested)
+    return out
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._docs)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCollection:
+    """Just enough of pymongo's Collection.find for mongoSource nodes."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = []
+
+    def find(self, query, projection, sort=None, limit=0, batch_size=0):
+        self.finds.append({"query": query, "projection": projection, "limit": limit})
+        docs = [doc for doc in self.docs if _fake_matches(doc, query)]
+        for key, direction in reversed(sort or []):
+            docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        if limit:
+            docs = docs[:limit]
+        included = {path for path, flag in projection.items() if flag}
+        if included:
+            if projection.get("_id", 1):
+                included.add("_id")
+            docs = [_fake_project(doc, included) for doc in docs]
+        else:
+            excluded = {path for path in projection}
+            docs = [{k: v for k, v in doc.items() if k not in excluded} for doc in docs]
+        return FakeCursor(docs)
+
+
+class FakeDatabase:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+def test_mongo_source(monkeypatch):
+    print("\n\n" + "=" * 60)
+    print("Testing MONGO SOURCE pushdown")
+    print("=" * 60)
+
+    docs = []
+    for i in range(300):
+        doc = {
+            "_id": 1000 - i,
+            "timestamp": f"2025-01-{i % 28 + 1:02d}T00:00:00",
+            "endpoint": ["/api/flows", "/api/jobs", "/health"][i % 3],
+            "metrics": {"response_time_ms": i % 17 * 10, "status": [200, 404, 500][i % 3]},
+            "tags": ["prod"],
+            "payload": {f"field_{k}": k * i for k in range(10)},
+        }
+        if i % 11 == 0:
+            del doc["metrics"]["response_time_ms"]
+        if i % 13 == 0:
+            # Arrays never match a scalar condition in pandas
+            doc["metrics"]["status"] = [200]
+        docs.append(doc)
+    logs = FakeCollection(docs)
+    database = FakeDatabase({"logs": logs, "users": FakeCollection([{"_id": 1, "password": "x"}])})
+    monkeypatch.setattr(mongo_source, "COLLECTIONS", {"logs"})
+
+    flow_data = {
+        "nodes": [
+            {"id": "mongo-1", "type": "mongoSource", "config": {
+                "collection": "logs",
+                "limit": None,
+                "batch_size": 64,
+                "dtypes": {"endpoint": "object", "metrics.response_time_ms": "float64", "metrics.status": "object"},
+            }},
+            {"id": "filter-1", "type": "filter", "config": {"field": "metrics.response_time_ms", "condition": "gte", "value1": 40}},
+            {"id": "filter-2", "type": "filter", "config": {
+                "logic": "or",
+                "rules": [
+                    {"field": "endpoint", "condition": "in", "value1": ["/api/flows", "/api/jobs"]},
+                    {"field": "metrics.status", "condition": "neq", "value1": 200},
+                ],
+            }},
+            {"id": "group-1", "type": "group", "config": {"group_by": ["endpoint"], "aggregations": ["mean", "count"], "fields": ["metrics.response_time_ms"]}},
+            {"id": "export-1", "type": "export", "config": {}},
+        ],
+        "edges": [
+            {"source": "mongo-1", "target": "filter-1"},
+            {"source": "filter-1", "target": "filter-2"},
+            {"source": "filter-2", "target": "group-1"},
+            {"source": "group-1", "target": "export-1"},
+        ],
+    }
+
+    plain = Runner(flow_data, cache=None, database=database, retain_outputs=True)
+    expected = list(plain.execute())
+    assert logs.finds[-1]["query"] == {}
+    assert logs.finds[-1]["projection"] == {"endpoint": 1, "metrics.response_time_ms": 1, "metrics.status": 1, "_id": 0}
+    print(f"   - Plain plan reads all {len(docs)} documents")
+
+    runner = Runner(flow_data, cache=None, optimize=True, database=database, reported=["group-1", "export-1"], retain_outputs=True)
+    kinds = [rewrite["rule"] for rewrite in runner.plan.rewrites]
+    assert "push_filter_into_collection" in kinds and "project_datasource" in kinds, kinds
+    outputs = list(runner.execute())
+    assert json.loads(outputs[-1])["node_id"] == "export-1"
+    assert outputs == [o for o in expected if json.loads(o)["node_id"] not in runner.hidden_nodes]
+    for node_id in ("group-1", "export-1"):
+        assert runner.executed_processes[node_id].output.dtypes.equals(plain.executed_processes[node_id].output.dtypes)
+    pushed = logs.finds[-1]
+    assert pushed["projection"] == {"endpoint": 1, "metrics.response_time_ms": 1, "_id": 0}
+    selected = [doc for doc in docs if _fake_matches(doc, pushed["query"])]
+    assert 0 < len(selected) < len(docs)
+    print(f"   ✓ Filters and projection run on the server ({len(selected)} documents read)")
+
+    single = {
+        "nodes": [flow_data["nodes"][0], {**flow_data["nodes"][1], "config": {"field": "metrics.status", "condition": "gt", "value1": 200}}],
+        "edges": [{"source": "mongo-1", "target": "filter-1"}],
+    }
+    unoptimized = Runner(single, cache=None, database=database).execute_nodes()
+    filtered = [result.output for result in unoptimized if result.node_id == "filter-1"][0]
+    for options in ({}, {"reported": ["filter-1"]}, {"targets": ["filter-1"]}):
+        runner = Runner(single, cache=None, optimize=True, database=database, **options)
+        results = list(runner.execute_nodes())
+        assert [result.node_id for result in results] == ["filter-1"], options
+        assert results[0].output.equals(filtered) and 0 < len(filtered) < len(docs)
+        assert logs.finds[-1]["query"] != {}
+    print("   ✓ A filter pushed into its source still returns its rows")
+
+    # The filter drops every document missing response_time_ms: inferred
+    # types would turn the column from float to int
+    frame = MongoSource("logs", database=database, query=pushed["query"], limit=None).output
+    assert frame["metrics.response_time_ms"].dtype == "int64"
+    untyped = json.loads(json.dumps(flow_data))
+    del untyped["nodes"][0]["config"]["dtypes"]
+    runner = Runner(untyped, cache=None, optimize=True, database=database)
+    assert "push_filter_into_collection" not in [rewrite["rule"] for rewrite in runner.plan.rewrites]
+    print("   ✓ Filters are only pushed into sources with declared dtypes")
+
+    limited = json.loads(json.dumps(flow_data))
+    limited["nodes"][0]["config"]["limit"] = 50
+    runner = Runner(limited, cache=None, optimize=True, database=database)
+    assert runner.nodes["filter-2"]["type"] == "filter"
+    list(runner.execute())
+    assert logs.finds[-1]["query"] == {} and logs.finds[-1]["limit"] == 50
+    print("   ✓ Filters stay in pandas when the source keeps its first N rows")
+
+    frame = MongoSource("logs", database=database, columns=["_id", "endpoint"], limit=5).output
+    assert list(frame.columns) == ["_id", "endpoint"] and frame["_id"].tolist() == ["701", "702", "703", "704", "705"]
+    print("   ✓ Documents come back in _id order with string ids")
+
+    assert node_key("mongosource", {"collection": "logs"}, []) is None
+    # Like any failing node, it ends the run without output
+    assert list(Runner(flow_data, cache=None).execute()) == []
+    print("   ✓ Collections are never cached and need the app's database")
+
+    for config in (
+        {"collection": "users"},
+        {"collection": "logs", "db": "admin"},
+        {"collection": "logs", "query": {"$where": "sleep(1000)"}},
+        {"collection": "logs", "query": {"endpoint": {"$function": {"body": "", "args": [], "lang": "js"}}}},
+        {"collection": "logs", "query": {"$and": [{"metrics.status": {"$gt": {"$expr": 1}}}]}},
+        {"collection": "logs", "columns": ["$where"]},
+        {"collection": "logs", "dtypes": {"endpoint": "no_such_dtype"}},
+        {"collection": "logs", "dtypes": {"$where": "object"}},
+    ):
+        with pytest.raises((ValueError, TypeError)):
+            MongoSource(database=database, **config)
+    user_query = {"$or": [{"endpoint": {"$in": ["/health"]}}, {"metrics.status": {"$gte": 500, "$not": {"$type": "array"}}}]}
+    assert len(MongoSource("logs", database=database, query=user_query, limit=None).output) == 100
+    print("   ✓ Only allowed collections and rule-shaped queries are accepted")
+
+    print("\n" + "=" * 60)
+    print("Mongo source test completed successfully!")
+    print("=" * 60)
+
+def run_tests():
     test_basic_flow()
     test_merge_flow()
     test_complex_flow()
     test_merge_with_aggregation()
     test_forecast_flow()
+    test_parallel_execution()
+    test_node_cache()
+    test_incremental_execution()
+    test_target_pruning()
+    test_release_intermediates()
+    test_optimizer()
+    test_filter_rules()
+    test_cancellation()
+    test_profiling()
+    test_metrics()
+    test_plan_cache()
+    test_datasource_limits()
+    test_dataset_cache()
+    test_flatten()
+    test_sidecar()
+    test_projection()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_mongo_source(monkeypatch)
+
+def main():
+    print("=" * 70)
+    print(" " * 20 + "RUNNER TEST SUITE")
+    print("=" * 70)
     
+    with pytest.MonkeyPatch.context() as monkeypatch, tempfile.TemporaryDirectory() as directory:
+        # Datasets are copied out so no test writes into the package
+        use_mock_data_dir(monkeypatch, directory)
+        run_tests()
+
     print("\n\n" + "=" * 70)
     print(" " * 20 + "ALL TESTS PASSED! ✓")
     print("=" * 70)
@@ -464,6 +1440,23 @@ def main():
     print("  ✓ Complex flow (Multi-filters → Sort → Group → Export)")
     print("  ✓ Advanced flow (Filtered branches → Merge → Sort → Export)")
     print("  ✓ Forecast flow (DataSource → Forecast → Export)")
+    print("  ✓ Parallel flow (independent branches run concurrently)")
+    print("  ✓ Node cache (repeated runs reuse node outputs)")
+    print("  ✓ Incremental flow (edits only recompute dirty nodes)")
+    print("  ✓ Target pruning (only the requested subgraph runs)")
+    print("  ✓ Release (intermediates freed after their last consumer)")
+    print("  ✓ Optimizer (rewritten plans keep every reported output)")
+    print("  ✓ Filter rules (AND/OR groups in a single vectorized mask)")
+    print("  ✓ Cancellation (between nodes and inside forecast fitting)")
+    print("  ✓ Profiling (per-node timings, rows and output size)")
+    print("  ✓ Metrics (operator histograms in Prometheus text format)")
+    print("  ✓ Plan cache (saved flows reuse their compiled plan)")
+    print("  ✓ DataSource (chunked NDJSON reads with a row limit)")
+    print("  ✓ Dataset cache (parsed once per file version, bounded by bytes)")
+    print("  ✓ Flatten (nested records flattened column by column)")
+    print("  ✓ Sidecars (memory-mapped Arrow copies of parsed datasets)")
+    print("  ✓ Projection (dataSources only read the columns a flow uses)")
+    print("  ✓ Mongo source (filters and projections pushed into the query)")
     print("=" * 70)
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar serializer
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from flow_graph.result import NodeResult, preview_limit
+from flow_graph.serializer import encode_node_output, serialize_output, serialize_records
+
+
+def reference(output):
+    return json.dumps(serialize_records(output))
+
+
+def sample_frames():
+    yield pd.DataFrame({"A": [1, 2, 3], "B": [1.5, np.nan, np.inf], "C": ["x", "ü", 'q"%s']})
+    yield pd.DataFrame({"flag": [True, False], "n": [-np.inf, -0.0]})
+    yield pd.DataFrame({"date": pd.to_datetime(["2024-01-01", "2024-01-02 10:30:00"], format="ISO8601")})
+    yield pd.DataFrame({"date": pd.to_datetime(["2024-01-01 00:00:00.123456", "2024-01-02"], format="ISO8601")})
+    yield pd.DataFrame({"date": pd.date_range("2024-01-01", periods=3, tz="UTC")})
+    yield pd.DataFrame(
+        {
+            "mixed": [1, "a", None, np.nan, pd.Timestamp("2024-01-01"), np.int64(7)],
+            "lists": [[1, 2], [], [{"a": 1}], [np.nan], None, "s"],
+        }
+    )
+    yield pd.DataFrame(
+        {"boxed": pd.Series([np.float32(0.5), np.bool_(True), np.datetime64("2024-01-01T10:00"), np.str_("s"), pd.NA, np.uint8(3)], dtype=object)}
+    )
+    yield pd.DataFrame({"nested": [{"a": 1, "b": {"c": np.nan}}, {"a": 2}]})
+    yield pd.DataFrame({"A": [1, 2], "B": [3, 4]}).groupby("A").agg({"B": ["sum", "mean"]}).reset_index()
+    yield pd.DataFrame({"a%d": [1], "int_key": [2]})
+    yield pd.DataFrame({"A": []})
+    yield pd.DataFrame(index=range(2))
+    yield pd.DataFrame([[1, 2]], columns=["dup", "dup"])
+    yield pd.DataFrame({0: [1], 1: [2]})
+    yield pd.DataFrame({"i": pd.array([1, None], dtype="Int64"), "f32": np.array([0.1, 2], dtype="float32")})
+
+
+def test_serializer_matches_reference():
+    for df in sample_frames():
+        assert serialize_output(df) == reference(df), df
+
+
+def test_encode_node_output():
+    df = pd.DataFrame({"A": [1.25, np.nan]})
+    expected = json.dumps({"node_id": "node-1", "output": serialize_records(df)})
+    assert encode_node_output("node-1", df) == expected
+
+    records = [{"a": {"b": 1}}]
+    expected = json.dumps({"node_id": "node-2", "output": serialize_records(records)})
+    assert encode_node_output("node-2", records) == expected
+
+
+def test_node_result_preview():
+    df = pd.DataFrame({"A": [1, 2, 3], "B": ["x", "y", "z"]})
+    intermediate = NodeResult("filter-1", "filter", df, {"sink": False})
+    sink = NodeResult("export-1", "export", df, {"sink": True})
+
+    assert preview_limit(intermediate) is None
+    assert preview_limit(intermediate, preview_rows=2) == 2
+    assert preview_limit(sink, preview_rows=2) is None
+    assert preview_limit(sink, outputs=["filter-1"]) == 0
+
+    payload = json.loads(intermediate.to_json(preview_rows=2))
+    assert payload["output"] == [{"A": 1, "B": "x"}, {"A": 2, "B": "y"}]
+    assert payload["total_rows"] == 3
+    assert payload["schema"] == {"A": "int64", "B": "object"}
+    assert payload["truncated"] is True
+
+
+if __name__ == "__main__":
+    test_serializer_matches_reference()
+    test_encode_node_output()
+    test_node_result_preview()
+    print("Serializer tests passed")